@@ -0,0 +1,223 @@
+"""Benchmarks de carga, agregación, ingesta y construcción de gráficas.
+
+Mide el tiempo de pared y el pico de memoria de cada etapa del núcleo
+analítico sobre datasets sintéticos de distintos tamaños y guarda los
+resultados en un JSON para poder compararlos entre versiones.
+
+Uso::
+
+    python benchmarks/bench_core.py --sizes 1e3 1e4 1e5 1e6 1e7
+    python benchmarks/bench_core.py --sizes 1e3 1e5 --compare benchmarks/results/anterior.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import pandas as pd  # noqa: E402
+
+import analytics  # noqa: E402
+from analytics import charts, synthetic  # noqa: E402
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_DAYS = 365
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def dataset_paths(rows, cache_dir, days=DEFAULT_DAYS, seed=42):
+    """Genera (o reutiliza) los archivos CSV y Parquet para un tamaño dado"""
+    n_types = len(synthetic.BUSINESS_PROFILES)
+    n_days = min(days, max(1, rows // n_types))
+    n_centers = max(1, round(rows / (n_types * n_days)))
+    base = os.path.join(cache_dir, f"mercado_{n_centers}x{n_days}_s{seed}")
+    paths = {'csv': base + '.csv', 'parquet': base + '.parquet'}
+    for fmt, path in paths.items():
+        if not os.path.exists(path):
+            synthetic.write_market_data(path, n_centers, n_days, seed=seed, fmt=fmt)
+    return paths
+
+
+def build_context(paths):
+    """Precalcula las entradas de cada benchmark para medir solo la etapa en cuestión"""
+    sector_avg, df = analytics.load_market_data(paths['csv'])
+    center_data, _ = analytics.process_center_file(paths['csv'], 'Benchmark', 'Urbano')
+    market_index = analytics.MarketIndex(df)
+    # Dos zonas, un tipo de negocio y la segunda mitad del periodo
+    first_date, last_date = market_index.date_range()
+    filters = analytics.make_filters(market_index.options['zona_geografica'][:2],
+                                     market_index.options['tipo_negocio'][:1],
+                                     first_date + (last_date - first_date) / 2, last_date)
+    return {
+        'paths': paths,
+        'df': df,
+        'rows': len(df),
+        'sector_avg': sector_avg,
+        'zone_data': analytics.aggregate_by_zone(df),
+        'business_data': analytics.aggregate_by_business_type(df),
+        'percentile_index': analytics.PercentileIndex.from_market(df),
+        'peer_index': analytics.PeerIndex.from_market(df),
+        'market_index': market_index,
+        'sketch_cube': analytics.SketchCube(df),
+        'filters': filters,
+        'monthly_data': center_data['monthly_data'],
+        'category_mix': analytics.category_mix(center_data['category_rollup']),
+        'market_category_mix': analytics.market_category_mix(analytics.aggregate_by_business_type(df)),
+        'latest': center_data['monthly_data'][-1]
+    }
+
+
+# (nombre, función que recibe el contexto)
+BENCHMARKS = [
+    ('load_market_data[csv]', lambda ctx: analytics.load_market_data(ctx['paths']['csv'])),
+    ('load_market_data[parquet]', lambda ctx: analytics.load_market_data(ctx['paths']['parquet'])),
+    ('compute_sector_averages', lambda ctx: analytics.compute_sector_averages(ctx['df'])),
+    ('aggregate_by_zone', lambda ctx: analytics.aggregate_by_zone(ctx['df'])),
+    ('aggregate_by_business_type', lambda ctx: analytics.aggregate_by_business_type(ctx['df'])),
+    ('compute_center_performance', lambda ctx: analytics.compute_center_performance(ctx['df'])),
+    ('PercentileIndex.from_market', lambda ctx: analytics.PercentileIndex.from_market(ctx['df'])),
+    ('compare_to_sector[percentiles]', lambda ctx: analytics.compare_to_sector(
+        ctx['latest'], ctx['sector_avg'], ctx['percentile_index'])),
+    ('PeerIndex.from_market', lambda ctx: analytics.PeerIndex.from_market(ctx['df'])),
+    ('PeerIndex.lookup', lambda ctx: ctx['peer_index'].lookup(
+        {'zona_geografica': 'Madrid', 'tipo_negocio': 'Moda', 'tamaño_m2': 280})),
+    ('SeasonalProfile', lambda ctx: analytics.SeasonalProfile(ctx['df'])),
+    ('ForecastIndex.from_market', lambda ctx: analytics.ForecastIndex.from_market(ctx['df'])),
+    ('AnomalyIndex.from_market', lambda ctx: analytics.AnomalyIndex.from_market(ctx['df'])),
+    ('MarketIndex', lambda ctx: analytics.MarketIndex(ctx['df'])),
+    ('MarketIndex.select', lambda ctx: ctx['market_index'].select(ctx['filters'])),
+    ('SketchCube', lambda ctx: analytics.SketchCube(ctx['df'])),
+    ('SketchCube.segment_table', lambda ctx: ctx['sketch_cube'].segment_table('trafico_peatonal', 'zona_geografica')),
+    ('exact_segment_table', lambda ctx: analytics.exact_segment_table(ctx['df'], 'trafico_peatonal', 'zona_geografica')),
+    ('LagTable.from_market', lambda ctx: analytics.LagTable.from_market(ctx['df'])),
+    ('DriverAnalysis', lambda ctx: analytics.DriverAnalysis(ctx['df'])),
+    ('category_rollup', lambda ctx: analytics.category_rollup(ctx['df'])),
+    ('process_center_file[csv]', lambda ctx: analytics.process_center_file(ctx['paths']['csv'], 'Benchmark', 'Urbano')),
+    ('create_kpi_chart', lambda ctx: charts.create_kpi_chart(
+        ctx['monthly_data'], ctx['sector_avg']['trafico_peatonal'], 'trafico_peatonal', 'Tráfico Peatonal', '')),
+    ('create_comparison_chart', lambda ctx: charts.create_comparison_chart(ctx['latest'], ctx['sector_avg'])),
+    ('create_category_performance_chart', lambda ctx: charts.create_category_performance_chart(
+        ctx['category_mix'], ctx['market_category_mix'])),
+    ('create_market_analysis_charts', lambda ctx: charts.create_market_analysis_charts(
+        ctx['zone_data'], ctx['business_data'], ctx['df'])),
+]
+
+
+def measure(fn, ctx, repeat):
+    """Devuelve los tiempos de cada repetición y el pico de memoria de una ejecución aparte"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(ctx)
+        times.append(time.perf_counter() - start)
+
+    # tracemalloc añade sobrecoste, por eso la memoria se mide en una pasada separada
+    tracemalloc.start()
+    try:
+        fn(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def run(sizes, repeat=3, only=None, cache_dir=None, days=DEFAULT_DAYS):
+    cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), 'harmon_bench_data')
+    os.makedirs(cache_dir, exist_ok=True)
+    results = []
+    for size in sizes:
+        ctx = build_context(dataset_paths(size, cache_dir, days))
+        for name, fn in BENCHMARKS:
+            if only and not any(pattern in name for pattern in only):
+                continue
+            times, peak = measure(fn, ctx, repeat)
+            result = {
+                'name': name,
+                'target_rows': size,
+                'rows': ctx['rows'],
+                'wall_s_min': min(times),
+                'wall_s_median': statistics.median(times),
+                'peak_memory_bytes': peak,
+                'repeat': repeat
+            }
+            results.append(result)
+            print(f"{name:<36} {ctx['rows']:>12,} filas  {result['wall_s_median'] * 1000:>10.1f} ms  "
+                  f"{peak / 2**20:>9.1f} MiB", flush=True)
+    return results
+
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    """Compara con un JSON anterior y devuelve las regresiones por encima de la tolerancia"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['name'], r['target_rows']): r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        previous = baseline.get((result['name'], result['target_rows']))
+        if previous is None or previous['wall_s_median'] <= 0:
+            continue
+        ratio = result['wall_s_median'] / previous['wall_s_median']
+        if ratio > 1 + tolerance:
+            regressions.append((result['name'], result['target_rows'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del núcleo analítico de Harmon BI")
+    parser.add_argument('--sizes', nargs='+', type=float, default=DEFAULT_SIZES,
+                        help="Tamaños aproximados en filas (admite notación 1e6)")
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help="Días por centro en los datos sintéticos")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', help="Ejecutar solo los benchmarks cuyo nombre contenga estos textos")
+    parser.add_argument('--cache-dir', help="Directorio para reutilizar los datasets generados")
+    parser.add_argument('--output', help="Ruta del JSON de resultados (por defecto benchmarks/results/<fecha>.json)")
+    parser.add_argument('--compare', help="JSON de una ejecución anterior para detectar regresiones")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Regresión permitida respecto a --compare (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes]
+    results = run(sizes, args.repeat, args.only, args.cache_dir, args.days)
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment_info(), 'results': results}, f, indent=2)
+    print(f"Resultados guardados en {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for name, rows, ratio in regressions:
+            print(f"REGRESIÓN {name} ({rows:,} filas): x{ratio:.2f}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Presupuesto de arranque en frío del dashboard.
+
+Mide tres cosas en procesos nuevos, sin cachés de módulos:
+
+* el coste de las importaciones de nivel superior de ``src/app.py``
+  (``python -X importtime``), con el detalle de los módulos más caros;
+* el tiempo hasta que ``streamlit run`` responde en ``/_stcore/health``;
+* el tiempo hasta el primer render completo del script en un intérprete
+  nuevo (importaciones + primera ejecución con ``AppTest``).
+
+Uso::
+
+    python benchmarks/cold_start.py --budget-ms 1500
+    python benchmarks/cold_start.py --server --first-render
+"""
+
+import argparse
+import ast
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, 'src')
+APP_PATH = os.path.join(SRC_DIR, 'app.py')
+
+
+def top_level_imports(path=APP_PATH):
+    """Sentencias import ejecutadas al cargar el módulo (ignora las diferidas dentro de bloques)"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def _env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = SRC_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+
+def import_profile(statements):
+    """Ejecuta las importaciones en un intérprete nuevo y devuelve (total_us, [(módulo, propio_us, acumulado_us)])"""
+    code = '\n'.join(statements)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=SRC_DIR, env=_env(),
+                          capture_output=True, text=True, check=True)
+    modules = []
+    total = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        module = (name.strip(), int(self_us), int(cumulative_us))
+        modules.append(module)
+        # Las entradas de primer nivel (sin sangría adicional) suman el coste total
+        if depth == 0:
+            total += module[2]
+    return total, modules
+
+
+def time_to_health(port, timeout=60):
+    """Arranca ``streamlit run`` y mide el tiempo hasta que el health check responde"""
+    cmd = [sys.executable, '-m', 'streamlit', 'run', APP_PATH, '--server.headless', 'true',
+           '--server.port', str(port), '--browser.gatherUsageStats', 'false']
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        url = f"http://127.0.0.1:{port}/_stcore/health"
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError("streamlit terminó antes de estar listo")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.05)
+        raise TimeoutError(f"El servidor no respondió en {timeout}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def time_to_first_render(timeout=120):
+    """Intérprete nuevo: importar Streamlit y ejecutar el script una vez hasta el final"""
+    code = (
+        "from streamlit.testing.v1 import AppTest\n"
+        f"at = AppTest.from_file({APP_PATH!r}, default_timeout={timeout})\n"
+        "at.run()\n"
+        "raise SystemExit(1 if at.exception else 0)\n"
+    )
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=_env(), check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Presupuesto de arranque en frío de Harmon BI")
+    parser.add_argument('--top', type=int, default=15, help="Módulos más caros a mostrar")
+    parser.add_argument('--budget-ms', type=float, help="Presupuesto para las importaciones de app.py")
+    parser.add_argument('--server', action='store_true', help="Medir también el arranque del servidor")
+    parser.add_argument('--first-render', action='store_true',
+                        help="Medir también el primer render en un intérprete nuevo")
+    parser.add_argument('--repeat', type=int, default=3, help="Repeticiones de cada medida (se usa la mediana)")
+    args = parser.parse_args(argv)
+
+    statements = top_level_imports()
+    profiles = [import_profile(statements) for _ in range(args.repeat)]
+    profiles.sort(key=lambda profile: profile[0])
+    total_us, modules = profiles[len(profiles) // 2]
+
+    print("Importaciones de nivel superior de app.py:")
+    for statement in statements:
+        print(f"  {statement}")
+    print(f"\nTiempo total de importación: {total_us / 1000:.1f} ms\n")
+    print(f"{'módulo':<50} {'propio (ms)':>12} {'acumulado (ms)':>15}")
+    for name, self_us, cumulative_us in sorted(modules, key=lambda m: m[1], reverse=True)[:args.top]:
+        print(f"{name:<50} {self_us / 1000:>12.1f} {cumulative_us / 1000:>15.1f}")
+
+    if args.server:
+        samples = sorted(time_to_health(_free_port()) for _ in range(args.repeat))
+        print(f"\nServidor listo (health check): {samples[len(samples) // 2] * 1000:.0f} ms")
+
+    if args.first_render:
+        samples = sorted(time_to_first_render() for _ in range(args.repeat))
+        print(f"Primer render en intérprete nuevo: {samples[len(samples) // 2] * 1000:.0f} ms")
+
+    if args.budget_ms is not None and total_us / 1000 > args.budget_ms:
+        print(f"\nLas importaciones superan el presupuesto de {args.budget_ms:.0f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
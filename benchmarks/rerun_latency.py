@@ -0,0 +1,155 @@
+"""Latencia de rerun por página usando ``streamlit.testing.v1.AppTest``.
+
+Carga ``src/app.py`` sin navegador, precarga los datos de un centro en la
+sesión, recorre cada página y mide el tiempo de cada rerun completo del
+script. Informa p50/p95 por página y puede fallar si se supera un
+presupuesto.
+
+Uso::
+
+    python benchmarks/rerun_latency.py --runs 20
+    python benchmarks/rerun_latency.py --budget-ms 1500 --page-budget Dashboard=800
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'src', 'app.py')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import analytics  # noqa: E402
+
+
+def nav_pages(app_path=APP_PATH):
+    """Páginas de la barra lateral, leídas de ``nav_options`` en app.py sin ejecutarla"""
+    with open(app_path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), app_path)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and any(getattr(t, 'id', None) == 'nav_options' for t in node.targets):
+            return list(ast.literal_eval(node.value))
+    raise RuntimeError(f"No se encontró nav_options en {app_path}")
+
+
+PAGES = nav_pages()
+DEFAULT_CENTER_FILE = analytics.INDIVIDUAL_CSV
+
+
+def percentile(values, q):
+    """Percentil con interpolación lineal (q entre 0 y 100)"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def new_app(center_data, page, dark_mode, timeout):
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.session_state['centers_data'] = {center_data['name']: center_data}
+    at.session_state['current_center'] = center_data['name']
+    at.session_state['selected_page'] = page
+    at.session_state['dark_mode'] = dark_mode
+    return at
+
+
+def measure_page(center_data, page, runs, warmup, dark_mode=False, timeout=120):
+    """Mide ``runs`` reruns de una página tras ``warmup`` ejecuciones de calentamiento"""
+    at = new_app(center_data, page, dark_mode, timeout)
+
+    start = time.perf_counter()
+    at.run()
+    first_run = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"La página '{page}' lanzó una excepción: {at.exception[0].value}")
+
+    for _ in range(warmup):
+        at.run()
+
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - start)
+
+    return {
+        'page': page,
+        'dark_mode': dark_mode,
+        'first_run_ms': first_run * 1000,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'mean_ms': statistics.mean(samples) * 1000,
+        'runs': runs
+    }
+
+
+def parse_page_budgets(items):
+    budgets = {}
+    for item in items or []:
+        page, _, value = item.partition('=')
+        if page not in PAGES or not value:
+            raise argparse.ArgumentTypeError(f"Presupuesto inválido: {item!r} (usa Página=ms)")
+        budgets[page] = float(value)
+    return budgets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latencia de rerun por página de Harmon BI")
+    parser.add_argument('--center-file', default=DEFAULT_CENTER_FILE,
+                        help="Archivo CSV/XLSX del centro que se precarga en la sesión")
+    parser.add_argument('--pages', nargs='+', choices=PAGES, default=PAGES)
+    parser.add_argument('--runs', type=int, default=10, help="Reruns medidos por página")
+    parser.add_argument('--warmup', type=int, default=2, help="Reruns de calentamiento no medidos")
+    parser.add_argument('--dark-mode', action='store_true', help="Medir también en modo oscuro")
+    parser.add_argument('--timeout', type=float, default=120, help="Timeout de cada rerun en segundos")
+    parser.add_argument('--budget-ms', type=float, help="Presupuesto p95 común a todas las páginas")
+    parser.add_argument('--page-budget', nargs='+', metavar='PÁGINA=MS',
+                        help="Presupuesto p95 específico de una página")
+    parser.add_argument('--output', help="Guardar los resultados en un JSON")
+    args = parser.parse_args(argv)
+
+    page_budgets = parse_page_budgets(args.page_budget)
+    center_name = os.path.splitext(os.path.basename(args.center_file))[0]
+    center_data, message = analytics.process_center_file(args.center_file, center_name, "Urbano")
+    if center_data is None:
+        print(f"No se pudo cargar el centro: {message}", file=sys.stderr)
+        return 2
+
+    modes = [False, True] if args.dark_mode else [False]
+    results = []
+    failures = []
+    for dark_mode in modes:
+        for page in args.pages:
+            result = measure_page(center_data, page, args.runs, args.warmup, dark_mode, args.timeout)
+            budget = page_budgets.get(page, args.budget_ms)
+            result['budget_ms'] = budget
+            result['within_budget'] = budget is None or result['p95_ms'] <= budget
+            results.append(result)
+            if not result['within_budget']:
+                failures.append(result)
+            print(f"{page:<22} {'oscuro' if dark_mode else 'claro':<7} "
+                  f"primera {result['first_run_ms']:>8.1f} ms  p50 {result['p50_ms']:>8.1f} ms  "
+                  f"p95 {result['p95_ms']:>8.1f} ms" + ('' if result['within_budget'] else f"  > {budget:.0f} ms"),
+                  flush=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'center_file': args.center_file, 'results': results}, f, indent=2)
+
+    if failures:
+        print(f"{len(failures)} página(s) superan el presupuesto de latencia", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
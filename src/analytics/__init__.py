@@ -0,0 +1,65 @@
+"""Núcleo analítico de Harmon BI sin dependencias de Streamlit.
+
+Contiene la carga de datos del mercado, las agregaciones, la ingesta de
+archivos de centros y la lógica de comparación contra el sector, de forma
+que pueda reutilizarse en procesos batch, benchmarks o pools de procesos.
+
+Los nombres públicos se importan de su submódulo la primera vez que se
+piden (``__getattr__`` del módulo): importar ``analytics`` no arrastra
+plotly, tornado ni los índices que una página concreta no usa.
+"""
+
+import importlib
+
+# Submódulo -> nombres públicos que define
+_SUBMODULES = {
+    'market': ('DATA_DIR', 'MARKET_CSV', 'INDIVIDUAL_CSV', 'COLUMNAR_DIR', 'DEFAULT_SECTOR_AVERAGES',
+        'read_market_csv', 'compute_sector_averages', 'load_market_data', 'aggregate_by_zone',
+        'aggregate_by_business_type', 'load_individual_center_data', 'compute_center_performance',
+        'compute_rankings', 'monthly_market_series'),
+    'ingest': ('REQUIRED_COLUMNS', 'read_center_file', 'build_monthly_data', 'center_profile',
+        'process_center_file'),
+    'comparison': ('METRICS_INFO', 'compare_to_sector', 'market_position_summary', 'radar_values',
+        'PercentileIndex', 'center_month_distribution'),
+    'profiling': ('Profiler', 'estimate_payload'),
+    'peers': ('PeerIndex', 'size_band'),
+    'multicenter': ('stack_centers', 'CenterMatrix'),
+    'seasonality': ('SeasonalProfile', 'MONTH_LABELS', 'WEEKDAY_LABELS'),
+    'forecast': ('FORECAST_METRICS', 'MIN_HORIZON', 'MAX_HORIZON', 'ForecastIndex', 'forecast_center'),
+    'anomalies': ('ANOMALY_WINDOW', 'ANOMALY_THRESHOLD', 'AnomalyIndex', 'robust_zscores'),
+    'alerts': ('ALERT_RULES', 'DEFAULT_THRESHOLDS', 'load_alert_rules', 'save_alert_rules', 'thresholds_for',
+        'evaluate_rules', 'AlertEngine'),
+    'filters': ('FILTER_COLUMNS', 'MarketFilters', 'make_filters', 'MarketIndex', 'MarketView'),
+    'sketches': ('TDIGEST_COMPRESSION', 'HLL_RELATIVE_ERROR', 'SEGMENT_QUANTILES', 'TDigest', 'SketchCube',
+        'exact_segment_table'),
+    'periods': ('COMPARISON_BASES', 'LagTable'),
+    'drivers': ('DRIVER_METRICS', 'TARGET_METRICS', 'DRIVER_LEVELS', 'DriverAnalysis'),
+    'categories': ('CATEGORY_COLUMN', 'SHARE_METRICS', 'category_rollup', 'category_mix',
+        'market_category_mix', 'compare_category_mix'),
+    'center_store': ('CenterStore',),
+    'cache': ('SharedCache', 'shared_cache', 'cached_market_data', 'cached_sector_averages',
+        'cached_zone_data', 'cached_business_data', 'cached_rankings', 'cached_market_series',
+        'cached_market_charts', 'cached_percentile_index', 'cached_peer_index', 'cached_seasonal_profile',
+        'cached_center_forecasts', 'cached_anomaly_index', 'cached_market_index', 'cached_sketch_cube',
+        'cached_market_lags', 'cached_driver_analysis', 'cached_individual_center_data',
+        'cached_center_performance'),
+    'watcher': ('DataWatcher', 'start_data_watcher'),
+}
+
+_EXPORTS = {name: module for module, names in _SUBMODULES.items() for name in names}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    # Las siguientes consultas ya no pasan por aquí
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
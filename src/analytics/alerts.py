@@ -0,0 +1,205 @@
+"""Reglas de alerta por umbral sobre los KPIs de los centros cargados.
+
+Los umbrales de "Configuración de Alertas" se guardan por centro en un JSON
+bajo ``src/data/.alertas`` (o ``HARMON_ALERTS_DIR``). ``AlertEngine`` los
+evalúa sobre los KPIs diarios de todos los centros a la vez: los días
+nuevos de todos los centros se concatenan en un solo frame y cada regla es
+una comparación vectorizada contra el umbral de su centro.
+
+Solo se vigilan los centros con umbrales guardados: ``DEFAULT_THRESHOLDS``
+son la propuesta inicial del formulario, no reglas activas.
+
+La evaluación es incremental: por cada centro se recuerda hasta qué día se
+evaluó y el resumen del contenido de cada mes (``month_digests``, que
+calcula la ingesta). Si los meses ya evaluados no han cambiado, únicamente
+se agregan y comprueban los días posteriores (desde el inicio del mes del
+último día evaluado, por la regla mensual de ingresos); si cambia alguno,
+se reevalúa desde ese mes, y si cambian las reglas, el centro entero. La
+comprobación compara un resumen por mes: su coste no crece con los días
+de historia.
+"""
+
+import bisect
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .anomalies import daily_center_series
+from .ingest import REQUIRED_COLUMNS, monthly_digests
+from .market import DATA_DIR
+
+DEFAULT_ALERTS_DIR = os.path.join(DATA_DIR, '.alertas')
+
+# (métrica, nombre visible, periodo evaluado); los ingresos se comparan con el total mensual
+ALERT_RULES = [
+    ('trafico_peatonal', 'Tráfico Peatonal', 'día'),
+    ('tasa_ocupacion', 'Ocupación', 'día'),
+    ('tasa_conversion', 'Conversión', 'día'),
+    ('ingresos_totales', 'Ingresos', 'mes'),
+]
+
+# Valores propuestos para un centro sin reglas guardadas; no se evalúan hasta guardarlos
+DEFAULT_THRESHOLDS = {
+    'trafico_peatonal': 2000,
+    'tasa_ocupacion': 70,
+    'tasa_conversion': 10,
+    'ingresos_totales': 1000000,
+}
+
+
+def alert_rules_path():
+    """Ruta del JSON de reglas; el directorio es configurable con HARMON_ALERTS_DIR"""
+    return os.path.join(os.environ.get('HARMON_ALERTS_DIR', DEFAULT_ALERTS_DIR), 'reglas.json')
+
+
+def load_alert_rules(path=None):
+    """Umbrales guardados por centro: {centro: {métrica: umbral}}"""
+    try:
+        with open(path or alert_rules_path(), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_alert_rules(rules, path=None):
+    """Escribe los umbrales de todos los centros de forma atómica"""
+    path = path or alert_rules_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(rules, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def thresholds_for(rules, center):
+    """Umbrales de un centro, con los valores por defecto para las reglas no guardadas"""
+    return {**DEFAULT_THRESHOLDS, **rules.get(center, {})}
+
+
+def evaluate_rules(daily, thresholds):
+    """Incumplimientos de todas las reglas sobre KPIs diarios de varios centros
+
+    ``daily`` tiene una fila por centro y día (columnas ``centro_id``,
+    ``fecha`` y los KPIs) y ``thresholds`` los umbrales de cada centro.
+    """
+    columns = ['centro', 'periodo', 'fecha', 'regla', 'metrica', 'valor', 'umbral']
+    if daily.empty:
+        return pd.DataFrame(columns=columns)
+
+    center_codes, centers = pd.factorize(daily['centro_id'])
+    months = daily['fecha'].dt.to_period('M')
+    monthly = daily.groupby([center_codes, months])['ingresos_totales'].sum()
+    frames = []
+    for metric, name, period in ALERT_RULES:
+        # Umbral de cada centro para la regla, repartido a cada fila con los códigos del centro
+        limits = np.array([thresholds[center][metric] for center in centers], dtype=float)
+        if period == 'día':
+            codes, dates, values = center_codes, daily['fecha'], daily[metric].to_numpy(dtype=float)
+        else:
+            codes = monthly.index.get_level_values(0).to_numpy()
+            dates = monthly.index.get_level_values(1).to_timestamp()
+            values = monthly.to_numpy(dtype=float)
+        breached = values < limits[codes]
+        frames.append(pd.DataFrame({
+            'centro': np.asarray(centers, dtype=object)[codes[breached]],
+            'periodo': period,
+            'fecha': np.asarray(dates)[breached],
+            'regla': f"{name} < umbral",
+            'metrica': metric,
+            'valor': values[breached],
+            'umbral': limits[codes[breached]],
+        }))
+    return pd.concat(frames, ignore_index=True)[columns]
+
+
+def _record_date(record):
+    return pd.Timestamp(record['fecha'])
+
+
+class AlertEngine:
+    """Evaluación incremental de las reglas de alerta de los centros cargados"""
+
+    def __init__(self):
+        self._state = {}    # centro -> estado de la última evaluación
+
+    def _pending_records(self, center, raw_data, digests, thresholds):
+        """Registros diarios que hay que evaluar y fecha desde la que sustituyen lo anterior"""
+        state = self._state.get(center)
+        if state is None or state['thresholds'] != thresholds or not raw_data or state['cutoff'] is None:
+            return raw_data, None
+        cutoff = state['cutoff']
+        # Los incumplimientos anteriores al corte solo valen hasta el primer mes cuyo contenido cambió
+        evaluated_months = str(cutoff.to_period('M'))
+        for month in sorted(set(state['digests']) | set(digests)):
+            if month >= evaluated_months:
+                break
+            if state['digests'].get(month) != digests.get(month):
+                cutoff = pd.Period(month, freq='M').start_time
+                break
+        kept = bisect.bisect_left(raw_data, cutoff, key=_record_date)
+        return raw_data[kept:], cutoff
+
+    def update(self, centers, rules):
+        """Evalúa los datos nuevos de cada centro y devuelve todos los incumplimientos vigentes"""
+        peek = getattr(centers, 'peek', centers.__getitem__)
+        for center in list(self._state):
+            if center not in centers or center not in rules:
+                del self._state[center]
+
+        pending = []
+        for center in centers:
+            if center not in rules:
+                continue
+            thresholds = thresholds_for(rules, center)
+            state = self._state.get(center)
+            upload_date = peek(center).get('upload_date')
+            if state is not None and state['thresholds'] == thresholds and state['upload_date'] == upload_date:
+                continue
+            raw_data = centers[center]['raw_data']
+            digests = peek(center).get('month_digests')
+            if digests is None:
+                # Centros cargados antes de que la ingesta calculara los resúmenes por mes
+                digests = monthly_digests(pd.DataFrame.from_records(raw_data, columns=REQUIRED_COLUMNS))
+            records, cutoff = self._pending_records(center, raw_data, digests, thresholds)
+            pending.append((center, records, cutoff, thresholds, upload_date, raw_data, digests))
+        if not pending:
+            return self.breaches()
+
+        # Una sola evaluación vectorizada para los tramos nuevos de todos los centros
+        frames = []
+        for center, records, *_ in pending:
+            df = pd.DataFrame.from_records(records, columns=REQUIRED_COLUMNS)
+            df['fecha'] = pd.to_datetime(df['fecha'])
+            frames.append(df.assign(centro_id=center))
+        daily = daily_center_series(pd.concat(frames, ignore_index=True))
+        new_breaches = evaluate_rules(daily, {item[0]: item[3] for item in pending})
+
+        for center, records, cutoff, thresholds, upload_date, raw_data, digests in pending:
+            breaches = new_breaches[new_breaches['centro'] == center]
+            if cutoff is not None:
+                previous = self._state[center]['breaches']
+                breaches = pd.concat([previous[previous['fecha'] < cutoff], breaches], ignore_index=True)
+            # La próxima evaluación rehace desde el inicio del mes del último día (ingresos mensuales)
+            next_cutoff = _record_date(raw_data[-1]).to_period('M').start_time if raw_data else None
+            self._state[center] = {
+                'thresholds': thresholds,
+                'upload_date': upload_date,
+                'cutoff': next_cutoff,
+                'digests': digests,
+                'evaluated_rows': len(records),
+                'breaches': breaches,
+            }
+        return self.breaches()
+
+    def evaluated_rows(self, center):
+        """Registros diarios comprobados en la última evaluación del centro"""
+        return self._state.get(center, {}).get('evaluated_rows', 0)
+
+    def breaches(self):
+        """Incumplimientos de todos los centros, los más recientes primero"""
+        frames = [state['breaches'] for state in self._state.values() if len(state['breaches'])]
+        if not frames:
+            return evaluate_rules(pd.DataFrame(), {})
+        return pd.concat(frames, ignore_index=True).sort_values('fecha', ascending=False, ignore_index=True)
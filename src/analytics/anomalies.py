@@ -0,0 +1,154 @@
+"""Detección de anomalías diarias con z-scores robustos.
+
+Para cada centro y KPI se compara el valor de cada día con la mediana de
+los ``ANOMALY_WINDOW`` días anteriores, escalada por su desviación absoluta
+mediana (MAD). Todas las series se apilan en una matriz (serie × día) y las
+ventanas móviles se ordenan de una vez con numpy, por bloques de filas para
+acotar la memoria: no hay bucles por centro ni por día.
+
+Los días marcados se guardan en un ``AnomalyIndex`` ordenado por centro y
+fecha, de modo que consultar las anomalías de un centro es un acceso a un
+diccionario más un corte del array.
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .comparison import METRIC_KEYS
+from .ingest import MONTHLY_AGGREGATIONS
+
+# Días previos que forman la ventana de referencia y mínimo de días con dato
+ANOMALY_WINDOW = 28
+MIN_PERIODS = 7
+
+# |z| a partir del cual un día se marca como anómalo (z-score modificado de Iglewicz-Hoaglin)
+ANOMALY_THRESHOLD = 3.5
+
+# Factor que hace la MAD comparable a una desviación típica en datos normales
+MAD_SCALE = 1.4826
+
+# Elementos por bloque de ventanas (filas × días × ventana) para acotar la memoria
+_BLOCK_ELEMENTS = 4_000_000
+
+
+def _window_median(windows, counts):
+    """Mediana de cada ventana ignorando NaN, a partir de las ventanas ordenadas"""
+    ordered = np.sort(windows, axis=-1)    # los NaN quedan al final
+    low = np.maximum((counts - 1) // 2, 0)[..., None]
+    high = np.maximum(counts // 2, 0)[..., None]
+    median = (np.take_along_axis(ordered, low, -1) + np.take_along_axis(ordered, high, -1))[..., 0] / 2
+    return np.where(counts > 0, median, np.nan)
+
+
+def robust_zscores(series, window=ANOMALY_WINDOW, min_periods=MIN_PERIODS):
+    """Z-score robusto de cada día frente a los ``window`` días anteriores
+
+    ``series`` tiene forma (n_series, n_días) con NaN en los días sin dato.
+    Devuelve (z, mediana) con la misma forma; z es NaN si la ventana tiene
+    menos de ``min_periods`` días o su MAD es cero.
+    """
+    n_series, n_days = series.shape
+    z = np.full((n_series, n_days), np.nan)
+    medians = np.full((n_series, n_days), np.nan)
+    padded = np.concatenate([np.full((n_series, window), np.nan), series], axis=1)
+    present = np.concatenate([np.zeros((n_series, 1)), np.cumsum(~np.isnan(padded), axis=1)], axis=1)
+    # Días con dato en la ventana [t - window, t) de cada día t
+    counts = (present[:, window:window + n_days] - present[:, :n_days]).astype(np.int64)
+
+    block = max(1, _BLOCK_ELEMENTS // max(1, n_days * window))
+    for start in range(0, n_series, block):
+        rows = slice(start, start + block)
+        windows = sliding_window_view(padded[rows], window, axis=1)[:, :n_days]
+        median = _window_median(windows, counts[rows])
+        mad = _window_median(np.abs(windows - median[..., None]), counts[rows])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            block_z = (series[rows] - median) / (MAD_SCALE * mad)
+        valid = (counts[rows] >= min_periods) & (mad > 0)
+        z[rows] = np.where(valid, block_z, np.nan)
+        medians[rows] = median
+    return z, medians
+
+
+def daily_center_series(df, id_column='centro_id'):
+    """KPIs diarios por centro con la misma agregación que los datos mensuales"""
+    return df.groupby([df[id_column], df['fecha'].dt.normalize()]).agg(MONTHLY_AGGREGATIONS).reset_index()
+
+
+class AnomalyIndex:
+    """Días anómalos de todos los centros y KPIs, ordenados por centro y fecha"""
+
+    def __init__(self, daily, metrics=METRIC_KEYS, threshold=ANOMALY_THRESHOLD, window=ANOMALY_WINDOW):
+        center_codes, self.centers = pd.factorize(daily['centro_id'], sort=True)
+        days = daily['fecha'].to_numpy(dtype='datetime64[D]')
+        first_day = days.min() if len(days) else np.datetime64('1970-01-01')
+        day_offsets = (days - first_day).astype(np.int64)
+        n_days = int(day_offsets.max()) + 1 if len(days) else 0
+
+        # Matriz (centro × KPI) × día
+        n_metrics = len(metrics)
+        panel = np.full((len(self.centers) * n_metrics, n_days), np.nan)
+        for i, metric in enumerate(metrics):
+            panel[center_codes * n_metrics + i, day_offsets] = daily[metric].to_numpy(dtype=float)
+        z, medians = robust_zscores(panel, window)
+
+        with np.errstate(invalid='ignore'):
+            rows, cols = np.nonzero(np.abs(z) >= threshold)
+        metric_names = np.asarray(metrics, dtype=object)
+        self.flags = pd.DataFrame({
+            'centro_id': np.asarray(self.centers, dtype=object)[rows // n_metrics],
+            'fecha': pd.to_datetime(first_day + cols.astype('timedelta64[D]')),
+            'metrica': metric_names[rows % n_metrics],
+            'valor': panel[rows, cols],
+            'mediana': medians[rows, cols],
+            'z': z[rows, cols],
+        })
+        self.flags['direccion'] = np.where(self.flags['z'] < 0, 'caída', 'subida')
+        # np.nonzero ordena por centro y KPI; dentro de cada centro se reordena por fecha
+        self.flags = self.flags.sort_values(['centro_id', 'fecha'], kind='stable', ignore_index=True)
+        starts = np.searchsorted(self.flags['centro_id'].to_numpy(), np.asarray(self.centers, dtype=object))
+        ends = np.append(starts[1:], len(self.flags))
+        self._slices = {center: (start, end) for center, start, end in zip(self.centers, starts, ends)}
+        self.threshold = threshold
+
+    @classmethod
+    def from_market(cls, market_df, **kwargs):
+        return cls(daily_center_series(market_df), **kwargs)
+
+    @classmethod
+    def from_center(cls, raw_data, center_name, **kwargs):
+        """Índice de un centro subido a partir de sus registros diarios"""
+        df = pd.DataFrame.from_records(raw_data)
+        df['fecha'] = pd.to_datetime(df['fecha'])
+        df['centro_id'] = center_name
+        return cls(daily_center_series(df), **kwargs)
+
+    def for_center(self, centro_id, metric=None):
+        """Días anómalos de un centro (opcionalmente de un solo KPI)"""
+        start, end = self._slices.get(centro_id, (0, 0))
+        flags = self.flags.iloc[start:end]
+        return flags if metric is None else flags[flags['metrica'] == metric]
+
+    def recent(self, limit=50, centers=None, desde=None, hasta=None):
+        """Anomalías más recientes, las más severas primero dentro de cada día
+
+        ``centers`` y el rango de fechas (inclusivo) restringen los días
+        considerados, p. ej. a los de los filtros globales del mercado.
+        """
+        flags = self.flags
+        if centers is not None:
+            flags = flags[flags['centro_id'].isin(centers)]
+        if desde is not None or hasta is not None:
+            dates = flags['fecha']
+            keep = np.ones(len(flags), dtype=bool)
+            if desde is not None:
+                keep &= (dates >= desde).to_numpy()
+            if hasta is not None:
+                keep &= (dates < pd.Timestamp(hasta) + pd.Timedelta(days=1)).to_numpy()
+            flags = flags[keep]
+        order = np.lexsort((-flags['z'].abs().to_numpy(), -flags['fecha'].to_numpy().astype(np.int64)))
+        return flags.iloc[order[:limit]]
+
+    def summary(self):
+        """Número de días anómalos por centro y KPI"""
+        return self.flags.groupby(['centro_id', 'metrica']).size().rename('dias').reset_index()
@@ -0,0 +1,207 @@
+"""API HTTP local de KPIs del mercado.
+
+Sirve los promedios del sector, las agregaciones por zona y tipo de negocio
+y el rendimiento por centro desde la misma caché compartida que usa el
+dashboard, en JSON o como stream Arrow IPC. Cada respuesta lleva un ETag
+calculado sobre su contenido, de modo que un cliente que sondea con
+``If-None-Match`` recibe un 304 sin cuerpo mientras los datos no cambien.
+
+Uso::
+
+    python -m analytics.api --port 8502
+    curl -H 'Accept: application/vnd.apache.arrow.stream' localhost:8502/api/v1/zones
+
+Dentro del dashboard se arranca en un hilo si se define ``HARMON_API_PORT``
+(y ``HARMON_API_ADDRESS`` para escuchar en otra interfaz).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+
+import pandas as pd
+import tornado.web
+
+from . import cache
+
+logger = logging.getLogger(__name__)
+
+ARROW_MIME = 'application/vnd.apache.arrow.stream'
+JSON_MIME = 'application/json; charset=utf-8'
+
+DEFAULT_API_PORT = 8502
+
+
+# Recurso -> (artefacto de la caché compartida, conversión a dict o DataFrame o None si ya lo es).
+# La conversión solo se ejecuta cuando cambia el artefacto, no en cada sondeo.
+RESOURCES = {
+    'sector': (lambda: cache.cached_market_data()[0], lambda market_data: market_data[0]),
+    'zones': (lambda: cache.cached_zone_data()[0], None),
+    'business-types': (lambda: cache.cached_business_data()[0], None),
+    'centers': (lambda: cache.cached_center_performance()[0], None),
+    'peer-groups': (lambda: cache.cached_peer_index()[0], lambda index: index.summary()),
+    'forecasts': (lambda: cache.cached_center_forecasts()[0], lambda index: index.to_frame()),
+    'anomalies': (lambda: cache.cached_anomaly_index()[0], lambda index: index.flags),
+    'period-deltas': (lambda: cache.cached_market_lags()[0], lambda table: table.to_frame()),
+    'drivers': (lambda: cache.cached_driver_analysis()[0], lambda analysis: analysis.to_frame()),
+}
+
+
+def _to_frame(value):
+    if isinstance(value, pd.DataFrame):
+        return value
+    return pd.DataFrame([value])
+
+
+def to_json_bytes(value):
+    if isinstance(value, pd.DataFrame):
+        return value.to_json(orient='records', date_format='iso', force_ascii=False).encode('utf-8')
+    return json.dumps({k: float(v) for k, v in value.items()}, ensure_ascii=False).encode('utf-8')
+
+
+def to_arrow_bytes(value):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(_to_frame(value), preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+_SERIALIZERS = {'json': (JSON_MIME, to_json_bytes), 'arrow': (ARROW_MIME, to_arrow_bytes)}
+
+
+class _BodyCache:
+    """Cuerpos serializados por (recurso, formato) mientras el artefacto cacheado sea el mismo objeto"""
+
+    def __init__(self):
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def get(self, resource, fmt, source, convert=None):
+        key = (resource, fmt)
+        with self._lock:
+            cached = self._bodies.get(key)
+        if cached is not None and cached[0] is source:
+            return cached[1], cached[2]
+        value = source if convert is None else convert(source)
+        body = _SERIALIZERS[fmt][1](value)
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        with self._lock:
+            self._bodies[key] = (source, body, etag)
+        return body, etag
+
+
+_bodies = _BodyCache()
+
+
+class KPIHandler(tornado.web.RequestHandler):
+    """GET /api/v1/<recurso>[?format=json|arrow]"""
+
+    def compute_etag(self):
+        # El ETag se fija a partir del contenido en get(); no se recalcula sobre el cuerpo
+        return None
+
+    def _format(self):
+        fmt = self.get_query_argument('format', None)
+        if fmt is None:
+            fmt = 'arrow' if ARROW_MIME in self.request.headers.get('Accept', '') else 'json'
+        if fmt not in _SERIALIZERS:
+            raise tornado.web.HTTPError(400, reason=f"Formato no soportado: {fmt}")
+        return fmt
+
+    def get(self, resource):
+        if resource not in RESOURCES:
+            raise tornado.web.HTTPError(404, reason=f"Recurso desconocido: {resource}")
+        fmt = self._format()
+        artifact, convert = RESOURCES[resource]
+        try:
+            source = artifact()
+        except Exception as e:
+            raise tornado.web.HTTPError(503, reason=f"Datos no disponibles: {e}")
+
+        body, etag = _bodies.get(resource, fmt, source, convert)
+        self.set_header('ETag', etag)
+        self.set_header('Cache-Control', 'no-cache')
+        self.set_header('Vary', 'Accept')
+        if self.check_etag_header():
+            self.set_status(304)
+            return
+        self.set_header('Content-Type', _SERIALIZERS[fmt][0])
+        self.write(body)
+
+
+class IndexHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.write({'resources': sorted(RESOURCES), 'formats': sorted(_SERIALIZERS)})
+
+
+def make_app():
+    return tornado.web.Application([
+        (r'/api/v1/?', IndexHandler),
+        (r'/api/v1/([\w-]+)', KPIHandler),
+    ])
+
+
+def _serve(port, address, started):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        make_app().listen(port, address=address)
+    except OSError as e:
+        logger.warning("No se pudo arrancar la API de KPIs en el puerto %s: %s", port, e)
+        return
+    finally:
+        started.set()
+    loop.run_forever()
+
+
+_server_thread = None
+_server_lock = threading.Lock()
+
+
+def start_api_server(port=None, address=None):
+    """Arranca la API en un hilo demonio (una vez por proceso); sin puerto usa HARMON_API_PORT"""
+    global _server_thread
+    if port is None:
+        port = os.environ.get('HARMON_API_PORT')
+        if not port:
+            return None
+    address = address or os.environ.get('HARMON_API_ADDRESS', '127.0.0.1')
+    with _server_lock:
+        if _server_thread is None:
+            started = threading.Event()
+            _server_thread = threading.Thread(target=_serve, args=(int(port), address, started),
+                                              name='harmon-kpi-api', daemon=True)
+            _server_thread.start()
+            started.wait(5)
+        return _server_thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API local de KPIs de Harmon BI")
+    parser.add_argument('--port', type=int, default=DEFAULT_API_PORT)
+    parser.add_argument('--address', default='127.0.0.1')
+    parser.add_argument('--no-watch', action='store_true', help="No vigilar cambios en src/data")
+    args = parser.parse_args(argv)
+
+    if not args.no_watch:
+        from .watcher import start_data_watcher
+        start_data_watcher()
+
+    async def serve():
+        make_app().listen(args.port, address=args.address)
+        print(f"API de KPIs en http://{args.address}:{args.port}/api/v1/", flush=True)
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    main()
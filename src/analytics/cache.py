@@ -0,0 +1,304 @@
+"""Caché compartida por todas las sesiones del proceso.
+
+Guarda los promedios del sector, las agregaciones por zona y tipo de negocio
+y el rendimiento por centro para que un único cálculo sirva a todos los
+usuarios concurrentes. Cada entrada caduca tras un TTL y se invalida en
+cuanto cambia cualquier archivo bajo ``src/data`` (tamaño o fecha de
+modificación). Las entradas instaladas para una versión de los datos (por
+el vigilante, el snapshot o el calentamiento) quedan fijadas: no caducan
+por TTL y solo las sustituye un cambio de versión.
+
+Los valores devueltos se comparten entre sesiones: no deben modificarse.
+"""
+
+import os
+import threading
+import time
+
+from .market import (
+    DATA_DIR,
+    load_market_data,
+    aggregate_by_zone,
+    aggregate_by_business_type,
+    load_individual_center_data,
+    compute_center_performance,
+    compute_rankings,
+    monthly_market_series,
+)
+from .comparison import PercentileIndex
+from .peers import PeerIndex
+from .seasonality import SeasonalProfile
+from .forecast import ForecastIndex
+from .anomalies import AnomalyIndex
+from .filters import MarketIndex
+from .sketches import SketchCube
+from .periods import LagTable
+from .drivers import DriverAnalysis
+
+# TTL por defecto en segundos; configurable con HARMON_CACHE_TTL_S
+DEFAULT_TTL_SECONDS = 600
+
+# Intervalo mínimo entre comprobaciones de cambios en disco
+VERSION_CHECK_INTERVAL = 1.0
+
+
+def cache_ttl_seconds():
+    return float(os.environ.get('HARMON_CACHE_TTL_S', DEFAULT_TTL_SECONDS))
+
+
+def fingerprint(paths):
+    """Huella (ruta, tamaño, mtime) de los archivos indicados o contenidos en los directorios"""
+    entries = []
+    for path in paths:
+        if os.path.isdir(path):
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        entries.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        elif os.path.exists(path):
+            stat = os.stat(path)
+            entries.append((path, stat.st_size, stat.st_mtime_ns))
+    return tuple(sorted(entries))
+
+
+class SharedCache:
+    """Caché en memoria, segura entre hilos, con TTL e invalidación por cambios en disco"""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._entries = {}          # clave -> (valor, versión, instante de cálculo, fijada)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._versions = {}         # rutas vigiladas -> (huella, instante de comprobación)
+        self.hits = 0
+        self.misses = 0
+        # Claves que reconstruye el vigilante de datos (ver ``watcher``): mientras lo hace se sirve su versión anterior
+        self._stale_keys = set()
+
+    def version(self, watch):
+        """Huella de las rutas vigiladas, recalculada como mucho una vez por intervalo"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._versions.get(watch)
+            if cached is not None and now - cached[1] < VERSION_CHECK_INTERVAL:
+                return cached[0]
+        current = fingerprint(watch)
+        with self._lock:
+            self._versions[watch] = (current, now)
+        return current
+
+    def _lookup(self, key, version, ttl):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, entry_version, created, pinned = entry
+        # Las entradas fijadas dependen solo de la versión de los datos, no del reloj
+        if not pinned and time.monotonic() - created > ttl:
+            return None
+        # Si la clave es del vigilante, la versión anterior sigue sirviéndose mientras él reconstruye
+        if entry_version != version and key not in self._stale_keys:
+            return None
+        return entry
+
+    def get_or_compute(self, key, compute, watch=(DATA_DIR,), ttl=None):
+        """Devuelve (valor, hit); solo un hilo calcula cada clave a la vez"""
+        ttl = ttl if ttl is not None else (self.ttl if self.ttl is not None else cache_ttl_seconds())
+        watch = tuple(watch)
+        version = self.version(watch)
+
+        with self._lock:
+            entry = self._lookup(key, version, ttl)
+            if entry is not None:
+                self.hits += 1
+                return entry[0], True
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Otro hilo pudo completar el cálculo mientras esperábamos
+            with self._lock:
+                entry = self._lookup(key, version, ttl)
+                if entry is not None:
+                    self.hits += 1
+                    return entry[0], True
+            value = compute()
+            with self._lock:
+                self._entries[key] = (value, version, time.monotonic(), False)
+                self.misses += 1
+            return value, False
+
+    def put(self, key, value, watch=(DATA_DIR,)):
+        """Inserta un valor ya calculado para la versión actual de los datos"""
+        self.put_many({key: value}, self.version(tuple(watch)))
+
+    def put_many(self, values, version, pinned=True):
+        """Sustituye varias claves a la vez, de forma atómica para los lectores
+
+        Por defecto quedan fijadas a ``version``: no caducan por TTL.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key, value in values.items():
+                self._entries[key] = (value, version, now, pinned)
+
+    def pin(self, watch=(DATA_DIR,)):
+        """Fija las entradas calculadas para la versión actual de los datos; devuelve cuántas"""
+        version = self.version(tuple(watch))
+        with self._lock:
+            current = {key: (value, entry_version, created, True)
+                       for key, (value, entry_version, created, _) in self._entries.items()
+                       if entry_version == version}
+            self._entries.update(current)
+        return len(current)
+
+    def serve_stale(self, keys, enabled=True):
+        """Permite (o deja de permitir) servir la versión anterior de estas claves tras un cambio en disco"""
+        with self._lock:
+            if enabled:
+                self._stale_keys.update(keys)
+            else:
+                self._stale_keys.difference_update(keys)
+
+    def invalidate(self, key=None):
+        """Elimina una clave o toda la caché"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._versions.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+# Instancia única del proceso, compartida por todas las sesiones
+shared_cache = SharedCache()
+
+
+def _watch(csv_path):
+    return (DATA_DIR,) if csv_path is None else (os.path.abspath(csv_path),)
+
+
+def cached_market_data(csv_path=None):
+    """(promedios del sector, DataFrame del mercado), hit"""
+    return shared_cache.get_or_compute(('market_data', csv_path),
+                                       lambda: load_market_data(csv_path), _watch(csv_path))
+
+
+def cached_sector_averages(csv_path=None):
+    (sector_avg, _), hit = cached_market_data(csv_path)
+    return sector_avg, hit
+
+
+def cached_zone_data(csv_path=None):
+    return shared_cache.get_or_compute(('zone_data', csv_path),
+                                       lambda: aggregate_by_zone(cached_market_data(csv_path)[0][1]),
+                                       _watch(csv_path))
+
+
+def cached_business_data(csv_path=None):
+    return shared_cache.get_or_compute(('business_data', csv_path),
+                                       lambda: aggregate_by_business_type(cached_market_data(csv_path)[0][1]),
+                                       _watch(csv_path))
+
+
+def cached_rankings(csv_path=None):
+    return shared_cache.get_or_compute(('rankings', csv_path),
+                                       lambda: compute_rankings(cached_zone_data(csv_path)[0],
+                                                                cached_business_data(csv_path)[0]),
+                                       _watch(csv_path))
+
+
+def cached_market_series(csv_path=None):
+    return shared_cache.get_or_compute(('market_series', csv_path),
+                                       lambda: monthly_market_series(cached_market_data(csv_path)[0][1]),
+                                       _watch(csv_path))
+
+
+def cached_percentile_index(csv_path=None):
+    """Índice de percentiles por KPI sobre la distribución de centros del mercado"""
+    return shared_cache.get_or_compute(('percentile_index', csv_path),
+                                       lambda: PercentileIndex.from_market(cached_market_data(csv_path)[0][1]),
+                                       _watch(csv_path))
+
+
+def cached_peer_index(csv_path=None):
+    """Índice de grupos de pares (zona × tipo de negocio × banda de tamaño)"""
+    return shared_cache.get_or_compute(('peer_index', csv_path),
+                                       lambda: PeerIndex.from_market(cached_market_data(csv_path)[0][1]),
+                                       _watch(csv_path))
+
+
+def cached_seasonal_profile(csv_path=None):
+    """Índices estacionales por mes y día de la semana de cada KPI y segmento"""
+    return shared_cache.get_or_compute(('seasonal_profile', csv_path),
+                                       lambda: SeasonalProfile(cached_market_data(csv_path)[0][1]),
+                                       _watch(csv_path))
+
+
+def cached_center_forecasts(csv_path=None):
+    """Pronósticos de los KPIs de todos los centros del mercado"""
+    return shared_cache.get_or_compute(('center_forecasts', csv_path),
+                                       lambda: ForecastIndex.from_market(cached_market_data(csv_path)[0][1],
+                                                                         cached_seasonal_profile(csv_path)[0]),
+                                       _watch(csv_path))
+
+
+def cached_anomaly_index(csv_path=None):
+    """Días anómalos de todos los centros del mercado y KPIs"""
+    return shared_cache.get_or_compute(('anomaly_index', csv_path),
+                                       lambda: AnomalyIndex.from_market(cached_market_data(csv_path)[0][1]),
+                                       _watch(csv_path))
+
+
+def cached_market_index(csv_path=None):
+    """Datos del mercado ordenados por fecha con bitmaps para los filtros globales"""
+    return shared_cache.get_or_compute(('market_index', csv_path),
+                                       lambda: MarketIndex(cached_market_data(csv_path)[0][1]),
+                                       _watch(csv_path))
+
+
+def cached_sketch_cube(csv_path=None):
+    """Sketches (t-digest y HyperLogLog) por zona × tipo de negocio × mes para el modo aproximado"""
+    return shared_cache.get_or_compute(('sketch_cube', csv_path),
+                                       lambda: SketchCube(cached_market_data(csv_path)[0][1]),
+                                       _watch(csv_path))
+
+
+def cached_market_lags(csv_path=None):
+    """Tabla de retardos alineados (MoM, QoQ, YoY) de los KPIs mensuales de cada centro del mercado"""
+    return shared_cache.get_or_compute(('market_lags', csv_path),
+                                       lambda: LagTable.from_market(cached_market_data(csv_path)[0][1]),
+                                       _watch(csv_path))
+
+
+def cached_driver_analysis(csv_path=None):
+    """Correlaciones y regresiones de los KPIs por zona y tipo de negocio"""
+    return shared_cache.get_or_compute(('driver_analysis', csv_path),
+                                       lambda: DriverAnalysis(cached_market_data(csv_path)[0][1]),
+                                       _watch(csv_path))
+
+
+def market_charts(dark_mode=False, csv_path=None):
+    """Figuras de la vista de mercado construidas desde los agregados cacheados"""
+    from .charts import create_market_analysis_charts
+
+    sector_and_df, _ = cached_market_data(csv_path)
+    return create_market_analysis_charts(cached_zone_data(csv_path)[0], cached_business_data(csv_path)[0],
+                                         sector_and_df[1], dark_mode=dark_mode,
+                                         rankings=cached_rankings(csv_path)[0])
+
+
+def cached_market_charts(dark_mode=False, csv_path=None):
+    """Figuras de mercado por tema; las comparten todas las sesiones y no deben modificarse"""
+    return shared_cache.get_or_compute(('market_charts', bool(dark_mode), csv_path),
+                                       lambda: market_charts(dark_mode, csv_path), _watch(csv_path))
+
+
+def cached_individual_center_data(csv_path=None):
+    return shared_cache.get_or_compute(('individual_center_data', csv_path),
+                                       lambda: load_individual_center_data(csv_path), _watch(csv_path))
+
+
+def cached_center_performance(csv_path=None):
+    return shared_cache.get_or_compute(('center_performance', csv_path),
+                                       lambda: compute_center_performance(cached_individual_center_data(csv_path)[0]),
+                                       _watch(csv_path))
@@ -0,0 +1,66 @@
+"""Mix de categorías (tipo de negocio) de un centro frente al mercado.
+
+Al procesar el archivo de un centro se acumulan, en una sola pasada sobre
+las filas diarias, los ingresos, el tráfico y los días de cada tipo de
+negocio. Ese resumen es aditivo y de tamaño fijo (una fila por tipo), así
+que las cuotas se obtienen sin volver a leer ``raw_data`` aunque los datos
+diarios se hayan volcado a disco. El mix del mercado sale de la agregación
+por tipo de negocio ya cacheada, con las mismas columnas.
+"""
+
+import numpy as np
+import pandas as pd
+
+CATEGORY_COLUMN = 'tipo_negocio'
+
+# Suma acumulada -> cuota (%) que se deriva de ella
+SHARE_METRICS = {
+    'ingresos_totales': 'cuota_ingresos',
+    'trafico_peatonal': 'cuota_trafico',
+}
+
+# Columnas de la agregación del mercado por tipo de negocio equivalentes a las sumas
+_MARKET_COLUMNS = {'ingresos (€)': 'ingresos_totales', 'afluencia': 'trafico_peatonal'}
+
+
+def category_rollup(df):
+    """Sumas de ingresos y tráfico y días por tipo de negocio; None si el archivo no trae la columna"""
+    if CATEGORY_COLUMN not in df.columns or df[CATEGORY_COLUMN].isna().all():
+        return None
+    codes, categories = pd.factorize(df[CATEGORY_COLUMN], sort=True)
+    valid = codes >= 0
+    codes = codes[valid]
+    rollup = pd.DataFrame({CATEGORY_COLUMN: np.asarray(categories, dtype=object)})
+    for metric in SHARE_METRICS:
+        values = pd.to_numeric(df[metric], errors='coerce').to_numpy(dtype=float)[valid]
+        rollup[metric] = np.bincount(codes, np.nan_to_num(values), len(categories))
+    rollup['dias'] = np.bincount(codes, minlength=len(categories))
+    return rollup.to_dict('records')
+
+
+def category_mix(rollup):
+    """Cuotas (%) de ingresos y tráfico de cada tipo de negocio a partir de sus sumas"""
+    mix = pd.DataFrame.from_records(rollup, columns=[CATEGORY_COLUMN, *SHARE_METRICS])
+    for metric, share in SHARE_METRICS.items():
+        total = mix[metric].sum()
+        mix[share] = mix[metric] / total * 100 if total > 0 else np.nan
+    return mix.sort_values('ingresos_totales', ascending=False, ignore_index=True)
+
+
+def market_category_mix(business_data):
+    """Mix del mercado con el mismo formato, desde la agregación por tipo de negocio"""
+    rollup = business_data[[CATEGORY_COLUMN, *_MARKET_COLUMNS]].rename(columns=_MARKET_COLUMNS)
+    return category_mix(rollup.to_dict('records'))
+
+
+def compare_category_mix(center_mix, market_mix):
+    """Cuotas del centro y del mercado por tipo de negocio y su diferencia en puntos"""
+    shares = list(SHARE_METRICS.values())
+    comparison = center_mix[[CATEGORY_COLUMN, *shares]].merge(
+        market_mix[[CATEGORY_COLUMN, *shares]], on=CATEGORY_COLUMN, how='outer', suffixes=('', '_mercado')
+    )
+    # Un tipo ausente en un lado tiene cuota 0, no desconocida
+    comparison = comparison.fillna(0.0)
+    for share in shares:
+        comparison[f"diferencia_{share}"] = comparison[share] - comparison[f"{share}_mercado"]
+    return comparison.sort_values(shares[0], ascending=False, ignore_index=True)
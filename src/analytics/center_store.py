@@ -0,0 +1,222 @@
+"""Almacén de centros por sesión con presupuesto de memoria.
+
+Los datos diarios (``raw_data``) de los centros menos usados recientemente
+se vuelcan a Parquet en un directorio temporal cuando la sesión supera su
+presupuesto, y se recargan de forma transparente al volver a acceder a
+ellos. El centro activo nunca se vuelca.
+
+El presupuesto también cuenta los resultados derivados que la app guarda en
+cada centro (pronóstico, anomalías, variaciones por periodo, mix de
+categorías). Se miden en cada acceso y se descartan al volcar el centro:
+se recalculan bajo demanda.
+"""
+
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+import numpy as np
+import pandas as pd
+
+# Presupuesto por sesión; configurable con HARMON_SESSION_MEMORY_MB
+DEFAULT_MEMORY_BUDGET_MB = 256
+
+_SIZE_SAMPLE = 200
+
+# Resultados derivados que la app guarda en cada centro y recalcula si faltan
+DERIVED_KEYS = ('forecast', 'anomalies', 'lags', 'category_mix')
+
+
+def memory_budget_bytes():
+    """Presupuesto de memoria por sesión en bytes"""
+    return int(float(os.environ.get('HARMON_SESSION_MEMORY_MB', DEFAULT_MEMORY_BUDGET_MB)) * 2**20)
+
+
+def estimate_records_size(records):
+    """Estima los bytes de una lista de registros midiendo una muestra y extrapolando"""
+    if not records:
+        return sys.getsizeof(records)
+    sample = records[:_SIZE_SAMPLE]
+    sample_size = sum(sys.getsizeof(record) + sum(sys.getsizeof(v) for v in record.values())
+                      for record in sample)
+    return sys.getsizeof(records) + sample_size * len(records) // len(sample)
+
+
+def estimate_value_size(value, _seen=None):
+    """Estima los bytes de un resultado derivado: frames y arrays por su buffer, el resto por sus elementos"""
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        # Las vistas comparten el buffer de su array base: se cuenta una sola vez
+        return estimate_value_size(value.base, seen) if isinstance(value.base, np.ndarray) else value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_value_size(item, seen) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        sample = value[:_SIZE_SAMPLE]
+        sample_size = sum(estimate_value_size(item, seen) for item in sample)
+        return sys.getsizeof(value) + (sample_size * len(value) // len(sample) if sample else 0)
+    if hasattr(value, '__dict__'):
+        return sys.getsizeof(value) + estimate_value_size(vars(value), seen)
+    return sys.getsizeof(value)
+
+
+def estimate_derived_size(center_data):
+    """Bytes estimados de los resultados derivados guardados en un centro"""
+    return sum(estimate_value_size(center_data[key]) for key in DERIVED_KEYS if key in center_data)
+
+
+class CenterStore(MutableMapping):
+    """Diccionario de centros con expulsión LRU de ``raw_data`` a disco"""
+
+    def __init__(self, budget_bytes=None, spill_dir=None):
+        self.budget_bytes = memory_budget_bytes() if budget_bytes is None else budget_bytes
+        self._centers = OrderedDict()   # nombre -> center_data (raw_data puede estar en disco)
+        self._sizes = {}                # nombre -> bytes estimados de raw_data en memoria
+        self._derived = {}              # nombre -> bytes estimados de los resultados derivados
+        self._spilled = {}              # nombre -> ruta del Parquet
+        self._spill_dir = spill_dir
+        self._owns_spill_dir = spill_dir is None
+        self._finalizer = None
+        self._file_ids = itertools.count()
+        self.active = None
+
+    @classmethod
+    def from_mapping(cls, mapping, budget_bytes=None):
+        store = cls(budget_bytes)
+        for name, center_data in mapping.items():
+            store[name] = center_data
+        return store
+
+    # -- MutableMapping --------------------------------------------------
+
+    def __getitem__(self, name):
+        center_data = self._centers[name]
+        if name in self._spilled:
+            self._reload(name)
+        self._centers.move_to_end(name)
+        self._enforce_budget()
+        return center_data
+
+    def __setitem__(self, name, center_data):
+        if name in self._spilled:
+            os.remove(self._spilled.pop(name))
+        self._centers[name] = center_data
+        self._centers.move_to_end(name)
+        self._sizes[name] = estimate_records_size(center_data.get('raw_data', []))
+        self._enforce_budget()
+
+    def __delitem__(self, name):
+        del self._centers[name]
+        self._sizes.pop(name, None)
+        self._derived.pop(name, None)
+        if name in self._spilled:
+            os.remove(self._spilled.pop(name))
+
+    def __contains__(self, name):
+        return name in self._centers
+
+    def __iter__(self):
+        return iter(list(self._centers))
+
+    def __len__(self):
+        return len(self._centers)
+
+    # -- Estado ------------------------------------------------------------
+
+    def memory_bytes(self):
+        """Bytes estimados de ``raw_data`` y de los resultados derivados que siguen en memoria"""
+        return sum(self._sizes.values()) + sum(self._derived.values())
+
+    def is_spilled(self, name):
+        return name in self._spilled
+
+    def spilled_count(self):
+        return len(self._spilled)
+
+    def peek(self, name):
+        """Datos del centro sin recargar ``raw_data`` ni alterar el orden de uso"""
+        return self._centers[name]
+
+    def raw_frame(self, name):
+        """Datos diarios del centro como DataFrame; si está en disco se leen del Parquet sin recargarlo"""
+        if name in self._spilled:
+            return pd.read_parquet(self._spilled[name])
+        return pd.DataFrame.from_records(self._centers[name]['raw_data'])
+
+    def record_count(self, name):
+        """Número de registros diarios sin recargar el centro si está en disco"""
+        center_data = self._centers[name]
+        if name in self._spilled:
+            return center_data['raw_data_rows']
+        return len(center_data['raw_data'])
+
+    # -- Expulsión y recarga -----------------------------------------------
+
+    def _ensure_spill_dir(self):
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='harmon_spill_')
+        os.makedirs(self._spill_dir, exist_ok=True)
+        if self._owns_spill_dir and self._finalizer is None:
+            # Borrar los volcados cuando la sesión (y su almacén) desaparece
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        return self._spill_dir
+
+    def _spill(self, name):
+        center_data = self._centers[name]
+        path = os.path.join(self._ensure_spill_dir(), f"centro_{next(self._file_ids)}.parquet")
+        raw_data = center_data.pop('raw_data')
+        pd.DataFrame.from_records(raw_data).to_parquet(path, index=False)
+        center_data['raw_data_rows'] = len(raw_data)
+        self._spilled[name] = path
+        self._sizes.pop(name, None)
+        self._drop_derived(name)
+
+    def _drop_derived(self, name):
+        center_data = self._centers[name]
+        for key in DERIVED_KEYS:
+            center_data.pop(key, None)
+        self._derived.pop(name, None)
+
+    def _reload(self, name):
+        center_data = self._centers[name]
+        path = self._spilled.pop(name)
+        center_data['raw_data'] = pd.read_parquet(path).to_dict('records')
+        center_data.pop('raw_data_rows', None)
+        os.remove(path)
+        self._sizes[name] = estimate_records_size(center_data['raw_data'])
+
+    def _enforce_budget(self):
+        """Vuelca los centros menos usados (excepto el activo) hasta respetar el presupuesto"""
+        # Los helpers de la app añaden resultados derivados después de cada acceso: se miden aquí
+        self._derived = {name: estimate_derived_size(center_data) for name, center_data in self._centers.items()}
+        for name in list(self._centers):
+            if self.memory_bytes() <= self.budget_bytes:
+                break
+            if name == self.active:
+                continue
+            if name in self._spilled:
+                # Resultados recalculados sobre un centro ya volcado (p. ej. a partir de ``peek``)
+                self._drop_derived(name)
+                continue
+            # El más reciente se conserva aunque supere el presupuesto por sí solo
+            if name == next(reversed(self._centers)):
+                break
+            self._spill(name)
+
+    def close(self):
+        """Elimina los volcados en disco de este almacén"""
+        if self._finalizer is not None:
+            self._finalizer()
@@ -0,0 +1,700 @@
+"""Constructores de gráficas Plotly del dashboard.
+
+Las funciones reciben los datos ya calculados y el modo claro/oscuro como
+argumento, de forma que pueden construirse y medirse fuera de una sesión de
+Streamlit.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from .comparison import METRIC_KEYS
+from .market import compute_rankings
+
+# 🎨 Paleta de colores simplificada - Azul y Blanco
+# Esquema de color centrado en azul #2563eb con gradientes
+COLORS = {
+    'primary': '#2563eb',      # Azul principal
+    'primary_light': '#3b82f6', # Azul claro
+    'primary_dark': '#1d4ed8',  # Azul oscuro
+    'secondary': '#1e40af',     # Azul secundario
+    'accent': '#60a5fa',        # Azul acento
+    'success': '#10b981',       # Verde para éxito
+    'warning': '#f59e0b',       # Ámbar para advertencias
+    'error': '#ef4444',         # Rojo para errores
+    'neutral': '#6b7280',       # Gris neutro
+    'light': '#9ca3af'          # Gris claro
+}
+
+# Paleta específica para gráficas - Solo gradientes de azul
+CHART_COLORS = [
+    '#2563eb',  # Azul principal
+    '#3b82f6',  # Azul medio
+    '#60a5fa',  # Azul claro
+    '#1d4ed8',  # Azul oscuro
+    '#1e40af',  # Azul secundario
+    '#93c5fd'   # Azul muy claro
+]
+
+# Temas de la app: modo claro (False) y oscuro (True)
+CHART_THEMES = (False, True)
+
+# Función para crear gráfica de KPIs mejorada
+def create_kpi_chart(data, sector_avg, metric_name, title, unit, dark_mode=False, forecast=None, anomalies=None):
+    if not data:
+        return go.Figure().add_annotation(text="No hay datos disponibles", 
+                                        xref="paper", yref="paper", 
+                                        x=0.5, y=0.5, showarrow=False)
+    
+    fig = go.Figure()
+    
+    # Convertir fechas a formato datetime para mejor visualización
+    dates = pd.to_datetime([d['fecha'] for d in data])
+    values = [d[metric_name] for d in data]
+    
+    # Datos del centro con área sombreada
+    fig.add_trace(go.Scatter(
+        x=dates,
+        y=values,
+        mode='lines+markers',
+        name='Tu Centro',
+        line=dict(color=COLORS['primary'], width=3),
+        marker=dict(size=8, color=COLORS['primary']),
+        fill='tonexty',
+        fillcolor='rgba(37, 99, 235, 0.1)'
+    ))
+    
+    # Promedio del sector
+    fig.add_hline(
+        y=sector_avg,
+        line_dash="dash",
+        line_color="orange",
+        line_width=2,
+        annotation_text=f"Promedio Sector: {sector_avg:.1f}{unit}",
+        annotation_position="top right",
+        annotation_font_color="orange"
+    )
+    
+    # Meses con días anómalos: anillo rojo sobre el punto mensual con el detalle de cada día
+    if anomalies is not None and len(anomalies):
+        month_values = {d['fecha']: value for d, value in zip(data, values)}
+        flagged = anomalies.assign(
+            mes=anomalies['fecha'].dt.strftime('%Y-%m'),
+            detalle=(anomalies['fecha'].dt.strftime('%d/%m') + ": " + anomalies['direccion']
+                     + " (z=" + anomalies['z'].map('{:+.1f}'.format) + ")")
+        )
+        flagged = flagged[flagged['mes'].isin(month_values.keys())]
+        details = flagged.groupby('mes')['detalle'].agg("<br>".join)
+        fig.add_trace(go.Scatter(
+            x=pd.to_datetime(details.index),
+            y=[month_values[month] for month in details.index],
+            mode='markers',
+            name='Días anómalos',
+            marker=dict(size=16, color='rgba(0,0,0,0)', line=dict(color=COLORS['error'], width=3)),
+            hovertext=details.tolist(),
+            hoverinfo='text'
+        ))
+    
+    # Proyección: línea discontinua desde el último mes real y banda de confianza
+    if forecast:
+        forecast_dates = pd.to_datetime([f['fecha'] for f in forecast])
+        bounds = [(f['inferior'], f['superior']) for f in forecast if pd.notna(f['inferior'])]
+        if len(bounds) == len(forecast):
+            fig.add_trace(go.Scatter(
+                x=list(forecast_dates) + list(forecast_dates[::-1]),
+                y=[high for _, high in bounds] + [low for low, _ in bounds[::-1]],
+                fill='toself',
+                fillcolor='rgba(37, 99, 235, 0.12)',
+                line=dict(width=0),
+                hoverinfo='skip',
+                name='Intervalo 80%'
+            ))
+        fig.add_trace(go.Scatter(
+            x=[dates[-1], *forecast_dates],
+            y=[values[-1], *[f['pronostico'] for f in forecast]],
+            mode='lines+markers',
+            name='Proyección',
+            line=dict(color=COLORS['primary'], width=2, dash='dot'),
+            marker=dict(size=6, color=COLORS['primary'], symbol='circle-open')
+        ))
+    
+    # Calcular tendencia
+    if len(values) > 1:
+        trend = (values[-1] - values[0]) / values[0] * 100
+        trend_color = "green" if trend > 0 else "red"
+        fig.add_annotation(
+            text=f"Tendencia: {trend:+.1f}%",
+            xref="paper", yref="paper",
+            x=0.02, y=0.98,
+            showarrow=False,
+            font=dict(color=trend_color, size=12)
+        )
+    
+    # Configurar colores según el modo
+    title_color = "#ffffff" if dark_mode else "#2c3e50"
+    bg_color = '#2d2d30' if dark_mode else 'rgba(0,0,0,0)'
+    axis_text_color = '#ffffff' if dark_mode else '#1f2937'
+    
+    fig.update_layout(
+        title=dict(text=title, font=dict(size=16, color=title_color)),
+        xaxis_title="Fecha",
+        yaxis_title=f"{title} ({unit})",
+        xaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
+        yaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
+        template="plotly_dark" if dark_mode else "plotly_white",
+        height=350,
+        margin=dict(l=0, r=0, t=60, b=0),
+        hovermode='x unified',
+        showlegend=True,
+        plot_bgcolor=bg_color,
+        paper_bgcolor=bg_color
+    )
+    
+    return fig
+
+# Función para crear gráfica de comparación mejorada
+def create_comparison_chart(center_data, sector_avg, dark_mode=False):
+    metrics = ['trafico_peatonal', 'ventas_por_m2', 'tasa_ocupacion', 
+               'tiempo_permanencia', 'tasa_conversion', 'ingresos_totales']
+    
+    metric_names = ['Tráfico Peatonal', 'Ventas/m²', 'Ocupación', 
+                   'Tiempo Permanencia', 'Conversión', 'Ingresos']
+    
+    center_values = []
+    sector_values = []
+    performance = []
+    
+    for metric in metrics:
+        if center_data:
+            center_val = center_data[metric]
+            center_values.append(center_val)
+            # Calcular rendimiento relativo
+            perf = (center_val / sector_avg[metric] - 1) * 100
+            performance.append(perf)
+        else:
+            center_values.append(0)
+            performance.append(-100)
+        sector_values.append(sector_avg[metric])
+    
+    fig = go.Figure()
+    
+    # Crear colores basados en el rendimiento - Solo azules
+    colors = [COLORS['primary'] if p > 0 else COLORS['accent'] for p in performance]
+    
+    fig.add_trace(go.Bar(
+        name='Tu Centro',
+        x=metric_names,
+        y=center_values,
+        marker_color=colors,
+        text=[f"{p:+.1f}%" for p in performance],
+        textposition='auto',
+        textfont=dict(color='#ffffff' if dark_mode else '#212529', size=10)
+    ))
+    
+    fig.add_trace(go.Bar(
+        name='Promedio Sector',
+        x=metric_names,
+        y=sector_values,
+        marker_color='rgba(100, 116, 139, 0.7)',  # Gris azulado para contraste
+        opacity=0.7
+    ))
+    
+    # Configurar colores según el modo
+    title_color = "#ffffff" if dark_mode else "#2c3e50"
+    bg_color = '#2d2d30' if dark_mode else 'rgba(0,0,0,0)'
+    axis_text_color = '#ffffff' if dark_mode else '#1f2937'
+    
+    fig.update_layout(
+        title=dict(text="Comparación vs. Promedio del Sector", 
+                  font=dict(size=16, color=title_color)),
+        xaxis=dict(tickfont=dict(color=axis_text_color)),
+        yaxis=dict(tickfont=dict(color=axis_text_color)),
+        template="plotly_dark" if dark_mode else "plotly_white",
+        height=450,
+        barmode='group',
+        xaxis_tickangle=-45,
+        hovermode='x unified',
+        showlegend=True,
+        plot_bgcolor=bg_color,
+        paper_bgcolor=bg_color
+    )
+    
+    return fig
+
+# Categorías del radar en el orden de comparison.METRICS_INFO
+RADAR_CATEGORIES = ['Tráfico', 'Ventas/m²', 'Ocupación', 'Tiempo', 'Conversión', 'Ingresos']
+
+
+# Función para crear la gráfica de radar centro vs mercado
+def create_radar_chart(center_values, sector_values, dark_mode=False):
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatterpolar(
+        r=center_values,
+        theta=RADAR_CATEGORIES,
+        fill='toself',
+        name='Tu Centro',
+        line=dict(color='#2563eb', width=3),
+        marker=dict(size=8, color='#2563eb'),
+        fillcolor='rgba(37, 99, 235, 0.2)'
+    ))
+
+    fig.add_trace(go.Scatterpolar(
+        r=sector_values,
+        theta=RADAR_CATEGORIES,
+        fill='toself',
+        name='Mediana Mercado (P50)',
+        line=dict(color='#64748b', width=2),
+        marker=dict(size=6, color='#64748b'),
+        fillcolor='rgba(100, 116, 139, 0.15)'
+    ))
+
+    title_color = "#ffffff" if dark_mode else "#2c3e50"
+    axis_text_color = '#ffffff' if dark_mode else '#1f2937'
+
+    # Configurar colores de fondo
+    bg_color = '#2d2d30' if dark_mode else 'rgba(0,0,0,0)'
+    grid_color = 'rgba(255,255,255,0.1)' if dark_mode else 'rgba(0,0,0,0.1)'
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 100],
+                tickfont=dict(color=axis_text_color),
+                gridcolor=grid_color,
+                linecolor=axis_text_color
+            ),
+            angularaxis=dict(
+                tickfont=dict(color=axis_text_color, size=12),
+                linecolor=axis_text_color,
+                gridcolor=grid_color
+            ),
+            bgcolor=bg_color
+        ),
+        showlegend=True,
+        legend=dict(
+            orientation="v",
+            yanchor="top",
+            y=0.95,
+            xanchor="left",
+            x=1.02,
+            font=dict(color=axis_text_color, size=12)
+        ),
+        title=dict(text="Comparación de Rendimiento vs Mercado",
+                   font=dict(size=16, color=title_color)),
+        template="plotly_dark" if dark_mode else "plotly_white",
+        height=500,
+        plot_bgcolor=bg_color,
+        paper_bgcolor=bg_color,
+        font=dict(color=axis_text_color)
+    )
+
+    return fig
+
+# Función para crear el mapa de calor centros × KPIs frente al sector
+def create_center_heatmap(matrix, dark_mode=False):
+    deltas = matrix.deltas
+    # Texto de cada celda: valor del centro y desviación frente al sector
+    text = [[f"{value:,.1f}<br>{delta:+.1f}%" for value, delta in zip(values_row, deltas_row)]
+            for values_row, deltas_row in zip(matrix.values.tolist(), deltas.tolist())]
+    limit = max(float(np.nanmax(np.abs(deltas))) if np.isfinite(deltas).any() else 0.0, 1.0)
+    
+    fig = go.Figure(go.Heatmap(
+        z=deltas,
+        x=RADAR_CATEGORIES,
+        y=matrix.centers,
+        text=text,
+        texttemplate="%{text}",
+        colorscale=[[0, COLORS['error']], [0.5, '#f8fafc'], [1, COLORS['primary']]],
+        zmin=-limit,
+        zmax=limit,
+        colorbar=dict(title="% vs sector")
+    ))
+    
+    title_color = "#ffffff" if dark_mode else "#2c3e50"
+    bg_color = '#2d2d30' if dark_mode else 'rgba(0,0,0,0)'
+    axis_text_color = '#ffffff' if dark_mode else '#1f2937'
+    
+    fig.update_layout(
+        title=dict(text="Último Mes vs Sector (% de desviación)", font=dict(size=16, color=title_color)),
+        template="plotly_dark" if dark_mode else "plotly_white",
+        height=max(300, 60 * len(matrix.centers) + 120),
+        xaxis=dict(tickfont=dict(color=axis_text_color), side='top'),
+        yaxis=dict(tickfont=dict(color=axis_text_color), autorange='reversed'),
+        plot_bgcolor=bg_color,
+        paper_bgcolor=bg_color
+    )
+    
+    return fig
+
+# Función para crear las pequeñas gráficas de cada KPI con una línea por centro
+def create_center_small_multiples(matrix, dark_mode=False):
+    # Importación diferida: solo la vista de comparación usa subplots
+    from plotly.subplots import make_subplots
+    
+    fig = make_subplots(rows=2, cols=3, subplot_titles=RADAR_CATEGORIES, vertical_spacing=0.15)
+    
+    for i, metric in enumerate(METRIC_KEYS):
+        row, col = i // 3 + 1, i % 3 + 1
+        series = matrix.series(metric)
+        for j, center in enumerate(matrix.centers):
+            fig.add_trace(go.Scatter(
+                x=series.index,
+                y=series[center],
+                mode='lines+markers',
+                name=center,
+                legendgroup=center,
+                showlegend=(i == 0),
+                line=dict(color=CHART_COLORS[j % len(CHART_COLORS)], width=2),
+                marker=dict(size=5)
+            ), row=row, col=col)
+        fig.add_hline(y=matrix.sector[i], line_dash="dash", line_color="orange", line_width=1, row=row, col=col)
+    
+    title_color = "#ffffff" if dark_mode else "#2c3e50"
+    bg_color = '#2d2d30' if dark_mode else 'rgba(0,0,0,0)'
+    axis_text_color = '#ffffff' if dark_mode else '#1f2937'
+    
+    fig.update_layout(
+        title=dict(text="Evolución Mensual por KPI (línea discontinua: sector)", font=dict(size=16, color=title_color)),
+        template="plotly_dark" if dark_mode else "plotly_white",
+        height=600,
+        legend=dict(font=dict(color=axis_text_color)),
+        plot_bgcolor=bg_color,
+        paper_bgcolor=bg_color
+    )
+    fig.update_xaxes(tickfont=dict(color=axis_text_color))
+    fig.update_yaxes(tickfont=dict(color=axis_text_color))
+    
+    return fig
+
+# Función para crear el mapa de calor de correlaciones entre KPIs de un segmento
+def create_correlation_heatmap(correlations, title="Correlación entre KPIs", dark_mode=False):
+    labels = dict(zip(METRIC_KEYS, RADAR_CATEGORIES))
+    names = [labels.get(metric, metric) for metric in correlations.columns]
+    values = correlations.to_numpy()
+    
+    fig = go.Figure(go.Heatmap(
+        z=values,
+        x=names,
+        y=names,
+        text=[[f"{value:.2f}" for value in row] for row in values.tolist()],
+        texttemplate="%{text}",
+        colorscale=[[0, COLORS['error']], [0.5, '#f8fafc'], [1, COLORS['primary']]],
+        zmin=-1,
+        zmax=1,
+        colorbar=dict(title="r")
+    ))
+    
+    title_color = "#ffffff" if dark_mode else "#2c3e50"
+    bg_color = '#2d2d30' if dark_mode else 'rgba(0,0,0,0)'
+    axis_text_color = '#ffffff' if dark_mode else '#1f2937'
+    
+    fig.update_layout(
+        title=dict(text=title, font=dict(size=16, color=title_color)),
+        template="plotly_dark" if dark_mode else "plotly_white",
+        height=450,
+        xaxis=dict(tickfont=dict(color=axis_text_color), side='top'),
+        yaxis=dict(tickfont=dict(color=axis_text_color), autorange='reversed'),
+        plot_bgcolor=bg_color,
+        paper_bgcolor=bg_color
+    )
+    
+    return fig
+
+# Función para crear gráfica de rendimiento por categorías
+def create_category_performance_chart(center_mix, market_mix=None, share='cuota_ingresos', dark_mode=False):
+    """Cuotas por tipo de negocio del centro y, si se da, del mercado en dos anillos con los mismos colores"""
+    from plotly.subplots import make_subplots
+    
+    mixes = [("Tu centro", center_mix)] + ([("Mercado", market_mix)] if market_mix is not None else [])
+    categories = sorted(set().union(*(mix['tipo_negocio'] for _, mix in mixes)))
+    colors = {category: CHART_COLORS[i % len(CHART_COLORS)] for i, category in enumerate(categories)}
+    text_color = '#ffffff' if dark_mode else '#1f2937'
+    
+    fig = make_subplots(rows=1, cols=len(mixes), specs=[[{"type": "domain"}] * len(mixes)],
+                        subplot_titles=[label for label, _ in mixes])
+    for col, (label, mix) in enumerate(mixes, start=1):
+        fig.add_trace(go.Pie(
+            labels=mix['tipo_negocio'],
+            values=mix[share],
+            name=label,
+            hole=0.4,
+            sort=False,
+            marker=dict(colors=[colors[category] for category in mix['tipo_negocio']]),
+            textinfo='label+percent',
+            hovertemplate="%{label}: %{value:.1f}%<extra>" + label + "</extra>"
+        ), row=1, col=col)
+    
+    # Configurar colores según el modo
+    title_color = "#ffffff" if dark_mode else "#2c3e50"
+    bg_color = '#2d2d30' if dark_mode else 'rgba(0,0,0,0)'
+    title = "Cuota de ingresos" if share == 'cuota_ingresos' else "Cuota de tráfico"
+    
+    fig.update_layout(
+        title=dict(text=f"Distribución por Categorías · {title}", 
+                  font=dict(size=16, color=title_color)),
+        template="plotly_dark" if dark_mode else "plotly_white",
+        height=400,
+        showlegend=True,
+        legend=dict(
+            orientation="v",
+            yanchor="middle",
+            y=0.5,
+            xanchor="left",
+            x=1.01,
+            font=dict(color=text_color)
+        ),
+        plot_bgcolor=bg_color,
+        paper_bgcolor=bg_color
+    )
+    fig.update_annotations(font=dict(color=text_color))
+    
+    # Update pie chart text colors
+    fig.update_traces(
+        textfont=dict(size=12, color=text_color)
+    )
+    
+    return fig
+
+# Función para crear gráficas de análisis del mercado
+def create_market_analysis_charts(zone_data, business_data, market_df, dark_mode=False, rankings=None):
+    """Crea gráficas útiles basadas en datos reales del mercado"""
+    # Importación diferida: plotly.subplots no se necesita para el resto de gráficas
+    from plotly.subplots import make_subplots
+
+    charts = {}
+
+    # 1. Ventas por Zona Geográfica
+    if zone_data is not None:
+        fig_zones = go.Figure()
+        fig_zones.add_trace(go.Bar(
+            x=zone_data['zona_geografica'],
+            y=zone_data['ingresos (€)'],
+            name='Ventas por Zona',
+            marker_color=CHART_COLORS,
+            text=[f"{v:,.0f}€" for v in zone_data['ingresos (€)']],
+            textposition='auto',
+            textfont=dict(color='#ffffff' if dark_mode else '#212529', size=12)
+        ))
+
+        # Configurar colores según el modo
+        title_color = "#ffffff" if dark_mode else "#2c3e50"
+        axis_text_color = '#ffffff' if dark_mode else '#1f2937'
+        fig_zones.update_layout(
+            title=dict(text="💰 Ventas Totales por Zona Geográfica", font=dict(size=16, color=title_color)),
+            xaxis_title="Zona Geográfica",
+            yaxis_title="Ventas Totales (€)",
+             xaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
+             yaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
+             template="plotly_dark" if dark_mode else "plotly_white",
+             height=400,
+             plot_bgcolor='#2d2d30' if dark_mode else 'rgba(0,0,0,0)',
+             paper_bgcolor='#2d2d30' if dark_mode else 'rgba(0,0,0,0)'
+        )
+        charts['ventas_zonas'] = fig_zones
+
+    # 2. Ocupación por m² por Zona
+    if zone_data is not None:
+        fig_ocupacion = go.Figure()
+        fig_ocupacion.add_trace(go.Bar(
+            x=zone_data['zona_geografica'],
+            y=zone_data['ocupacion_por_m2'],
+            name='Ocupación por m²',
+            marker_color=CHART_COLORS,
+            text=[f"{v:.1f}%" for v in zone_data['ocupacion_por_m2']],
+            textposition='auto',
+            textfont=dict(color='#ffffff' if dark_mode else '#212529', size=12)
+        ))
+
+        # Configurar colores según el modo
+        title_color = "#ffffff" if dark_mode else "#2c3e50"
+        axis_text_color = '#ffffff' if dark_mode else '#1f2937'
+        fig_ocupacion.update_layout(
+            title=dict(text="🏢 Tasa de Ocupación por Zona Geográfica", font=dict(size=16, color=title_color)),
+            xaxis_title="Zona Geográfica",
+            yaxis_title="Tasa de Ocupación (%)",
+             xaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
+             yaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
+             template="plotly_dark" if dark_mode else "plotly_white",
+             height=400,
+             plot_bgcolor='#2d2d30' if dark_mode else 'rgba(0,0,0,0)',
+             paper_bgcolor='#2d2d30' if dark_mode else 'rgba(0,0,0,0)'
+        )
+        charts['ocupacion_zonas'] = fig_ocupacion
+
+    # 3. Comparación por Tipo de Negocio
+    if business_data is not None:
+        fig_business = make_subplots(
+            rows=1, cols=2,
+            subplot_titles=('Ventas por Tipo de Negocio', 'Visitantes por Tipo de Negocio'),
+            specs=[[{"type": "bar"}, {"type": "bar"}]]
+        )
+
+        # Ventas por tipo de negocio
+        fig_business.add_trace(
+            go.Bar(
+                x=business_data['tipo_negocio'],
+                y=business_data['ingresos (€)'],
+                name='Ventas',
+                marker_color=['#2563eb', '#3b82f6', '#60a5fa'],
+                text=[f"{v:,.0f}€" for v in business_data['ingresos (€)']],
+                textposition='auto',
+                textfont=dict(color='#ffffff' if dark_mode else '#212529', size=12)
+            ),
+            row=1, col=1
+        )
+
+        # Visitantes por tipo de negocio
+        fig_business.add_trace(
+            go.Bar(
+                x=business_data['tipo_negocio'],
+                y=business_data['afluencia'],
+                name='Visitantes',
+                marker_color=['#1d4ed8', '#1e40af', '#93c5fd'],
+                text=[f"{v:,.0f}" for v in business_data['afluencia']],
+                textposition='auto',
+                textfont=dict(color='#ffffff' if dark_mode else '#212529', size=12)
+            ),
+            row=1, col=2
+        )
+
+        # Configurar colores según el modo
+        title_color = "#ffffff" if dark_mode else "#2c3e50"
+        axis_text_color = '#ffffff' if dark_mode else '#1f2937'
+
+        fig_business.update_layout(
+            title=dict(text="🎯 Análisis por Tipo de Negocio", font=dict(size=16, color=title_color)),
+            template="plotly_dark" if dark_mode else "plotly_white",
+            height=400,
+            showlegend=False,
+            plot_bgcolor='#2d2d30' if dark_mode else 'rgba(0,0,0,0)',
+            paper_bgcolor='#2d2d30' if dark_mode else 'rgba(0,0,0,0)',
+            # Configurar colores de ejes para ambos subplots
+            xaxis=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color)),
+            yaxis=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color)),
+            xaxis2=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color)),
+            yaxis2=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color))
+        )
+        charts['business_comparison'] = fig_business
+
+    # 4. Top Performers (Ranking)
+    if zone_data is not None and business_data is not None:
+        fig_ranking = make_subplots(
+            rows=2, cols=1,
+            subplot_titles=('🏆 Top Zonas por Rendimiento', '🎯 Top Tipos de Negocio por Ocupación'),
+            specs=[[{"type": "bar"}], [{"type": "bar"}]]
+        )
+
+        # Rankings precalculados (caché o snapshot) o calculados al vuelo
+        if rankings is None:
+            rankings = compute_rankings(zone_data, business_data)
+
+        # Ranking de zonas por ventas
+        zone_sorted = rankings['zonas']
+        fig_ranking.add_trace(
+            go.Bar(
+                y=zone_sorted['zona_geografica'],
+                x=zone_sorted['ingresos (€)'],
+                orientation='h',
+                name='Ventas por Zona',
+                 marker_color='#2563eb',
+                text=[f"{v:,.0f}€" for v in zone_sorted['ingresos (€)']],
+                textposition='auto',
+                textfont=dict(color='#ffffff' if dark_mode else '#212529', size=12)
+            ),
+            row=1, col=1
+        )
+
+        # Ranking de tipos de negocio por ocupación
+        business_sorted = rankings['tipos_negocio']
+        fig_ranking.add_trace(
+            go.Bar(
+                y=business_sorted['tipo_negocio'],
+                x=business_sorted['ocupacion_por_m2'],
+                orientation='h',
+                name='Ocupación por Tipo',
+                 marker_color='#3b82f6',
+                text=[f"{v:.1f}%" for v in business_sorted['ocupacion_por_m2']],
+                textposition='auto',
+                textfont=dict(color='#ffffff' if dark_mode else '#212529', size=12)
+            ),
+            row=2, col=1
+        )
+
+        # Configurar colores según el modo
+        title_color = "#ffffff" if dark_mode else "#2c3e50"
+        axis_text_color = '#ffffff' if dark_mode else '#1f2937'
+
+        fig_ranking.update_layout(
+            title=dict(text="📊 Rankings de Rendimiento", font=dict(size=16, color=title_color)),
+            template="plotly_dark" if dark_mode else "plotly_white",
+            height=600,
+            margin=dict(t=100),
+            showlegend=False,
+            plot_bgcolor='#2d2d30' if dark_mode else 'rgba(0,0,0,0)',
+            paper_bgcolor='#2d2d30' if dark_mode else 'rgba(0,0,0,0)',
+            # Configurar colores de ejes para ambos subplots
+            xaxis=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color)),
+            yaxis=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color)),
+            xaxis2=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color)),
+            yaxis2=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color)),
+            # Configurar colores de títulos de subplots
+            annotations=[
+                dict(text="🏆 Top Zonas por Rendimiento", x=0.5, y=1.05, xref="paper", yref="paper", 
+                     showarrow=False, font=dict(size=14, color=title_color)),
+                dict(text="🎯 Top Tipos de Negocio por Ocupación", x=0.5, y=0.45, xref="paper", yref="paper", 
+                     showarrow=False, font=dict(size=14, color=title_color))
+            ]
+        )
+        charts['rankings'] = fig_ranking
+
+    # 5. Análisis de Eficiencia (Ventas vs Visitantes)
+    if market_df is not None:
+        fig_efficiency = go.Figure()
+
+        # Scatter plot por zona y tipo de negocio
+        colors_map = {
+                        'Madrid': '#60a5fa',           # Azul claro
+                        'Cataluña': '#93c5fd',         # Azul muy claro
+                        'Norte': '#2563eb',            # Azul principal
+                        'Sur': '#3b82f6',              # Azul medio
+                        'Castilla-La Mancha': '#1e40af', # Azul oscuro
+                        'León': '#64748b'              # Gris azulado suave
+                    }
+
+        for zona in market_df['zona_geografica'].unique():
+            data_zona = market_df[market_df['zona_geografica'] == zona]
+            fig_efficiency.add_trace(go.Scatter(
+                x=data_zona['trafico_peatonal'],
+                y=data_zona['ingresos_totales'],
+                mode='markers',
+                name=zona,
+                marker=dict(
+                    size=data_zona['tasa_ocupacion']/3,  # Tamaño basado en ocupación
+                    color=colors_map.get(zona, '#999999'),
+                    opacity=0.7
+                ),
+                text=[f"{zona}<br>Tipo: {tipo}<br>Ocupación: {ocup:.1f}%" 
+                      for tipo, ocup in zip(data_zona['tipo_negocio'], data_zona['tasa_ocupacion'])],
+                hovertemplate='%{text}<br>Visitantes: %{x}<br>Ventas: %{y:,.0f}€<extra></extra>'
+            ))
+
+        # Configurar colores según el modo
+        title_color = "#ffffff" if dark_mode else "#2c3e50"
+        axis_text_color = '#ffffff' if dark_mode else '#1f2937'
+        fig_efficiency.update_layout(
+            title=dict(text="⚡ Eficiencia: Ventas vs Visitantes (tamaño = ocupación)", font=dict(size=16, color=title_color)),
+            xaxis_title="Visitantes",
+            yaxis_title="Ventas (€)",
+             xaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
+             yaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
+             template="plotly_dark" if dark_mode else "plotly_white",
+             height=500,
+             plot_bgcolor='#2d2d30' if dark_mode else 'rgba(0,0,0,0)',
+             paper_bgcolor='#2d2d30' if dark_mode else 'rgba(0,0,0,0)'
+        )
+        charts['efficiency'] = fig_efficiency
+
+    return charts
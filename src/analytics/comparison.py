@@ -0,0 +1,110 @@
+"""Comparación del rendimiento de un centro contra el promedio del sector."""
+
+import numpy as np
+
+from .ingest import MONTHLY_AGGREGATIONS
+
+# (métrica, nombre visible, unidad) en el orden usado por "Análisis vs Mercado"
+METRICS_INFO = [
+    ('trafico_peatonal', 'Tráfico Peatonal', 'visitantes/día'),
+    ('ventas_por_m2', 'Ventas por m²', '€/m²/mes'),
+    ('tasa_ocupacion', 'Tasa de Ocupación', '%'),
+    ('tiempo_permanencia', 'Tiempo Permanencia', 'minutos'),
+    ('tasa_conversion', 'Tasa de Conversión', '%'),
+    ('ingresos_totales', 'Ingresos Totales', '€/mes')
+]
+
+
+# Claves de las métricas en el mismo orden que METRICS_INFO
+METRIC_KEYS = [metric for metric, _, _ in METRICS_INFO]
+
+
+def center_month_distribution(market_df):
+    """KPIs mensuales de cada centro del mercado, con la misma agregación que los datos subidos"""
+    month = market_df['fecha'].dt.to_period('M').rename('mes')
+    return market_df.groupby([market_df['centro_id'], month]).agg(MONTHLY_AGGREGATIONS).reset_index()
+
+
+class PercentileIndex:
+    """Distribución ordenada de cada KPI entre todos los centros-mes del mercado
+
+    Los valores de todas las métricas se guardan en un único array plano,
+    ordenado por tramos (uno por métrica). ``ranks`` hace un ``searchsorted``
+    por tramo: O(log n) por métrica y valor consultado.
+    """
+
+    def __init__(self, distribution):
+        segments = [np.sort(distribution[metric].dropna().to_numpy(dtype=float)) for metric in METRIC_KEYS]
+        self.sizes = np.array([len(segment) for segment in segments])
+        self.ends = np.cumsum(self.sizes)
+        self.starts = self.ends - self.sizes
+        self.values = np.concatenate(segments) if segments else np.empty(0)
+
+    @classmethod
+    def from_market(cls, market_df):
+        return cls(center_month_distribution(market_df))
+
+    def _search(self, targets, side):
+        # searchsorted sobre el tramo ordenado de cada métrica; targets tiene forma (..., n_métricas)
+        positions = np.empty(targets.shape, dtype=np.intp)
+        for j, (start, end) in enumerate(zip(self.starts, self.ends)):
+            positions[..., j] = np.searchsorted(self.values[start:end], targets[..., j], side=side)
+        return positions
+
+    def ranks(self, values):
+        """Percentil (0-100) de cada valor en su métrica; ``values`` tiene forma (..., n_métricas)"""
+        targets = np.asarray(values, dtype=float)
+        below = self._search(targets, 'left')
+        through = self._search(targets, 'right')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Los empates cuentan a medias: la mediana del mercado queda en el percentil 50
+            ranks = (below + through) / 2 / self.sizes * 100
+        return np.where((self.sizes > 0) & ~np.isnan(targets), ranks, np.nan)
+
+
+def metric_vector(data):
+    """Valores de las métricas de un registro mensual en el orden de METRICS_INFO"""
+    return np.array([data.get(metric, 0) for metric in METRIC_KEYS], dtype=float)
+
+
+def compare_to_sector(latest_data, sector_avg, percentile_index=None):
+    """Rendimiento relativo (%) y percentil de cada métrica del centro frente al sector"""
+    center_values = metric_vector(latest_data)
+    sector_values = metric_vector(sector_avg)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        performance = np.where(sector_values > 0, (center_values / sector_values - 1) * 100, 0.0)
+    percentiles = (percentile_index.ranks(center_values) if percentile_index is not None
+                   else np.full(len(METRIC_KEYS), np.nan))
+    return [
+        {
+            'metric': name,
+            'center_value': center_value,
+            'sector_value': sector_value,
+            'performance': perf,
+            'percentile': None if np.isnan(pct) else pct,
+            'unit': unit
+        }
+        for (_, name, unit), center_value, sector_value, perf, pct
+        in zip(METRICS_INFO, center_values.tolist(), sector_values.tolist(), performance.tolist(),
+               percentiles.tolist())
+    ]
+
+
+def market_position_summary(comparison_metrics):
+    """Resume el posicionamiento del centro: score, métricas superiores, promedio y mejor métrica"""
+    superior = [m for m in comparison_metrics if m['performance'] > 0]
+    market_score = (sum(abs(m['performance']) for m in superior) / len(superior)) if superior else 0
+    avg_performance = sum(m['performance'] for m in comparison_metrics) / len(comparison_metrics)
+    return {
+        'market_score': market_score,
+        'superior_count': len(superior),
+        'total_count': len(comparison_metrics),
+        'avg_performance': avg_performance,
+        'best_metric': max(comparison_metrics, key=lambda x: x['performance'])
+    }
+
+
+def radar_values(latest_data, percentile_index):
+    """Percentiles del centro (0-100) y la mediana del mercado (50) para el radar"""
+    center_values = np.nan_to_num(percentile_index.ranks(metric_vector(latest_data)), nan=0.0)
+    return center_values.tolist(), [50.0] * len(METRIC_KEYS)
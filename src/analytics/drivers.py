@@ -0,0 +1,164 @@
+"""Análisis de impulsores de los KPIs por segmento del mercado.
+
+¿Cuánto explican el tiempo de permanencia y el tráfico peatonal la tasa de
+conversión y las ventas por m² en cada zona o tipo de negocio? Una sola
+pasada sobre las filas diarias acumula, por celda zona × tipo de negocio,
+el recuento, las sumas y los productos cruzados de todos los KPIs (centrados
+en la media global para no perder precisión). Los demás segmentos (solo
+zona, solo tipo, mercado completo) suman esos momentos, y de ellos salen a
+la vez, para todos los segmentos, las matrices de correlación y las
+regresiones lineales de cada objetivo sobre los impulsores.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .comparison import METRIC_KEYS
+
+DRIVER_METRICS = ['tiempo_permanencia', 'trafico_peatonal']
+TARGET_METRICS = ['tasa_conversion', 'ventas_por_m2']
+
+# Niveles de segmentación, del mercado completo al cruce zona × tipo
+DRIVER_LEVELS = [
+    (),
+    ('zona_geografica',),
+    ('tipo_negocio',),
+    ('zona_geografica', 'tipo_negocio'),
+]
+
+# Filas mínimas para ajustar una regresión (un grado de libertad residual)
+MIN_SEGMENT_ROWS = len(DRIVER_METRICS) + 2
+
+
+def segment_moments(market_df, metrics=METRIC_KEYS):
+    """Momentos de los KPIs en cada celda zona × tipo de negocio
+
+    Devuelve (celdas, n, sumas, productos, desplazamiento): las celdas como
+    frame, los momentos centrados con formas (g,), (g, p) y (g, p, p) y la
+    media global restada. Las filas con algún KPI vacío se descartan.
+    """
+    values = market_df[metrics].to_numpy(dtype=float)
+    valid = ~np.isnan(values).any(axis=1)
+    values = values[valid]
+    zone_codes, zones = pd.factorize(market_df['zona_geografica'].to_numpy()[valid], sort=True)
+    type_codes, types = pd.factorize(market_df['tipo_negocio'].to_numpy()[valid], sort=True)
+    cells, codes = np.unique(zone_codes * len(types) + type_codes, return_inverse=True)
+    n_cells, n_metrics = len(cells), len(metrics)
+
+    # Centrado global: los productos cruzados se acumulan sobre valores pequeños
+    shift = values.mean(axis=0) if len(values) else np.zeros(n_metrics)
+    centered = values - shift
+    n = np.bincount(codes, minlength=n_cells).astype(float)
+    sums = np.stack([np.bincount(codes, centered[:, j], n_cells) for j in range(n_metrics)], axis=1)
+    products = np.empty((n_cells, n_metrics, n_metrics))
+    for a in range(n_metrics):
+        for b in range(a, n_metrics):
+            products[:, a, b] = products[:, b, a] = np.bincount(codes, centered[:, a] * centered[:, b], n_cells)
+    segments = pd.DataFrame({'zona_geografica': np.asarray(zones, dtype=object)[cells // max(1, len(types))],
+                             'tipo_negocio': np.asarray(types, dtype=object)[cells % max(1, len(types))]})
+    return segments, n, sums, products, shift
+
+
+def moments_to_statistics(n, sums, products, shift):
+    """Medias y covarianzas (ddof=1) a partir de momentos centrados acumulados"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / n[:, None]
+        covariance = (products - n[:, None, None] * means[:, :, None] * means[:, None, :]) / (n - 1)[:, None, None]
+    return means + shift, covariance
+
+
+class DriverAnalysis:
+    """Correlaciones y regresiones de los objetivos sobre los impulsores en cada segmento"""
+
+    def __init__(self, market_df, metrics=METRIC_KEYS, drivers=DRIVER_METRICS, targets=TARGET_METRICS):
+        self.metrics = list(metrics)
+        self.drivers = list(drivers)
+        self.targets = list(targets)
+        cells, n, sums, products, shift = segment_moments(market_df, self.metrics)
+
+        # Momentos de cada segmento de cada nivel sumando las celdas base
+        frames, counts, segment_sums, segment_products = [], [], [], []
+        for level in DRIVER_LEVELS:
+            if level:
+                codes = cells.groupby(list(level), sort=True).ngroup().to_numpy()
+                keys = cells[list(level)].drop_duplicates().sort_values(list(level))
+                keys = list(keys.itertuples(index=False, name=None))
+            else:
+                codes, keys = np.zeros(len(cells), dtype=np.intp), [()]
+            n_segments = len(keys)
+            counts.append(np.bincount(codes, n, n_segments))
+            level_sums = np.zeros((n_segments, len(self.metrics)))
+            np.add.at(level_sums, codes, sums)
+            level_products = np.zeros((n_segments, len(self.metrics), len(self.metrics)))
+            np.add.at(level_products, codes, products)
+            segment_sums.append(level_sums)
+            segment_products.append(level_products)
+            frames.append(pd.DataFrame({
+                'nivel': [" × ".join(level) if level else "mercado"] * n_segments,
+                'zona_geografica': [dict(zip(level, key)).get('zona_geografica') for key in keys],
+                'tipo_negocio': [dict(zip(level, key)).get('tipo_negocio') for key in keys],
+            }))
+        self.segments = pd.concat(frames, ignore_index=True)
+        self.n = np.concatenate(counts)
+        self.means, self.covariance = moments_to_statistics(self.n, np.concatenate(segment_sums),
+                                                            np.concatenate(segment_products), shift)
+        self.segments['filas'] = self.n.astype(int)
+
+        std = np.sqrt(np.diagonal(self.covariance, axis1=1, axis2=2))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.correlations = self.covariance / (std[:, :, None] * std[:, None, :])
+        self._fit(std)
+        self._positions = {
+            (zone, business): i for i, (zone, business)
+            in enumerate(zip(self.segments['zona_geografica'], self.segments['tipo_negocio']))
+        }
+
+    def _fit(self, std):
+        """Regresión de cada objetivo sobre los impulsores en todos los segmentos a la vez"""
+        x = [self.metrics.index(metric) for metric in self.drivers]
+        y = [self.metrics.index(metric) for metric in self.targets]
+        cov_xx = self.covariance[:, x][:, :, x]
+        cov_xy = self.covariance[:, x][:, :, y]
+        fittable = (self.n >= MIN_SEGMENT_ROWS) & np.isfinite(cov_xx).all(axis=(1, 2))
+        slopes = np.full((len(self.n), len(x), len(y)), np.nan)
+        # pinv tolera impulsores constantes o colineales dentro de un segmento
+        slopes[fittable] = np.linalg.pinv(cov_xx[fittable]) @ cov_xy[fittable]
+        explained = np.einsum('gxy,gxy->gy', slopes, cov_xy)
+        var_y = np.diagonal(self.covariance, axis1=1, axis2=2)[:, y]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.r2 = np.where(var_y > 0, explained / var_y, np.nan)
+            self.standardized = slopes * std[:, x, None] / std[:, None, y]
+        self.slopes = slopes
+        self.intercepts = self.means[:, y] - np.einsum('gxy,gx->gy', slopes, self.means[:, x])
+
+    def _segment(self, zona=None, tipo=None):
+        return self._positions.get((zona, tipo))
+
+    def correlation_matrix(self, zona=None, tipo=None):
+        """Matriz de correlación de los KPIs en un segmento (None = todas las zonas o tipos)"""
+        i = self._segment(zona, tipo)
+        if i is None:
+            return None
+        return pd.DataFrame(self.correlations[i], index=self.metrics, columns=self.metrics)
+
+    def regressions(self, level=()):
+        """Una fila por segmento del nivel y objetivo: filas, R², intercepto, pendientes y coeficientes beta"""
+        name = " × ".join(level) if level else "mercado"
+        rows = np.flatnonzero(self.segments['nivel'].to_numpy() == name)
+        frames = []
+        for j, target in enumerate(self.targets):
+            frame = self.segments.iloc[rows][list(level) + ['filas']].reset_index(drop=True)
+            frame.insert(len(level), 'objetivo', target)
+            frame['r2'] = self.r2[rows, j]
+            frame['intercepto'] = self.intercepts[rows, j]
+            for k, driver in enumerate(self.drivers):
+                frame[f"pendiente_{driver}"] = self.slopes[rows, k, j]
+                frame[f"beta_{driver}"] = self.standardized[rows, k, j]
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
+
+    def to_frame(self):
+        """Regresiones de todos los niveles en formato largo"""
+        frames = [self.regressions(level).assign(nivel=" × ".join(level) if level else "mercado")
+                  for level in DRIVER_LEVELS]
+        return pd.concat(frames, ignore_index=True)
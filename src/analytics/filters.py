@@ -0,0 +1,204 @@
+"""Filtros indexados del mercado por zona, tipo de negocio y rango de fechas.
+
+``MarketIndex`` guarda los datos del mercado ordenados por fecha y, para
+cada valor de ``zona_geografica`` y ``tipo_negocio``, un bitmap empaquetado
+(un bit por fila) construido una sola vez a partir de los códigos
+categóricos. Resolver un filtro no recorre el frame completo:
+
+* el rango de fechas se convierte en un tramo [inicio, fin) de filas con
+  dos ``searchsorted`` sobre las fechas ordenadas;
+* los valores elegidos de cada dimensión se combinan con OR de sus bitmaps,
+  las dimensiones entre sí con AND, y solo se desempaqueta el tramo de
+  fechas.
+
+Los agregados de cada combinación de filtros (``MarketView``) se calculan
+bajo demanda y se guardan en una LRU acotada dentro del propio índice, que
+se sustituye entero cuando cambian los datos.
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .comparison import PercentileIndex
+from .market import (
+    compute_sector_averages,
+    aggregate_by_zone,
+    aggregate_by_business_type,
+    compute_rankings,
+)
+from .seasonality import SeasonalProfile
+from .drivers import DriverAnalysis
+
+FILTER_COLUMNS = ['zona_geografica', 'tipo_negocio']
+
+# Combinaciones de filtros cuyos agregados se conservan por índice
+MAX_CACHED_VIEWS = 32
+
+# Zonas y tipos elegidos (tuplas ordenadas; vacías = todos) y fechas inclusivas (None = sin límite)
+MarketFilters = namedtuple('MarketFilters', ['zonas', 'tipos', 'desde', 'hasta'], defaults=((), (), None, None))
+
+
+def make_filters(zonas=(), tipos=(), desde=None, hasta=None):
+    """Filtros normalizados (y hashables) a partir de la selección del usuario"""
+    return MarketFilters(tuple(sorted(zonas)), tuple(sorted(tipos)),
+                         None if desde is None else pd.Timestamp(desde).normalize(),
+                         None if hasta is None else pd.Timestamp(hasta).normalize())
+
+
+class MarketView:
+    """Agregados del mercado para un subconjunto filtrado, calculados la primera vez que se piden"""
+
+    def __init__(self, market_df):
+        self.df = market_df
+        self._values = {}
+        # Reentrante: las figuras y los rankings se construyen a partir de otros agregados memoizados
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.df)
+
+    def _memo(self, name, compute):
+        with self._lock:
+            if name not in self._values:
+                self._values[name] = compute()
+            return self._values[name]
+
+    @property
+    def centers(self):
+        """Centros presentes en el subconjunto"""
+        return self._memo('centers', lambda: pd.unique(self.df['centro_id']))
+
+    @property
+    def sector_avg(self):
+        return self._memo('sector_avg', lambda: compute_sector_averages(self.df))
+
+    @property
+    def zone_data(self):
+        return self._memo('zone_data', lambda: aggregate_by_zone(self.df))
+
+    @property
+    def business_data(self):
+        return self._memo('business_data', lambda: aggregate_by_business_type(self.df))
+
+    @property
+    def rankings(self):
+        return self._memo('rankings', lambda: compute_rankings(self.zone_data, self.business_data))
+
+    @property
+    def percentile_index(self):
+        return self._memo('percentile_index', lambda: PercentileIndex.from_market(self.df))
+
+    @property
+    def seasonal_profile(self):
+        return self._memo('seasonal_profile', lambda: SeasonalProfile(self.df))
+
+    @property
+    def drivers(self):
+        return self._memo('drivers', lambda: DriverAnalysis(self.df))
+
+    def charts(self, dark_mode=False):
+        """Figuras de la vista de mercado para el subconjunto, una versión por tema"""
+        from .charts import create_market_analysis_charts
+
+        return self._memo(('charts', bool(dark_mode)), lambda: create_market_analysis_charts(
+            self.zone_data, self.business_data, self.df, dark_mode=dark_mode, rankings=self.rankings))
+
+
+class MarketIndex:
+    """Datos del mercado ordenados por fecha con bitmaps por zona y tipo de negocio"""
+
+    def __init__(self, market_df):
+        dates = market_df['fecha'].to_numpy(dtype='datetime64[ns]')
+        if len(dates) > 1 and not (dates[1:] >= dates[:-1]).all():
+            order = np.argsort(dates, kind='stable')
+            market_df = market_df.iloc[order].reset_index(drop=True)
+            dates = dates[order]
+        # Si ya venía ordenado se reutiliza el mismo frame, sin copia
+        self.df = market_df
+        self.dates = dates
+
+        self.options = {}
+        self.bitmaps = {}
+        for column in FILTER_COLUMNS:
+            codes, values = pd.factorize(market_df[column], sort=True)
+            self.options[column] = list(values)
+            # Una fila de bits por valor: bit i activo si la fila i tiene ese valor
+            self.bitmaps[column] = np.packbits(codes[None, :] == np.arange(len(values))[:, None], axis=1)
+        self._positions = {column: {value: i for i, value in enumerate(values)}
+                           for column, values in self.options.items()}
+
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Las vistas cacheadas y el lock no viajan en el snapshot
+        return {key: value for key, value in self.__dict__.items() if key not in ('_views', '_lock')}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+
+    def date_range(self):
+        """Primera y última fecha de los datos"""
+        if not len(self.dates):
+            return None, None
+        return pd.Timestamp(self.dates[0]), pd.Timestamp(self.dates[-1])
+
+    def is_active(self, filters):
+        """True si los filtros excluyen alguna fila respecto al mercado completo"""
+        first, last = self.date_range()
+        return bool(filters.zonas or filters.tipos
+                    or (filters.desde is not None and first is not None and filters.desde > first)
+                    or (filters.hasta is not None and last is not None and filters.hasta < last.normalize()))
+
+    def _row_span(self, filters):
+        start = 0 if filters.desde is None else np.searchsorted(self.dates, np.datetime64(filters.desde), 'left')
+        end = (len(self.dates) if filters.hasta is None
+               else np.searchsorted(self.dates, np.datetime64(filters.hasta + pd.Timedelta(days=1)), 'left'))
+        return int(start), int(max(start, end))
+
+    def _bitmap(self, column, values):
+        rows = [self._positions[column][value] for value in values if value in self._positions[column]]
+        if not rows:
+            return np.zeros(self.bitmaps[column].shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(self.bitmaps[column][rows], axis=0)
+
+    def positions(self, filters):
+        """Tramo [inicio, fin) de filas por fechas y máscara booleana del tramo (None si no hace falta)"""
+        start, end = self._row_span(filters)
+        packed = None
+        for column, values in zip(FILTER_COLUMNS, (filters.zonas, filters.tipos)):
+            if values:
+                bits = self._bitmap(column, values)
+                packed = bits if packed is None else packed & bits
+        if packed is None:
+            return start, end, None
+        # Solo se desempaquetan los bytes que cubren el tramo de fechas
+        first_byte = start // 8
+        mask = np.unpackbits(packed[first_byte:(end + 7) // 8])[start - 8 * first_byte:end - 8 * first_byte]
+        return start, end, mask.astype(bool)
+
+    def select(self, filters):
+        """Filas del mercado que cumplen los filtros"""
+        start, end, mask = self.positions(filters)
+        rows = self.df.iloc[start:end]
+        return rows if mask is None else rows[mask]
+
+    def view(self, filters):
+        """Agregados del subconjunto filtrado, reutilizados entre sesiones mientras sigan en la LRU"""
+        with self._lock:
+            view = self._views.get(filters)
+            if view is not None:
+                self._views.move_to_end(filters)
+                return view, True
+        view = MarketView(self.select(filters))
+        with self._lock:
+            view = self._views.setdefault(filters, view)
+            self._views.move_to_end(filters)
+            while len(self._views) > MAX_CACHED_VIEWS:
+                self._views.popitem(last=False)
+        return view, False
@@ -0,0 +1,184 @@
+"""Pronóstico de los KPIs mensuales por suavizado exponencial estacional.
+
+El modelo es un Holt-Winters con tendencia amortiguada y estacionalidad
+multiplicativa por mes del año. En lugar de ajustar una serie tras otra, las
+series de todos los centros y KPIs se apilan en una matriz (serie × mes) y
+el suavizado avanza mes a mes sobre todas las filas a la vez: el bucle
+recorre los meses de historia, no las series.
+
+Los índices estacionales de partida salen de la propia serie cuando cubre
+todos los meses del año y, si no, del perfil estacional del mercado
+(``SeasonalProfile``) para la zona del centro: un centro con poca historia
+hereda la estacionalidad de su zona y la corrige a medida que acumula datos.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .comparison import center_month_distribution
+from .seasonality import MARKET_SEGMENT, _group_nanmean
+
+FORECAST_METRICS = ['trafico_peatonal', 'ingresos_totales', 'tasa_conversion']
+MIN_HORIZON = 3
+MAX_HORIZON = 12
+
+# Parámetros de suavizado: nivel, tendencia, estacionalidad y amortiguación de la tendencia
+ALPHA = 0.5
+BETA = 0.1
+GAMMA = 0.2
+PHI = 0.9
+
+# Amplitud de la banda de confianza (≈80 %) en errores relativos
+BAND_Z = 1.28
+
+
+def seasonal_smoothing(history, months, seasonal, horizon=MAX_HORIZON,
+                       alpha=ALPHA, beta=BETA, gamma=GAMMA, phi=PHI):
+    """Ajusta un lote de series y devuelve (pronóstico, error relativo) para ``horizon`` meses
+
+    ``history`` tiene forma (n_series, n_meses) con NaN en los meses sin
+    datos, ``months`` el mes del año (0-11) de cada columna y ``seasonal``
+    los índices de partida (n_series, 12). El pronóstico tiene forma
+    (n_series, horizon); el error relativo es NaN si la serie tiene menos de
+    dos errores de ajuste con los que estimarlo.
+    """
+    n_series = history.shape[0]
+    seasonal = np.where(np.isnan(seasonal) | (seasonal <= 0), 1.0, seasonal).astype(float)
+
+    # Series con todos los meses del año cubiertos: índices de partida de su propia historia
+    if len(months):
+        month_means = _group_nanmean(history, months, 12)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            own = month_means / np.nanmean(month_means, axis=1, keepdims=True)
+        full_year = np.isfinite(own).all(axis=1) & (own > 0).all(axis=1)
+        seasonal[full_year] = own[full_year]
+
+    level = np.full(n_series, np.nan)
+    trend = np.zeros(n_series)
+    squared_errors = np.zeros(n_series)
+    n_errors = np.zeros(n_series)
+
+    for t, month in enumerate(months):
+        y = history[:, t]
+        s = seasonal[:, month]
+        observed = ~np.isnan(y)
+        started = ~np.isnan(level)
+        fit = observed & started
+        expected = (level + phi * trend) * s
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            relative_error = (y - expected) / expected
+            new_level = alpha * y / s + (1 - alpha) * (level + phi * trend)
+            new_trend = beta * (new_level - level) + (1 - beta) * phi * trend
+            new_seasonal = gamma * y / new_level + (1 - gamma) * s
+
+        valid_error = fit & np.isfinite(relative_error)
+        squared_errors += np.where(valid_error, relative_error ** 2, 0.0)
+        n_errors += valid_error
+
+        # Meses sin dato: el nivel sigue la tendencia amortiguada; primer dato: arranca el nivel
+        level = np.where(fit, new_level, np.where(observed, y / s, level + phi * trend))
+        trend = np.where(fit, new_trend, np.where(observed, 0.0, phi * trend))
+        seasonal[:, month] = np.where(fit & np.isfinite(new_seasonal), new_seasonal, s)
+
+    steps = np.arange(1, horizon + 1)
+    damping = np.cumsum(phi ** steps)
+    future_months = (months[-1] + steps) % 12 if len(months) else steps % 12
+    forecast = (level[:, None] + damping[None, :] * trend[:, None]) * seasonal[:, future_months]
+    with np.errstate(invalid='ignore'):
+        error = np.where(n_errors >= 2, np.sqrt(squared_errors / np.maximum(n_errors, 1)), np.nan)
+    return np.maximum(forecast, 0.0), error
+
+
+def forecast_panel(panel, first_period, seasonal, horizon=MAX_HORIZON):
+    """Pronóstico, banda inferior y superior de un panel (n, n_métricas, n_meses) en una pasada"""
+    n_items, n_metrics, n_months = panel.shape
+    periods = pd.period_range(first_period, periods=n_months, freq='M')
+    forecast, error = seasonal_smoothing(panel.reshape(n_items * n_metrics, n_months),
+                                         periods.month.to_numpy() - 1,
+                                         seasonal.reshape(n_items * n_metrics, 12), horizon)
+    spread = BAND_Z * error[:, None] * np.sqrt(np.arange(1, horizon + 1))[None, :]
+    shape = (n_items, n_metrics, horizon)
+    future = pd.period_range(periods[-1] + 1, periods=horizon, freq='M')
+    return (forecast.reshape(shape), (forecast * np.maximum(1 - spread, 0)).reshape(shape),
+            (forecast * (1 + spread)).reshape(shape), future)
+
+
+def seasonal_priors(seasonal_profile, zones, metrics=FORECAST_METRICS):
+    """Índices mensuales de partida (n_zonas, n_métricas, 12) a partir del perfil del mercado"""
+    if seasonal_profile is None:
+        return np.ones((len(zones), len(metrics), 12))
+    segments = [('zona_geografica', zone) if zone is not None else MARKET_SEGMENT for zone in zones]
+    return np.stack([seasonal_profile.month_factors(metric, segments) for metric in metrics], axis=1)
+
+
+def _records(future, forecast, lower, upper):
+    """Registros {'fecha', 'pronostico', 'inferior', 'superior'} de una serie pronosticada"""
+    return [
+        {'fecha': str(period), 'pronostico': value, 'inferior': low, 'superior': high}
+        for period, value, low, high in zip(future, forecast.tolist(), lower.tolist(), upper.tolist())
+    ]
+
+
+def forecast_center(monthly_data, seasonal_profile=None, zone=None, horizon=MAX_HORIZON):
+    """Pronóstico de los KPIs de un centro subido: {métrica: [registros]}"""
+    if not monthly_data:
+        return {}
+    monthly = pd.DataFrame(monthly_data)
+    periods = pd.PeriodIndex(monthly['fecha'], freq='M')
+    offsets = periods.asi8 - periods.asi8.min()
+    panel = np.full((1, len(FORECAST_METRICS), offsets.max() + 1), np.nan)
+    panel[0, :, offsets] = monthly[FORECAST_METRICS].to_numpy(dtype=float)
+    forecast, lower, upper, future = forecast_panel(panel, periods.min(),
+                                                    seasonal_priors(seasonal_profile, [zone]), horizon)
+    return {
+        metric: _records(future, forecast[0, i], lower[0, i], upper[0, i])
+        for i, metric in enumerate(FORECAST_METRICS)
+    }
+
+
+class ForecastIndex:
+    """Pronósticos de todos los centros del mercado, calculados en un único lote"""
+
+    def __init__(self, distribution, zones=None, seasonal_profile=None, horizon=MAX_HORIZON):
+        center_codes, self.centers = pd.factorize(distribution['centro_id'], sort=True)
+        ordinals = pd.PeriodIndex(distribution['mes']).asi8
+        first = ordinals.min()
+        panel = np.full((len(self.centers), len(FORECAST_METRICS), ordinals.max() - first + 1), np.nan)
+        for i, metric in enumerate(FORECAST_METRICS):
+            panel[center_codes, i, ordinals - first] = distribution[metric].to_numpy(dtype=float)
+
+        center_zones = [None] * len(self.centers) if zones is None else [zones.get(c) for c in self.centers]
+        self.forecast, self.lower, self.upper, self.periods = forecast_panel(
+            panel, pd.Period(ordinal=first, freq='M'),
+            seasonal_priors(seasonal_profile, center_zones), horizon)
+        self._positions = {center: i for i, center in enumerate(self.centers)}
+
+    @classmethod
+    def from_market(cls, market_df, seasonal_profile=None, horizon=MAX_HORIZON):
+        zones = market_df.groupby('centro_id')['zona_geografica'].first().to_dict()
+        return cls(center_month_distribution(market_df), zones, seasonal_profile, horizon)
+
+    def center(self, centro_id, horizon=MAX_HORIZON):
+        """Pronóstico de un centro del mercado: {métrica: [registros]}; {} si no existe"""
+        row = self._positions.get(centro_id)
+        if row is None:
+            return {}
+        return {
+            metric: _records(self.periods[:horizon], self.forecast[row, i, :horizon],
+                             self.lower[row, i, :horizon], self.upper[row, i, :horizon])
+            for i, metric in enumerate(FORECAST_METRICS)
+        }
+
+    def to_frame(self):
+        """Pronósticos en formato largo: centro, mes y pronóstico con banda por KPI"""
+        n_centers, n_metrics, horizon = self.forecast.shape
+        frame = pd.DataFrame({
+            'centro_id': np.repeat(np.asarray(self.centers), n_metrics * horizon),
+            'metrica': np.tile(np.repeat(FORECAST_METRICS, horizon), n_centers),
+            'mes': np.tile(self.periods.astype(str), n_centers * n_metrics),
+        })
+        frame['pronostico'] = self.forecast.ravel()
+        frame['inferior'] = self.lower.ravel()
+        frame['superior'] = self.upper.ravel()
+        return frame
@@ -0,0 +1,112 @@
+"""Ingesta de archivos Excel/CSV con los datos de un centro comercial."""
+
+import hashlib
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .categories import category_rollup
+
+REQUIRED_COLUMNS = ['fecha', 'trafico_peatonal', 'ventas_por_m2', 'tasa_ocupacion',
+                    'tiempo_permanencia', 'tasa_conversion', 'ingresos_totales']
+
+# Agregación mensual de cada KPI del centro
+MONTHLY_AGGREGATIONS = {
+    'trafico_peatonal': 'mean',
+    'ventas_por_m2': 'mean',
+    'tasa_ocupacion': 'mean',
+    'tiempo_permanencia': 'mean',
+    'tasa_conversion': 'mean',
+    'ingresos_totales': 'sum'
+}
+
+
+def _file_name(source):
+    """Nombre del archivo para objetos subidos (con .name) o rutas en disco"""
+    name = getattr(source, 'name', source)
+    return os.fspath(name) if isinstance(name, (str, os.PathLike)) else ''
+
+
+def read_center_file(source):
+    """Lee un archivo .xlsx o .csv; devuelve None si el formato no está soportado"""
+    name = _file_name(source)
+    if name.endswith('.xlsx'):
+        return pd.read_excel(source)
+    if name.endswith('.csv'):
+        return pd.read_csv(source)
+    return None
+
+
+def build_monthly_data(df):
+    """Calcula los promedios mensuales de un centro a partir de sus datos diarios"""
+    year_month = df['fecha'].dt.to_period('M').rename('year_month')
+    monthly_data = df.groupby(year_month).agg(MONTHLY_AGGREGATIONS).reset_index()
+
+    # Convertir Period a string para serialización
+    monthly_data['fecha'] = monthly_data['year_month'].astype(str)
+    return monthly_data.drop('year_month', axis=1)
+
+
+def monthly_digests(df):
+    """Resumen del contenido de cada mes en las columnas requeridas: {'AAAA-MM': resumen}
+
+    Lo calcula la ingesta una vez por carga; las alertas lo comparan mes a
+    mes para detectar historia corregida sin volver a leer los días.
+    """
+    values = df[REQUIRED_COLUMNS[1:]].astype(float).assign(fecha=pd.to_datetime(df['fecha']))
+    hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+    codes, months = pd.factorize(values['fecha'].dt.to_period('M'), sort=True)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(months) + 1))
+    return {
+        str(month): hashlib.blake2b(hashes[order[bounds[i]:bounds[i + 1]]].tobytes(), digest_size=16).hexdigest()
+        for i, month in enumerate(months)
+    }
+
+
+def center_profile(df):
+    """Zona, tipo de negocio principal (por ingresos) y tamaño del centro, si el archivo los incluye"""
+    profile = {'zona_geografica': None, 'tipo_negocio': None, 'tamaño_m2': None}
+    if 'zona_geografica' in df.columns and df['zona_geografica'].notna().any():
+        profile['zona_geografica'] = df['zona_geografica'].mode().iloc[0]
+    if 'tipo_negocio' in df.columns and df['tipo_negocio'].notna().any():
+        profile['tipo_negocio'] = df.groupby('tipo_negocio')['ingresos_totales'].sum().idxmax()
+    if 'tamaño_m2' in df.columns and df['tamaño_m2'].notna().any():
+        profile['tamaño_m2'] = float(df['tamaño_m2'].median())
+    return profile
+
+
+def process_center_file(source, center_name, center_type):
+    """Procesa el archivo de un centro y devuelve (center_data, mensaje)"""
+    try:
+        df = read_center_file(source)
+        if df is None:
+            return None, "Formato de archivo no soportado"
+
+        # Validar estructura del archivo
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+        if missing_columns:
+            return None, f"Faltan las siguientes columnas: {', '.join(missing_columns)}"
+
+        # Procesar datos
+        df['fecha'] = pd.to_datetime(df['fecha'])
+        df = df.sort_values('fecha')
+        monthly_data = build_monthly_data(df)
+
+        center_data = {
+            'name': center_name,
+            'type': center_type,
+            'raw_data': df.to_dict('records'),
+            'monthly_data': monthly_data.to_dict('records'),
+            'profile': center_profile(df),
+            'category_rollup': category_rollup(df),
+            'month_digests': monthly_digests(df),
+            'upload_date': datetime.now().isoformat()
+        }
+
+        return center_data, "Datos procesados correctamente"
+
+    except Exception as e:
+        return None, f"Error al procesar el archivo: {str(e)}"
@@ -0,0 +1,153 @@
+"""Carga y agregación de los datos del mercado."""
+
+import os
+
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+MARKET_CSV = os.path.join(DATA_DIR, 'datos_agregados_mercado.csv')
+INDIVIDUAL_CSV = os.path.join(DATA_DIR, 'datos_individuales_centros.csv')
+
+# Copias columnares (Parquet) de los CSV, generadas por el vigilante de datos
+COLUMNAR_DIR = os.path.join(DATA_DIR, '.columnar')
+
+# Valores por defecto cuando no se pueden cargar los datos del mercado
+DEFAULT_SECTOR_AVERAGES = {
+    'ventas_totales': 240000,
+    'n_visitantes': 11000,
+    'ocupacion_por_m2': 75.5,
+    'ingresos_totales': 10000,
+    'trafico_peatonal': 460,
+    'ventas_por_m2': 48.2,
+    'tasa_ocupacion': 75.5,
+    'tiempo_permanencia': 89.1,
+    'tasa_conversion': 26.4
+}
+
+# Agregaciones comunes para las vistas por zona y por tipo de negocio
+_GROUP_AGGREGATIONS = {
+    'trafico_peatonal': 'sum',
+    'ingresos_totales': 'sum',
+    'tamaño_m2': 'sum',
+    'empleados': 'sum',
+    'tasa_ocupacion': 'mean'
+}
+
+# Renombrado de columnas para compatibilidad con las vistas del dashboard
+_GROUP_RENAMES = {
+    'trafico_peatonal': 'afluencia',
+    'ingresos_totales': 'ingresos (€)',
+    'tasa_ocupacion': 'ocupacion_por_m2'
+}
+
+
+def columnar_copy_path(csv_path):
+    """Ruta de la copia Parquet de un CSV de ``src/data``"""
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(COLUMNAR_DIR, name + '.parquet')
+
+
+def fresh_columnar_copy(csv_path):
+    """Copia Parquet del CSV si existe y no es más antigua que el CSV; si no, None"""
+    copy_path = columnar_copy_path(csv_path)
+    try:
+        if os.stat(copy_path).st_mtime_ns >= os.stat(csv_path).st_mtime_ns:
+            return copy_path
+    except OSError:
+        pass
+    return None
+
+
+def read_market_csv(csv_path=None, prefer_columnar=True):
+    """Lee un CSV (o Parquet) con el esquema del mercado y convierte la fecha a datetime"""
+    csv_path = csv_path or MARKET_CSV
+    # Los CSV de src/data se leen de su copia columnar cuando está al día
+    if prefer_columnar and os.path.dirname(os.path.abspath(csv_path)) == DATA_DIR:
+        csv_path = fresh_columnar_copy(csv_path) or csv_path
+    if str(csv_path).endswith('.parquet'):
+        df = pd.read_parquet(csv_path)
+    else:
+        df = pd.read_csv(csv_path)
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df
+
+
+def compute_sector_averages(df):
+    """Calcula totales y promedios del sector a partir de los datos del mercado"""
+    return {
+        'ventas_totales': df['ingresos_totales'].sum(),
+        'n_visitantes': df['trafico_peatonal'].sum(),
+        'ocupacion_por_m2': df['tasa_ocupacion'].mean(),
+        'ingresos_totales': df['ingresos_totales'].mean(),
+        'trafico_peatonal': df['trafico_peatonal'].mean(),
+        'ventas_por_m2': df['ventas_por_m2'].mean(),
+        'tasa_ocupacion': df['tasa_ocupacion'].mean(),
+        'tiempo_permanencia': df['tiempo_permanencia'].mean(),
+        'tasa_conversion': df['tasa_conversion'].mean()
+    }
+
+
+def load_market_data(csv_path=None):
+    """Carga los datos agregados del mercado y devuelve (promedios del sector, DataFrame)"""
+    df = read_market_csv(csv_path)
+    return compute_sector_averages(df), df
+
+
+def _aggregate_by(df, column):
+    grouped = df.groupby(column).agg(_GROUP_AGGREGATIONS).reset_index()
+    return grouped.rename(columns=_GROUP_RENAMES)
+
+
+def aggregate_by_zone(df):
+    """Agrupa los datos del mercado por zona geográfica"""
+    return _aggregate_by(df, 'zona_geografica')
+
+
+def aggregate_by_business_type(df):
+    """Agrupa los datos del mercado por tipo de negocio"""
+    return _aggregate_by(df, 'tipo_negocio')
+
+
+def compute_rankings(zone_data, business_data):
+    """Rankings de la vista de mercado: zonas por ventas y tipos de negocio por ocupación (ascendentes)"""
+    return {
+        'zonas': zone_data.sort_values('ingresos (€)', ascending=True).reset_index(drop=True),
+        'tipos_negocio': business_data.sort_values('ocupacion_por_m2', ascending=True).reset_index(drop=True),
+    }
+
+
+# Agregación mensual del mercado completo para las series de tendencia
+_MONTHLY_MARKET_AGGREGATIONS = {
+    'trafico_peatonal': 'sum',
+    'ingresos_totales': 'sum',
+    'tasa_ocupacion': 'mean',
+    'tasa_conversion': 'mean',
+}
+
+
+def monthly_market_series(df):
+    """Serie mensual del mercado (tráfico y ventas totales, ocupación y conversión medias)"""
+    month = df['fecha'].dt.to_period('M').dt.to_timestamp().rename('mes')
+    return df.groupby(month).agg(_MONTHLY_MARKET_AGGREGATIONS).reset_index()
+
+
+def load_individual_center_data(csv_path=None):
+    """Carga los datos individuales de los centros comerciales"""
+    return read_market_csv(csv_path or INDIVIDUAL_CSV)
+
+
+def compute_center_performance(df):
+    """Calcula el rendimiento por centro comercial sin exponer sus identificadores"""
+    center_data = df.groupby('centro_id').agg({
+        'trafico_peatonal': 'mean',
+        'ingresos_totales': 'sum',
+        'tamaño_m2': 'first',
+        'empleados': 'first'
+    }).reset_index()
+
+    # Calcular métricas adicionales
+    center_data['ventas_por_m2'] = center_data['ingresos_totales'] / center_data['tamaño_m2']
+    center_data['productividad_empleado'] = center_data['ingresos_totales'] / center_data['empleados']
+
+    # Remover IDs de centros para privacidad
+    return center_data.drop('centro_id', axis=1)
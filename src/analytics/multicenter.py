@@ -0,0 +1,53 @@
+"""Comparación de varios centros cargados frente al sector.
+
+Los datos mensuales de los centros seleccionados se apilan en un único
+frame columnar (una fila por centro y mes). A partir de él, la matriz
+centro × KPI del último mes, las desviaciones frente al sector y los
+percentiles se calculan con operaciones vectorizadas sobre toda la matriz,
+sin recorrer los centros uno a uno.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .comparison import METRIC_KEYS, metric_vector
+
+
+def stack_centers(centers, names):
+    """Frame apilado con los datos mensuales de los centros indicados (columna ``centro``)"""
+    # Con un CenterStore, peek evita recargar los datos diarios volcados a disco
+    lookup = getattr(centers, 'peek', centers.__getitem__)
+    monthly = [lookup(name)['monthly_data'] for name in names]
+    stacked = pd.DataFrame.from_records([record for records in monthly for record in records],
+                                        columns=['fecha', *METRIC_KEYS])
+    stacked.insert(0, 'centro', np.repeat(np.asarray(names, dtype=object), [len(records) for records in monthly]))
+    stacked['fecha'] = pd.PeriodIndex(stacked['fecha'], freq='M').to_timestamp()
+    return stacked
+
+
+class CenterMatrix:
+    """KPIs del último mes de cada centro, desviación frente al sector y percentiles"""
+
+    def __init__(self, stacked, sector_avg, percentile_index=None):
+        self.centers = list(pd.unique(stacked['centro']))
+        ordered = stacked.sort_values(['centro', 'fecha'], kind='stable')
+        latest = ordered.groupby('centro', sort=False).tail(1).set_index('centro').reindex(self.centers)
+        self.latest_month = latest['fecha']
+        self.values = latest[METRIC_KEYS].to_numpy(dtype=float)
+
+        sector = metric_vector(sector_avg)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.deltas = np.where(sector > 0, (self.values / sector - 1) * 100, np.nan)
+        self.sector = sector
+        self.percentiles = (percentile_index.ranks(self.values) if percentile_index is not None
+                            else np.full(self.values.shape, np.nan))
+        self.stacked = stacked
+
+    def to_frame(self, kind='deltas'):
+        """Matriz centro × KPI de valores, desviaciones (%) o percentiles"""
+        matrix = {'values': self.values, 'deltas': self.deltas, 'percentiles': self.percentiles}[kind]
+        return pd.DataFrame(matrix, index=self.centers, columns=METRIC_KEYS)
+
+    def series(self, metric):
+        """Serie mensual del KPI con un centro por columna"""
+        return self.stacked.pivot_table(index='fecha', columns='centro', values=metric, aggfunc='first')[self.centers]
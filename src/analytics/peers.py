@@ -0,0 +1,111 @@
+"""Benchmarks por grupo de pares.
+
+Un grupo de pares reúne las unidades (centro × tipo de negocio) de la misma
+zona geográfica, el mismo tipo de negocio y la misma banda de tamaño. El
+índice se construye una vez a partir de los datos del mercado con un
+groupby por nivel y guarda, para cada celda, la media, la mediana y la
+distribución ordenada de cada KPI. Consultar los pares de un centro es una
+búsqueda en un diccionario.
+
+Si la celda exacta tiene muy pocos centros se retrocede a niveles más
+amplios: zona × tipo, solo tipo y, por último, el mercado completo.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .comparison import METRIC_KEYS, PercentileIndex
+from .ingest import MONTHLY_AGGREGATIONS
+
+# Límites (m²) de las bandas de tamaño; la última banda queda abierta
+SIZE_BAND_EDGES = [150, 250, 350]
+SIZE_BAND_LABELS = ['<150 m²', '150-249 m²', '250-349 m²', '≥350 m²']
+
+# Niveles de agrupación, del más específico al más general
+PEER_LEVELS = [
+    ('zona_geografica', 'tipo_negocio', 'banda_m2'),
+    ('zona_geografica', 'tipo_negocio'),
+    ('tipo_negocio',),
+    (),
+]
+
+# Mínimo de centros distintos para aceptar un grupo de pares
+MIN_PEER_CENTERS = 3
+
+
+def size_band(size_m2):
+    """Etiqueta de la banda de tamaño para un valor o array de m²"""
+    positions = np.searchsorted(SIZE_BAND_EDGES, np.asarray(size_m2, dtype=float), side='right')
+    return np.asarray(SIZE_BAND_LABELS, dtype=object)[positions]
+
+
+def unit_month_distribution(market_df):
+    """KPIs mensuales por centro × tipo de negocio con zona y banda de tamaño"""
+    month = market_df['fecha'].dt.to_period('M').rename('mes')
+    aggregations = dict(MONTHLY_AGGREGATIONS, zona_geografica='first', **{'tamaño_m2': 'first'})
+    units = market_df.groupby([market_df['centro_id'], market_df['tipo_negocio'], month]).agg(aggregations)
+    units = units.reset_index()
+    units['banda_m2'] = size_band(units['tamaño_m2'])
+    return units
+
+
+def describe_group(level, key):
+    """Descripción legible de un grupo de pares"""
+    if not level:
+        return "Mercado completo"
+    return " × ".join(str(value) for value in key)
+
+
+class PeerIndex:
+    """Estadísticas precalculadas de cada grupo de pares en todos los niveles"""
+
+    def __init__(self, units):
+        self.groups = {}
+        self._summary = None
+        for level in PEER_LEVELS:
+            frames = units.groupby(list(level), sort=False) if level else [((), units)]
+            for key, frame in frames:
+                key = key if isinstance(key, tuple) else (key,)
+                values = frame[METRIC_KEYS]
+                self.groups[(level, key)] = {
+                    'level': level,
+                    'key': key,
+                    'description': describe_group(level, key),
+                    'centers': int(frame['centro_id'].nunique()),
+                    'mean': values.mean().to_dict(),
+                    'median': values.median().to_dict(),
+                    'index': PercentileIndex(frame),
+                }
+
+    @classmethod
+    def from_market(cls, market_df):
+        return cls(unit_month_distribution(market_df))
+
+    def lookup(self, profile, min_centers=MIN_PEER_CENTERS):
+        """Grupo de pares más específico con al menos ``min_centers`` centros"""
+        values = dict(profile)
+        if values.get('tamaño_m2') is not None:
+            values['banda_m2'] = size_band(values['tamaño_m2'])
+        fallback = None
+        for level in PEER_LEVELS:
+            if any(values.get(column) is None for column in level):
+                continue
+            group = self.groups.get((level, tuple(values[column] for column in level)))
+            if group is None:
+                continue
+            if group['centers'] >= min_centers:
+                return group
+            fallback = fallback or group
+        # Sin ningún grupo suficientemente grande, el más específico disponible
+        return fallback or self.groups[((), ())]
+
+    def summary(self):
+        """Una fila por grupo de pares con el número de centros y la media de cada KPI"""
+        if self._summary is None:
+            rows = []
+            for group in self.groups.values():
+                row = {'nivel': len(group['level']), 'grupo': group['description'], 'centros': group['centers']}
+                row.update(group['mean'])
+                rows.append(row)
+            self._summary = pd.DataFrame(rows)
+        return self._summary
@@ -0,0 +1,102 @@
+"""Variaciones MoM, QoQ y YoY a partir de tablas de retardos alineadas.
+
+Los KPIs mensuales de cada centro se colocan en una rejilla continua de
+meses (centro × mes × KPI), con NaN en los meses sin datos, precedida de
+``MAX_LAG`` meses vacíos. El valor de referencia de cada base de
+comparación es una vista desplazada de ese mismo array, de modo que el mes
+``t`` siempre se compara con ``t - retardo`` aunque falten meses
+intermedios. Un ``shift`` sobre la serie compacta compararía con el último
+mes disponible, que puede no ser el anterior.
+
+Las variaciones de las tres bases se calculan una sola vez al construir la
+tabla; cambiar de base es una consulta, no un recálculo.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .comparison import METRIC_KEYS, center_month_distribution
+
+# Base -> (descripción, meses de retardo)
+COMPARISON_BASES = {
+    'MoM': ('Mes anterior', 1),
+    'QoQ': ('Mismo mes del trimestre anterior', 3),
+    'YoY': ('Mismo mes del año anterior', 12),
+}
+MAX_LAG = max(lag for _, lag in COMPARISON_BASES.values())
+
+
+class LagTable:
+    """KPIs mensuales por centro en una rejilla continua con sus valores de referencia alineados"""
+
+    def __init__(self, monthly, id_column='centro', date_column='fecha', metrics=METRIC_KEYS):
+        self.metrics = list(metrics)
+        center_codes, centers = pd.factorize(monthly[id_column], sort=True)
+        self.centers = list(centers)
+        ordinals = pd.PeriodIndex(monthly[date_column], freq='M').asi8
+        first = ordinals.min() if len(ordinals) else 0
+        offsets = ordinals - first
+        n_months = int(offsets.max()) + 1 if len(offsets) else 0
+        self.months = pd.PeriodIndex.from_ordinals(np.arange(first, first + n_months), freq='M')
+
+        # MAX_LAG meses vacíos delante: el retardo k del mes t es la columna t + MAX_LAG - k
+        padded = np.full((len(self.centers), MAX_LAG + n_months, len(self.metrics)), np.nan)
+        padded[center_codes, offsets + MAX_LAG] = monthly[self.metrics].to_numpy(dtype=float)
+        self.values = padded[:, MAX_LAG:]
+
+        observed = ~np.isnan(self.values).all(axis=2)
+        # Último mes con datos de cada centro (los centros no tienen por qué terminar a la vez)
+        self.latest = np.where(observed.any(axis=1), n_months - 1 - np.argmax(observed[:, ::-1], axis=1), -1)
+
+        self.lagged = {}
+        self.deltas = {}
+        for basis, (_, lag) in COMPARISON_BASES.items():
+            previous = padded[:, MAX_LAG - lag:MAX_LAG - lag + n_months]
+            self.lagged[basis] = previous
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.deltas[basis] = np.where(previous > 0, (self.values / previous - 1) * 100, np.nan)
+        self._positions = {center: i for i, center in enumerate(self.centers)}
+
+    @classmethod
+    def from_market(cls, market_df, **kwargs):
+        return cls(center_month_distribution(market_df), id_column='centro_id', date_column='mes', **kwargs)
+
+    @classmethod
+    def from_center(cls, monthly_data, center_name, **kwargs):
+        """Tabla de un centro subido a partir de sus registros mensuales"""
+        monthly = pd.DataFrame.from_records(monthly_data)
+        monthly['centro'] = center_name
+        return cls(monthly, **kwargs)
+
+    def latest_comparison(self, center, basis):
+        """Valor del último mes, valor de referencia y variación (%) de cada KPI de un centro"""
+        i = self._positions.get(center)
+        if i is None or self.latest[i] < 0:
+            return None
+        t = self.latest[i]
+        lag = COMPARISON_BASES[basis][1]
+        return {
+            'mes': self.months[t],
+            'mes_referencia': self.months[t] - lag,
+            'valor': dict(zip(self.metrics, self.values[i, t])),
+            'referencia': dict(zip(self.metrics, self.lagged[basis][i, t])),
+            'variacion': dict(zip(self.metrics, self.deltas[basis][i, t])),
+        }
+
+    def latest_deltas(self, basis):
+        """Variación (%) del último mes de cada centro frente a la base; NaN si falta el mes de referencia"""
+        rows = np.flatnonzero(self.latest >= 0)
+        frame = pd.DataFrame(self.deltas[basis][rows, self.latest[rows]], columns=self.metrics,
+                             index=pd.Index(np.asarray(self.centers, dtype=object)[rows], name='centro'))
+        frame.insert(0, 'mes', self.months[self.latest[rows]].astype(str))
+        return frame
+
+    def center_deltas(self, center, basis):
+        """Variaciones mes a mes de un centro frente a la base, en la rejilla completa de meses"""
+        i = self._positions[center]
+        return pd.DataFrame(self.deltas[basis][i], index=self.months.astype(str), columns=self.metrics)
+
+    def to_frame(self):
+        """Variaciones del último mes de cada centro en las tres bases, en formato largo"""
+        frames = [self.latest_deltas(basis).reset_index().assign(base=basis) for basis in COMPARISON_BASES]
+        return pd.concat(frames, ignore_index=True)[['centro', 'mes', 'base', *self.metrics]]
@@ -0,0 +1,92 @@
+"""Perfilado por secciones de un rerun del dashboard.
+
+Registra el tiempo, el tamaño aproximado del resultado y el estado de caché
+de cada carga de datos, agregación, construcción de gráfica o envío de una
+gráfica al navegador. Cuando está desactivado no añade ningún coste.
+"""
+
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+
+def estimate_payload(obj):
+    """Tamaño aproximado en bytes de un resultado (DataFrame, figura o colecciones de ellos)"""
+    if obj is None:
+        return None
+    if hasattr(obj, 'memory_usage') and hasattr(obj, 'columns'):
+        return int(obj.memory_usage(deep=True).sum())
+    if hasattr(obj, 'to_plotly_json') and hasattr(obj, 'to_json'):
+        return len(obj.to_json().encode('utf-8'))
+    if isinstance(obj, dict):
+        obj = list(obj.values())
+    if isinstance(obj, (list, tuple)):
+        sizes = [estimate_payload(item) for item in obj]
+        sizes = [size for size in sizes if size is not None]
+        return sum(sizes) if sizes else None
+    return None
+
+
+class Profiler:
+    """Acumula las secciones medidas durante un rerun"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.entries = []
+        self.started = time.perf_counter()
+        self._stack = []
+
+    @contextmanager
+    def section(self, name, kind, cache=None):
+        """Mide un bloque; el dict devuelto permite fijar 'payload_bytes' y 'cache' al terminar"""
+        if not self.enabled:
+            yield {}
+            return
+
+        entry = {'name': name, 'kind': kind, 'depth': len(self._stack), 'cache': cache,
+                 'payload_bytes': None, '_children': 0.0}
+        self._stack.append(entry)
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            entry['seconds'] = elapsed
+            entry['self_seconds'] = elapsed - entry.pop('_children')
+            if self._stack:
+                self._stack[-1]['_children'] += elapsed
+            self.entries.append(entry)
+
+    def profiled(self, kind, name=None, payload=True):
+        """Decorador que mide cada llamada a la función como una sección"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.section(name or func.__name__, kind) as entry:
+                    result = func(*args, **kwargs)
+                # El tamaño se calcula fuera de la sección para no inflar su tiempo
+                if payload:
+                    entry['payload_bytes'] = estimate_payload(result)
+                return result
+            return wrapper
+        return decorator
+
+    def mark_cache(self, hit):
+        """Anota si la sección en curso se resolvió desde caché"""
+        if self.enabled and self._stack:
+            self._stack[-1]['cache'] = hit
+
+    def elapsed(self):
+        """Tiempo total transcurrido desde el inicio del rerun"""
+        return time.perf_counter() - self.started
+
+    def attributed(self):
+        """Tiempo cubierto por secciones de primer nivel"""
+        return sum(entry['seconds'] for entry in self.entries if entry['depth'] == 0)
+
+    def report(self):
+        """Secciones ordenadas por tiempo propio descendente"""
+        return sorted(self.entries, key=lambda entry: entry['self_seconds'], reverse=True)
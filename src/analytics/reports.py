@@ -0,0 +1,213 @@
+"""Informes "Análisis vs Mercado" por lotes, sin navegador.
+
+Procesa un directorio de archivos de centros (.csv/.xlsx) repartiendo los
+centros entre un pool de procesos. Para cada uno calcula la comparación con
+los promedios del sector, su percentil entre los centros del mercado, los
+valores del radar y las series mensuales de KPIs, y escribe un informe HTML
+y dos CSV. Al final deja un ``indice.csv`` con el resumen de toda la cartera.
+
+Uso::
+
+    python -m analytics.reports centros/ --output informes/ --workers 8
+"""
+
+import argparse
+import html
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from .comparison import METRICS_INFO, PercentileIndex, compare_to_sector, market_position_summary, radar_values
+from .ingest import process_center_file
+from .market import load_market_data
+
+CENTER_FILE_SUFFIXES = ('.csv', '.xlsx')
+
+
+def center_files(input_dir):
+    """Archivos de centros del directorio, ordenados por nombre"""
+    return sorted(os.path.join(input_dir, name) for name in os.listdir(input_dir)
+                  if name.endswith(CENTER_FILE_SUFFIXES) and not name.startswith('.'))
+
+
+def kpi_series(monthly_data, sector_avg):
+    """Serie mensual de cada KPI junto al promedio del sector y la diferencia (%)"""
+    df = pd.DataFrame.from_records(monthly_data)
+    columns = ['fecha']
+    for metric, _, _ in METRICS_INFO:
+        sector_value = sector_avg[metric]
+        df[f'{metric}_sector'] = sector_value
+        df[f'{metric}_vs_sector'] = (df[metric] / sector_value - 1) * 100 if sector_value > 0 else 0.0
+        columns += [metric, f'{metric}_sector', f'{metric}_vs_sector']
+    return df[columns]
+
+
+def center_name_for(path):
+    """Nombre del centro a partir del nombre de su archivo"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def build_center_report(path, sector_avg, percentile_index, center_type="Urbano"):
+    """Calcula el informe de un centro; devuelve (informe, mensaje) con informe None si falla"""
+    center_name = center_name_for(path)
+    center_data, message = process_center_file(path, center_name, center_type)
+    if center_data is None:
+        return None, message
+    if not center_data['monthly_data']:
+        return None, "El archivo no contiene datos mensuales"
+
+    latest_data = center_data['monthly_data'][-1]
+    comparison = compare_to_sector(latest_data, sector_avg, percentile_index)
+    center_values, sector_values = radar_values(latest_data, percentile_index)
+    return {
+        'name': center_name,
+        'type': center_type,
+        'period': latest_data['fecha'],
+        'comparison': comparison,
+        'position': market_position_summary(comparison),
+        'radar': {'center': center_values, 'sector': sector_values},
+        'monthly_data': center_data['monthly_data'],
+        'series': kpi_series(center_data['monthly_data'], sector_avg),
+    }, message
+
+
+def percentile_label(percentile):
+    return '' if percentile is None else f"P{percentile:.0f}"
+
+
+def render_report_html(report, sector_avg):
+    """Informe HTML autocontenido salvo plotly.js, que se carga desde CDN"""
+    from . import charts
+
+    figures = [charts.create_radar_chart(report['radar']['center'], report['radar']['sector'])]
+    for metric, name, unit in METRICS_INFO:
+        figures.append(charts.create_kpi_chart(report['monthly_data'], sector_avg[metric], metric, name, unit))
+    figures_html = [fig.to_html(full_html=False, include_plotlyjs='cdn' if i == 0 else False)
+                    for i, fig in enumerate(figures)]
+
+    rows = ''.join(
+        f"<tr><td>{html.escape(m['metric'])}</td><td>{m['center_value']:,.2f}</td>"
+        f"<td>{m['sector_value']:,.2f}</td><td>{m['performance']:+.1f}%</td>"
+        f"<td>{percentile_label(m['percentile'])}</td>"
+        f"<td>{html.escape(m['unit'])}</td></tr>"
+        for m in report['comparison']
+    )
+    position = report['position']
+    name = html.escape(report['name'])
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>Análisis vs Mercado - {name}</title>
+<style>
+body {{ font-family: "Segoe UI", "Roboto", "Helvetica Neue", Arial, sans-serif; color: #2c3e50; margin: 2rem; }}
+table {{ border-collapse: collapse; margin-bottom: 2rem; }}
+th, td {{ border: 1px solid #e8e8e8; padding: 0.4rem 0.8rem; text-align: right; }}
+th {{ background: #2563eb; color: #ffffff; }}
+td:first-child, th:first-child {{ text-align: left; }}
+</style>
+</head>
+<body>
+<h1>🏢 {name} - Análisis vs Mercado</h1>
+<p>Periodo: {html.escape(report['period'])} · Tipo: {html.escape(report['type'])} ·
+Métricas superiores al mercado: {position['superior_count']}/{position['total_count']} ·
+Rendimiento promedio: {position['avg_performance']:+.1f}%</p>
+<table>
+<tr><th>Métrica</th><th>Centro</th><th>Sector</th><th>Diferencia</th><th>Percentil</th><th>Unidad</th></tr>
+{rows}
+</table>
+{''.join(figures_html)}
+</body>
+</html>
+"""
+
+
+def write_center_report(report, sector_avg, output_dir, html_report=True):
+    """Escribe <centro>.html, <centro>_comparacion.csv y <centro>_kpis.csv; devuelve las rutas"""
+    base = os.path.join(output_dir, report['name'])
+    paths = [f'{base}_comparacion.csv', f'{base}_kpis.csv']
+    pd.DataFrame(report['comparison']).to_csv(paths[0], index=False)
+    report['series'].to_csv(paths[1], index=False)
+    if html_report:
+        paths.append(f'{base}.html')
+        with open(paths[-1], 'w', encoding='utf-8') as f:
+            f.write(render_report_html(report, sector_avg))
+    return paths
+
+
+def _report_task(path, sector_avg, percentile_index, output_dir, center_type, html_report):
+    """Trabajo de un proceso del pool: calcula y escribe el informe de un centro"""
+    report, message = build_center_report(path, sector_avg, percentile_index, center_type)
+    if report is None:
+        return {'archivo': path, 'centro': center_name_for(path), 'estado': 'error', 'mensaje': message}
+    write_center_report(report, sector_avg, output_dir, html_report)
+    position = report['position']
+    return {
+        'archivo': path,
+        'centro': report['name'],
+        'estado': 'ok',
+        'mensaje': message,
+        'periodo': report['period'],
+        'metricas_superiores': position['superior_count'],
+        'rendimiento_promedio': position['avg_performance'],
+        'mejor_metrica': position['best_metric']['metric'],
+    }
+
+
+def run_batch(input_dir, output_dir, workers=None, market_csv=None, center_type="Urbano", html_report=True):
+    """Genera los informes de todos los centros del directorio; devuelve el índice como DataFrame"""
+    os.makedirs(output_dir, exist_ok=True)
+    # Los promedios del sector y el índice de percentiles se calculan una vez y se envían a cada proceso
+    sector_avg, market_df = load_market_data(market_csv)
+    sector_avg = {key: float(value) for key, value in sector_avg.items()}
+    percentile_index = PercentileIndex.from_market(market_df)
+    paths = center_files(input_dir)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_report_task, path, sector_avg, percentile_index, output_dir, center_type,
+                               html_report): path
+                   for path in paths}
+        for future in as_completed(futures):
+            # Un informe que falla al generarse o escribirse no debe tirar el resto del lote
+            try:
+                results.append(future.result())
+            except Exception as e:
+                path = futures[future]
+                results.append({'archivo': path, 'centro': center_name_for(path), 'estado': 'error',
+                                'mensaje': f"{type(e).__name__}: {e}"})
+
+    index = pd.DataFrame(results, columns=['archivo', 'centro', 'estado', 'mensaje', 'periodo',
+                                           'metricas_superiores', 'rendimiento_promedio', 'mejor_metrica'])
+    index['metricas_superiores'] = index['metricas_superiores'].astype('Int64')
+    index = index.sort_values('archivo').reset_index(drop=True)
+    index.to_csv(os.path.join(output_dir, 'indice.csv'), index=False)
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Informes Análisis vs Mercado por lotes de Harmon BI")
+    parser.add_argument('input_dir', help="Directorio con los archivos .csv/.xlsx de los centros")
+    parser.add_argument('--output', default='informes', help="Directorio de salida")
+    parser.add_argument('--workers', type=int, help="Procesos del pool (por defecto, uno por CPU)")
+    parser.add_argument('--market-csv', help="CSV/Parquet del mercado (por defecto, src/data)")
+    parser.add_argument('--type', default="Urbano", dest='center_type', help="Tipo de centro")
+    parser.add_argument('--no-html', action='store_true', help="Escribir solo los CSV")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = run_batch(args.input_dir, args.output, args.workers, args.market_csv,
+                      args.center_type, not args.no_html)
+    failed = index[index['estado'] != 'ok']
+    print(f"{len(index) - len(failed)} informe(s) en {args.output} "
+          f"({time.perf_counter() - start:.1f} s)")
+    for _, row in failed.iterrows():
+        print(f"  ✗ {row['archivo']}: {row['mensaje']}", file=sys.stderr)
+    return 1 if len(failed) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
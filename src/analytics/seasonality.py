@@ -0,0 +1,141 @@
+"""Perfil estacional del mercado calculado a partir de ``fecha``.
+
+Para cada KPI y cada segmento (mercado completo, cada zona geográfica y
+cada tipo de negocio) se descompone la serie diaria en un índice por mes
+del año y otro por día de la semana, ambos multiplicativos y con media 1:
+
+* la serie diaria del segmento se divide por el nivel medio de su año, de
+  modo que el crecimiento entre años no contamina la estacionalidad;
+* el índice mensual es la media de ese cociente en cada mes del año;
+* el índice semanal es la media, por día de la semana, de lo que queda
+  tras quitar el efecto del mes.
+
+Todo se calcula con matrices segmento × día y productos con matrices
+indicadoras, sin bucles por fila, por lo que escala a años de datos diarios.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .comparison import METRIC_KEYS
+
+MONTH_LABELS = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+WEEKDAY_LABELS = ['Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb', 'Dom']
+
+# Dimensiones por las que se segmenta, además del mercado completo
+SEGMENT_DIMENSIONS = ['zona_geografica', 'tipo_negocio']
+MARKET_SEGMENT = ('mercado', 'Total')
+
+
+def _group_nanmean(matrix, labels, n_groups):
+    """Media por grupo de columnas ignorando NaN; ``labels`` asigna un grupo a cada columna"""
+    indicator = np.zeros((len(labels), n_groups))
+    indicator[np.arange(len(labels)), labels] = 1.0
+    present = ~np.isnan(matrix)
+    sums = np.where(present, matrix, 0.0) @ indicator
+    counts = present.astype(float) @ indicator
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def _normalize(index):
+    """Reescala cada fila para que la media de los periodos con datos sea 1"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return index / np.nanmean(index, axis=1, keepdims=True)
+
+
+class SeasonalProfile:
+    """Índices estacionales (mes del año y día de la semana) por KPI y segmento"""
+
+    def __init__(self, market_df, metrics=METRIC_KEYS):
+        dates = market_df['fecha'].to_numpy(dtype='datetime64[D]')
+        first_day = dates.min()
+        day_offset = (dates - first_day).astype(np.int64)
+        n_days = int(day_offset.max()) + 1
+
+        # Calendario del eje de días: año, mes (0-11) y día de la semana (0 = lunes)
+        calendar = pd.DatetimeIndex(first_day + np.arange(n_days))
+        years, year_labels = np.unique(calendar.year, return_inverse=True)
+        month_labels = calendar.month.to_numpy() - 1
+        weekday_labels = calendar.dayofweek.to_numpy()
+
+        # Segmentos: mercado completo y cada valor de cada dimensión
+        self.segments = [MARKET_SEGMENT]
+        row_segments = [np.zeros(len(market_df), dtype=np.int64)]
+        for dimension in SEGMENT_DIMENSIONS:
+            codes, values = pd.factorize(market_df[dimension], sort=True)
+            row_segments.append(codes + len(self.segments))
+            self.segments.extend((dimension, value) for value in values)
+        self._positions = {segment: i for i, segment in enumerate(self.segments)}
+        n_segments = len(self.segments)
+
+        self.first_day = pd.Timestamp(first_day)
+        self.days = n_days
+        self.years = years
+        self.level = {}
+        self.month_index = {}
+        self.weekday_index = {}
+        self.month_coverage = np.zeros((n_segments, 12), dtype=bool)
+
+        for metric in metrics:
+            values = market_df[metric].to_numpy(dtype=float)
+            sums = np.zeros(n_segments * n_days)
+            counts = np.zeros(n_segments * n_days)
+            for segment_codes in row_segments:
+                cells = segment_codes * n_days + day_offset
+                sums += np.bincount(cells, weights=values, minlength=n_segments * n_days)
+                counts += np.bincount(cells, minlength=n_segments * n_days)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                daily = (sums / counts).reshape(n_segments, n_days)
+
+            # Quitar el nivel de cada año antes de medir la estacionalidad
+            yearly = _group_nanmean(daily, year_labels, len(years))
+            ratio = daily / yearly[:, year_labels]
+
+            month_index = _normalize(_group_nanmean(ratio, month_labels, 12))
+            deseasoned = ratio / month_index[:, month_labels]
+            weekday_index = _normalize(_group_nanmean(deseasoned, weekday_labels, 7))
+
+            self.level[metric] = np.nanmean(daily, axis=1)
+            self.month_index[metric] = month_index
+            self.weekday_index[metric] = weekday_index
+            self.month_coverage |= ~np.isnan(month_index)
+
+    def _row(self, segment):
+        return self._positions.get(tuple(segment), 0)
+
+    def segment_options(self):
+        """Segmentos disponibles como (dimensión, valor)"""
+        return list(self.segments)
+
+    def monthly(self, metric, segment=MARKET_SEGMENT):
+        """Valor esperado del KPI en cada mes del año (NaN en meses sin datos)"""
+        row = self._row(segment)
+        return self.level[metric][row] * self.month_index[metric][row]
+
+    def month_factors(self, metric, segments):
+        """Índices mensuales de varios segmentos (n, 12), con 1 en los meses sin datos"""
+        rows = np.array([self._row(segment) for segment in segments], dtype=np.int64)
+        return np.nan_to_num(self.month_index[metric][rows], nan=1.0)
+
+    def weekday(self, metric, segment=MARKET_SEGMENT, relative=False):
+        """Valor esperado del KPI en cada día de la semana (o su índice, con ``relative``)"""
+        row = self._row(segment)
+        index = self.weekday_index[metric][row]
+        return index if relative else self.level[metric][row] * index
+
+    def months_with_data(self, segment=MARKET_SEGMENT):
+        return int(self.month_coverage[self._row(segment)].sum())
+
+    def to_frame(self, kind='month'):
+        """Índices en formato largo: dimensión, segmento, periodo y un índice por KPI"""
+        indices, labels = ((self.month_index, MONTH_LABELS) if kind == 'month'
+                           else (self.weekday_index, WEEKDAY_LABELS))
+        frame = pd.DataFrame({
+            'dimension': np.repeat([dimension for dimension, _ in self.segments], len(labels)),
+            'segmento': np.repeat([value for _, value in self.segments], len(labels)),
+            'periodo': np.tile(labels, len(self.segments)),
+        })
+        for metric, index in indices.items():
+            frame[metric] = index.ravel()
+        return frame
@@ -0,0 +1,306 @@
+"""Agregados aproximados con sketches mergeables para mercados muy grandes.
+
+Con decenas de millones de filas diarias, las medianas y percentiles
+exactos por zona × tipo de negocio × mes (y los recuentos de centros
+distintos) obligan a ordenar o deduplicar todas las filas en cada consulta.
+``SketchCube`` resume una sola vez, al ingerir los datos, cada celda del
+cubo con:
+
+* un t-digest por KPI (centroides ponderados con la función de escala k1),
+  del que se leen cuantiles y rangos percentiles;
+* un HyperLogLog de ``centro_id`` para el número de centros distintos.
+
+Ambos son mergeables: los niveles agregados (solo zona, zona × tipo, todo
+el mercado...) se construyen fusionando los sketches de las celdas base, y
+una consulta sobre varias zonas o meses fusiona unas pocas celdas. El coste
+de una consulta depende del número de celdas y de la compresión, no de las
+filas. Cada respuesta lleva su cota de error: la incertidumbre de rango del
+centroide que contiene el cuantil y el error típico del HyperLogLog.
+"""
+
+from itertools import combinations, product
+
+import numpy as np
+import pandas as pd
+
+from .comparison import METRIC_KEYS
+
+# Dimensiones del cubo; el mes se deriva de ``fecha``
+CUBE_DIMENSIONS = ['zona_geografica', 'tipo_negocio', 'mes']
+
+# Compresión del t-digest: ~compresión/2 centroides por celda como máximo
+TDIGEST_COMPRESSION = 100
+
+# 2**precisión registros por HyperLogLog; error típico 1.04 / sqrt(registros)
+HLL_PRECISION = 10
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_RELATIVE_ERROR = 1.04 / np.sqrt(HLL_REGISTERS)
+
+# Cuantiles que muestran las tablas por segmento
+SEGMENT_QUANTILES = (0.25, 0.5, 0.9)
+
+
+def compress_centroids(cells, means, weights, compression=TDIGEST_COMPRESSION):
+    """Centroides t-digest de muchas celdas a la vez
+
+    ``means`` (valores o centroides previos, con sus pesos) debe venir
+    ordenado por celda y, dentro de cada celda, por valor. Cada punto se
+    asigna al tramo de la escala k1 que corresponde a su cuantil en la
+    celda y los puntos consecutivos del mismo tramo se funden en un
+    centroide. Devuelve (celda, media, peso) de cada centroide.
+    """
+    if not len(means):
+        return cells[:0], means[:0], weights[:0]
+    totals = np.bincount(cells, weights=weights)
+    before = np.cumsum(weights) - weights
+    first = np.r_[True, cells[1:] != cells[:-1]]
+    # Peso acumulado antes de cada punto dentro de su celda
+    before = before - np.maximum.accumulate(np.where(first, before, 0))
+    q = np.clip((before + weights / 2) / totals[cells], 0, 1)
+    k = np.floor(compression / (2 * np.pi) * np.arcsin(2 * q - 1) + compression / 4).astype(np.int64)
+    starts = np.flatnonzero(first | np.r_[True, k[1:] != k[:-1]])
+    merged_weights = np.add.reduceat(weights, starts)
+    merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+    return cells[starts], merged_means, merged_weights
+
+
+def _bit_length(values):
+    """Número de bits significativos de cada uint64 (exacto vía frexp por mitades de 32 bits)"""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+def hll_registers(cells, ids, n_cells, precision=HLL_PRECISION):
+    """Registros HyperLogLog (celda × registro) de los identificadores de cada celda"""
+    registers = np.zeros((n_cells, 1 << precision), dtype=np.uint8)
+    if not len(ids):
+        return registers
+    hashes = pd.util.hash_array(np.asarray(ids, dtype=object))
+    index = (hashes >> np.uint64(64 - precision)).astype(np.intp)
+    rest = hashes & np.uint64((1 << (64 - precision)) - 1)
+    rho = ((64 - precision) - _bit_length(rest) + 1).astype(np.uint8)
+    np.maximum.at(registers, (cells, index), rho)
+    return registers
+
+
+def hll_count(registers):
+    """Estimación de elementos distintos por fila de registros (con corrección de rango pequeño)"""
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=-1)
+    zeros = np.count_nonzero(registers == 0, axis=-1)
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+class TDigest:
+    """t-digest de una celda o de la fusión de varias"""
+
+    def __init__(self, means, weights, minimum, maximum):
+        self.means = means
+        self.weights = weights
+        self.minimum = minimum
+        self.maximum = maximum
+        self.count = float(weights.sum())
+        self._centers = np.cumsum(weights) - weights / 2
+
+    @classmethod
+    def merge(cls, digests, compression=TDIGEST_COMPRESSION):
+        """Fusiona varios digests recomprimiendo sus centroides"""
+        digests = [digest for digest in digests if digest.count > 0]
+        if not digests:
+            return cls(np.empty(0), np.empty(0), np.nan, np.nan)
+        if len(digests) == 1:
+            return digests[0]
+        means = np.concatenate([digest.means for digest in digests])
+        weights = np.concatenate([digest.weights for digest in digests])
+        order = np.argsort(means, kind='stable')
+        _, means, weights = compress_centroids(np.zeros(len(means), dtype=np.intp), means[order],
+                                               weights[order], compression)
+        return cls(means, weights, min(digest.minimum for digest in digests),
+                   max(digest.maximum for digest in digests))
+
+    def quantile(self, q):
+        """Cuantil(es) interpolando entre centroides y los extremos exactos"""
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan)
+        positions = np.r_[0.0, self._centers, self.count]
+        values = np.r_[self.minimum, self.means, self.maximum]
+        return np.interp(np.asarray(q, dtype=float) * self.count, positions, values)
+
+    def rank(self, value):
+        """Percentil (0-100) aproximado de un valor"""
+        if self.count == 0:
+            return np.full(np.shape(value), np.nan)
+        positions = np.r_[0.0, self._centers, self.count]
+        values = np.r_[self.minimum, self.means, self.maximum]
+        return np.interp(value, values, positions) / self.count * 100
+
+    def rank_error(self, q):
+        """Incertidumbre de rango en el cuantil q: fracción de filas del centroide que lo contiene"""
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan)
+        index = np.searchsorted(np.cumsum(self.weights), np.asarray(q, dtype=float) * self.count)
+        return self.weights[np.minimum(index, len(self.weights) - 1)] / self.count
+
+    def bounds(self, q):
+        """Intervalo de valores compatible con la incertidumbre de rango del cuantil q"""
+        q = np.asarray(q, dtype=float)
+        error = self.rank_error(q)
+        return self.quantile(np.clip(q - error, 0, 1)), self.quantile(np.clip(q + error, 0, 1))
+
+
+class SketchCube:
+    """t-digests por KPI y HyperLogLog de centros en cada celda zona × tipo × mes y sus agregados"""
+
+    def __init__(self, market_df, metrics=METRIC_KEYS, compression=TDIGEST_COMPRESSION, precision=HLL_PRECISION):
+        self.metrics = list(metrics)
+        self.compression = compression
+        self.rows = len(market_df)
+        columns = {'zona_geografica': market_df['zona_geografica'], 'tipo_negocio': market_df['tipo_negocio'],
+                   'mes': market_df['fecha'].dt.to_period('M')}
+        self.labels = {}
+        base_cells = np.zeros(len(market_df), dtype=np.intp)
+        for dimension in CUBE_DIMENSIONS:
+            codes, values = pd.factorize(columns[dimension], sort=True)
+            self.labels[dimension] = list(values)
+            base_cells = base_cells * len(values) + codes
+        self.shape = tuple(len(self.labels[dimension]) for dimension in CUBE_DIMENSIONS)
+        self._codes = {dimension: {value: i for i, value in enumerate(values)}
+                       for dimension, values in self.labels.items()}
+
+        # Nivel base desde las filas; los demás niveles fusionando las celdas base
+        n_base = int(np.prod(self.shape))
+        base = {}
+        for metric in self.metrics:
+            values = market_df[metric].to_numpy(dtype=float)
+            valid = ~np.isnan(values)
+            cells, values = base_cells[valid], values[valid]
+            order = np.argsort(values, kind='stable')
+            order = order[np.argsort(cells[order], kind='stable')]
+            base[metric] = self._digest_set(cells[order], values[order], np.ones(len(order)), n_base)
+
+        center_codes, centers = pd.factorize(market_df['centro_id'])
+        # Un par (celda, centro) por combinación distinta antes de hashear
+        pairs = np.unique(base_cells * max(1, len(centers)) + center_codes)
+        base_registers = hll_registers(pairs // max(1, len(centers)),
+                                       np.asarray(centers, dtype=object)[pairs % max(1, len(centers))],
+                                       n_base, precision)
+
+        self.levels = {}
+        for size in range(len(CUBE_DIMENSIONS), -1, -1):
+            for level in combinations(CUBE_DIMENSIONS, size):
+                self.levels[level] = self._rollup(level, base, base_registers)
+
+    def _digest_set(self, cells, means, weights, n_cells):
+        """Centroides de todas las celdas en arrays planos con desplazamientos por celda"""
+        # Extremos exactos de cada celda: primer y último valor antes de comprimir
+        bounds = np.searchsorted(cells, np.arange(n_cells + 1))
+        nonempty = bounds[1:] > bounds[:-1]
+        minimum = np.full(n_cells, np.nan)
+        maximum = np.full(n_cells, np.nan)
+        minimum[nonempty] = means[bounds[:-1][nonempty]]
+        maximum[nonempty] = means[bounds[1:][nonempty] - 1]
+        cells, means, weights = compress_centroids(cells, means, weights, self.compression)
+        offsets = np.searchsorted(cells, np.arange(n_cells + 1))
+        return {'means': means, 'weights': weights, 'offsets': offsets, 'min': minimum, 'max': maximum}
+
+    def _level_cells(self, level):
+        """Código de celda del nivel para cada celda base"""
+        grids = np.indices(self.shape).reshape(len(CUBE_DIMENSIONS), -1)
+        cells = np.zeros(grids.shape[1], dtype=np.intp)
+        for dimension, grid, size in zip(CUBE_DIMENSIONS, grids, self.shape):
+            if dimension in level:
+                cells = cells * size + grid
+        return cells
+
+    def _rollup(self, level, base, base_registers):
+        level_cells = self._level_cells(level)
+        n_cells = int(np.prod([size for dimension, size in zip(CUBE_DIMENSIONS, self.shape) if dimension in level]))
+        # Toda celda del nivel agrupa al menos una celda base (la rejilla base es completa)
+        base_order = np.argsort(level_cells, kind='stable')
+        group_starts = np.searchsorted(level_cells[base_order], np.arange(n_cells))
+        digests = {}
+        for metric, digest_set in base.items():
+            if len(level) == len(CUBE_DIMENSIONS):
+                digests[metric] = digest_set
+                continue
+            # Cada centroide base pasa a la celda de su nivel y se recomprime
+            cells = np.repeat(level_cells, np.diff(digest_set['offsets']))
+            order = np.lexsort((digest_set['means'], cells))
+            merged = self._digest_set(cells[order], digest_set['means'][order],
+                                      digest_set['weights'][order], n_cells)
+            merged['min'] = np.fmin.reduceat(digest_set['min'][base_order], group_starts)
+            merged['max'] = np.fmax.reduceat(digest_set['max'][base_order], group_starts)
+            digests[metric] = merged
+        registers = np.maximum.reduceat(base_registers[base_order], group_starts, axis=0)
+        return {'digests': digests, 'registers': registers}
+
+    def _cell_digest(self, level, metric, cell):
+        digest_set = self.levels[level]['digests'][metric]
+        start, end = digest_set['offsets'][cell], digest_set['offsets'][cell + 1]
+        return TDigest(digest_set['means'][start:end], digest_set['weights'][start:end],
+                       digest_set['min'][cell], digest_set['max'][cell])
+
+    def months_between(self, desde=None, hasta=None):
+        """Meses del cubo que se solapan con el rango de fechas (vacío = todos)"""
+        if desde is None and hasta is None:
+            return ()
+        months = [month for month in self.labels['mes']
+                  if (desde is None or month.end_time >= pd.Timestamp(desde))
+                  and (hasta is None or month.start_time <= pd.Timestamp(hasta))]
+        return () if len(months) == len(self.labels['mes']) else (tuple(months) or (None,))
+
+    def query(self, metric, zonas=(), tipos=(), meses=()):
+        """(t-digest, centros distintos estimados) del segmento; selecciones vacías = todos los valores"""
+        selection = dict(zip(CUBE_DIMENSIONS, (zonas, tipos, meses)))
+        level = tuple(dimension for dimension in CUBE_DIMENSIONS if selection[dimension])
+        codes = [[self._codes[dimension][value] for value in selection[dimension] if value in self._codes[dimension]]
+                 for dimension in level]
+        sizes = [self.shape[CUBE_DIMENSIONS.index(dimension)] for dimension in level]
+        cells = []
+        for combo in product(*codes):
+            cell = 0
+            for code, size in zip(combo, sizes):
+                cell = cell * size + code
+            cells.append(cell)
+        if not cells:
+            return TDigest.merge([]), 0.0
+        digest = TDigest.merge([self._cell_digest(level, metric, cell) for cell in cells], self.compression)
+        registers = self.levels[level]['registers'][cells].max(axis=0)
+        return digest, float(hll_count(registers))
+
+    def segment_table(self, metric, by, zonas=(), tipos=(), meses=(), quantiles=SEGMENT_QUANTILES):
+        """Cuantiles (con su intervalo) y centros distintos de cada valor de la dimensión ``by``"""
+        selection = dict(zip(CUBE_DIMENSIONS, (zonas, tipos, meses)))
+        rows = []
+        for value in selection[by] or self.labels[by]:
+            if value not in self._codes[by]:
+                continue
+            digest, centers = self.query(metric, **{
+                'zonas': zonas, 'tipos': tipos, 'meses': meses,
+                {'zona_geografica': 'zonas', 'tipo_negocio': 'tipos', 'mes': 'meses'}[by]: (value,)})
+            if digest.count == 0:
+                continue
+            low, high = digest.bounds(quantiles)
+            row = {'segmento': str(value), 'filas': int(digest.count), 'centros': centers,
+                   'centros_error': centers * HLL_RELATIVE_ERROR}
+            for q, estimate, lo, hi in zip(quantiles, digest.quantile(quantiles), low, high):
+                row[f"p{round(q * 100)}"] = estimate
+                row[f"p{round(q * 100)}_error"] = (hi - lo) / 2
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+def exact_segment_table(market_df, metric, by, quantiles=SEGMENT_QUANTILES):
+    """Equivalente exacto de ``SketchCube.segment_table`` sobre las filas (mismas columnas sin errores)"""
+    keys = market_df['fecha'].dt.to_period('M') if by == 'mes' else market_df[by]
+    grouped = market_df.groupby(keys)
+    table = grouped[metric].quantile(list(quantiles)).unstack()
+    table.columns = [f"p{round(q * 100)}" for q in quantiles]
+    table.insert(0, 'centros', grouped['centro_id'].nunique())
+    table.insert(0, 'filas', grouped[metric].count())
+    table.index = table.index.astype(str)
+    return table.rename_axis('segmento').reset_index()
@@ -0,0 +1,150 @@
+"""Snapshot materializado de los agregados del mercado.
+
+``python -m analytics.snapshot`` precalcula, fuera de línea, todo lo que la
+caché compartida deriva de ``src/data`` (los artefactos de
+``watcher.build_artifacts``: promedios del sector, tablas por zona y tipo de
+negocio, rankings, índices de percentiles, pares, estacionalidad,
+anomalías y filtros, sketches por segmento, variaciones por periodo,
+impulsores de KPIs, pronósticos y series listas para graficar) y lo guarda en un único archivo
+versionado. Al arrancar, la app lo carga en la caché en milisegundos; si el
+formato no coincide o los archivos de datos cambiaron desde que se
+construyó, se ignora y se calcula al vuelo. Para saberlo basta comparar
+el tamaño y la fecha de modificación de cada archivo con los de la
+cabecera; el contenido solo se resume si esa huella difiere (p. ej. tras
+un checkout que toca las fechas sin cambiar los datos). Los artefactos
+cargados quedan fijados a la versión de los datos y no caducan por TTL.
+
+El snapshot es un pickle generado localmente: no debe cargarse uno de
+origen desconocido.
+"""
+
+import argparse
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import time
+from datetime import datetime
+
+from . import cache
+from .market import DATA_DIR
+
+# Se incrementa cuando cambian las claves o la forma de los artefactos
+SNAPSHOT_FORMAT = 10
+
+SNAPSHOT_DIR = os.path.join(DATA_DIR, '.snapshot')
+SNAPSHOT_PATH = os.path.join(SNAPSHOT_DIR, 'mercado.pkl')
+
+
+def source_digest(data_dir=DATA_DIR):
+    """Resumen del contenido de los archivos de datos (independiente de sus fechas)"""
+    digest = hashlib.sha256()
+    with os.scandir(data_dir) as it:
+        paths = sorted(entry.path for entry in it if entry.is_file())
+    for path in paths:
+        digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(data_dir=DATA_DIR):
+    """Nombre, tamaño y mtime de cada archivo de datos, sin leer su contenido"""
+    return tuple((os.path.basename(path), size, mtime)
+                 for path, size, mtime in cache.fingerprint((data_dir,)))
+
+
+def is_current(header, data_dir=DATA_DIR):
+    """True si la cabecera corresponde al formato y a los datos actuales"""
+    if header is None or header.get('format') != SNAPSHOT_FORMAT:
+        return False
+    if header.get('fingerprint') == source_fingerprint(data_dir):
+        return True
+    return header.get('sources') == source_digest(data_dir)
+
+
+def build_snapshot(path=SNAPSHOT_PATH, data_dir=DATA_DIR):
+    """Calcula los artefactos de ``data_dir`` y los escribe de forma atómica; devuelve la cabecera"""
+    from .watcher import build_artifacts
+
+    header = {
+        'format': SNAPSHOT_FORMAT,
+        'sources': source_digest(data_dir),
+        'fingerprint': source_fingerprint(data_dir),
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    artifacts = build_artifacts(data_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(artifacts, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return header
+
+
+def read_header(path=SNAPSHOT_PATH):
+    """Cabecera del snapshot sin cargar los artefactos; None si no existe"""
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def load_snapshot(path=SNAPSHOT_PATH, data_dir=DATA_DIR):
+    """Artefactos del snapshot si está al día con los datos; None si falta o está obsoleto"""
+    try:
+        with open(path, 'rb') as f:
+            if not is_current(pickle.load(f), data_dir):
+                return None
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+
+
+_installed = None
+_install_lock = threading.Lock()
+
+
+def install_snapshot(path=SNAPSHOT_PATH):
+    """Carga el snapshot en la caché compartida una vez por proceso
+
+    Devuelve la huella de ``src/data`` con la que se instaló, o None si no
+    había un snapshot válido.
+    """
+    global _installed
+    with _install_lock:
+        if _installed is None:
+            version = cache.shared_cache.version((DATA_DIR,))
+            artifacts = load_snapshot(path)
+            if artifacts is not None:
+                cache.shared_cache.put_many(artifacts, version)
+            _installed = (version if artifacts is not None else None,)
+        return _installed[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot materializado de los agregados de Harmon BI")
+    parser.add_argument('--output', default=SNAPSHOT_PATH, help="Ruta del snapshot")
+    parser.add_argument('--check', action='store_true',
+                        help="Solo comprobar si el snapshot está al día (código 1 si no)")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        fresh = is_current(read_header(args.output))
+        print(f"Snapshot {'al día' if fresh else 'obsoleto o inexistente'}: {args.output}")
+        return 0 if fresh else 1
+
+    start = time.perf_counter()
+    header = build_snapshot(args.output)
+    size_kb = os.path.getsize(args.output) / 1024
+    print(f"Snapshot v{header['format']} escrito en {args.output} "
+          f"({size_kb:.0f} KB, {time.perf_counter() - start:.2f} s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
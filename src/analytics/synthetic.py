@@ -0,0 +1,196 @@
+"""Generador de datos sintéticos del mercado para pruebas de escala.
+
+Produce datasets con el mismo esquema que ``datos_agregados_mercado.csv``
+(una fila por centro × tipo de negocio × día) con efectos de zona, tipo de
+negocio, estacionalidad mensual y día de la semana calibrados sobre los
+datos incluidos en ``src/data``. La generación es vectorizada y por bloques
+de centros, de modo que se pueden escribir datasets de más de 10M de filas
+sin materializarlos completos en memoria.
+
+Uso::
+
+    python -m analytics.synthetic --centers 1000 --days 3650 --format parquet --output /tmp/mercado.parquet
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['fecha', 'centro_id', 'zona_geografica', 'tipo_negocio', 'trafico_peatonal',
+           'ventas_por_m2', 'tasa_ocupacion', 'tiempo_permanencia', 'tasa_conversion',
+           'ingresos_totales', 'tamaño_m2', 'empleados']
+
+# Multiplicador de tráfico y ventas por zona geográfica
+ZONE_EFFECTS = {
+    'Madrid': 1.25,
+    'Cataluña': 1.15,
+    'Norte': 0.95,
+    'Sur': 1.0,
+    'Castilla-La Mancha': 0.8,
+    'León': 0.75
+}
+
+# Perfil base por tipo de negocio: (tráfico, ventas/m², tamaño medio m², empleados por 100 m²)
+BUSINESS_PROFILES = {
+    'Moda': (420, 45.0, 260, 6.5),
+    'Restauración': (620, 95.0, 130, 11.0),
+    'Ocio': (380, 38.0, 300, 5.0)
+}
+
+# Estacionalidad mensual (enero..diciembre) y semanal (lunes..domingo)
+MONTH_FACTORS = np.array([0.92, 0.85, 0.95, 1.0, 1.0, 1.05, 1.12, 1.08, 0.95, 0.97, 1.05, 1.25])
+WEEKDAY_FACTORS = np.array([0.85, 0.88, 0.9, 0.95, 1.1, 1.25, 1.07])
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+def _center_catalog(n_centers, business_types, rng):
+    """Asigna zona, tamaño y plantilla a cada unidad centro × tipo de negocio"""
+    zones = np.array(list(ZONE_EFFECTS))
+    center_zones = zones[rng.integers(0, len(zones), n_centers)]
+    center_ids = np.array([f"CC_{i + 1:0{max(3, len(str(n_centers)))}d}" for i in range(n_centers)])
+
+    n_types = len(business_types)
+    units = pd.DataFrame({
+        'centro_id': np.repeat(center_ids, n_types),
+        'zona_geografica': np.repeat(center_zones, n_types),
+        'tipo_negocio': np.tile(np.array(business_types), n_centers)
+    })
+    base_size = np.array([BUSINESS_PROFILES[t][2] for t in units['tipo_negocio']])
+    staff_ratio = np.array([BUSINESS_PROFILES[t][3] for t in units['tipo_negocio']])
+    units['tamaño_m2'] = np.maximum(60, np.round(base_size * rng.lognormal(0, 0.25, len(units)), -1)).astype(np.int64)
+    units['empleados'] = np.maximum(3, np.round(units['tamaño_m2'] / 100 * staff_ratio * rng.uniform(0.8, 1.2, len(units)))).astype(np.int64)
+    # Calidad propia de cada unidad, constante en el tiempo
+    units['_calidad'] = rng.lognormal(0, 0.15, len(units))
+    return units
+
+
+def _generate_block(units, dates, rng):
+    """Genera las filas diarias de un bloque de unidades de forma vectorizada"""
+    n_units, n_days = len(units), len(dates)
+    n = n_units * n_days
+
+    unit_idx = np.repeat(np.arange(n_units), n_days)
+    day_idx = np.tile(np.arange(n_days), n_units)
+
+    tipo = units['tipo_negocio'].to_numpy()[unit_idx]
+    zona = units['zona_geografica'].to_numpy()[unit_idx]
+    size = units['tamaño_m2'].to_numpy()[unit_idx]
+    quality = units['_calidad'].to_numpy()[unit_idx]
+
+    base_traffic = np.array([BUSINESS_PROFILES[t][0] for t in BUSINESS_PROFILES])
+    base_sales = np.array([BUSINESS_PROFILES[t][1] for t in BUSINESS_PROFILES])
+    type_codes = pd.Categorical(tipo, categories=list(BUSINESS_PROFILES)).codes
+    zone_factor = pd.Series(zona).map(ZONE_EFFECTS).to_numpy()
+
+    season = (MONTH_FACTORS[dates.month.to_numpy() - 1] * WEEKDAY_FACTORS[dates.dayofweek.to_numpy()])[day_idx]
+
+    demand = zone_factor * quality * season
+    traffic = base_traffic[type_codes] * demand * rng.lognormal(0, 0.12, n)
+    conversion = np.clip(26.5 * quality ** 0.5 * season ** 0.3 + rng.normal(0, 2.0, n), 5, 60)
+    sales_m2 = base_sales[type_codes] * zone_factor * quality * season * (conversion / 26.5) ** 0.5 * rng.lognormal(0, 0.15, n)
+    occupancy = np.clip(75.5 + 8 * (quality - 1) + 4 * (season - 1) + rng.normal(0, 4.0, n), 30, 100)
+    dwell = np.clip(89 * season ** 0.2 + rng.normal(0, 6.0, n), 20, 240)
+
+    sales_m2 = np.round(sales_m2, 2)
+    return pd.DataFrame({
+        'fecha': dates[day_idx],
+        'centro_id': units['centro_id'].to_numpy()[unit_idx],
+        'zona_geografica': zona,
+        'tipo_negocio': tipo,
+        'trafico_peatonal': np.round(traffic).astype(np.int64),
+        'ventas_por_m2': sales_m2,
+        'tasa_ocupacion': np.round(occupancy, 1),
+        'tiempo_permanencia': np.round(dwell, 1),
+        'tasa_conversion': np.round(conversion, 1),
+        # Igual que en los datos reales: ingresos = ventas por m² × superficie
+        'ingresos_totales': np.round(sales_m2 * size).astype(np.int64),
+        'tamaño_m2': size,
+        'empleados': units['empleados'].to_numpy()[unit_idx]
+    }, columns=COLUMNS)
+
+
+def iter_market_chunks(n_centers, n_days, business_types=None, start='2023-01-01',
+                       seed=42, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Genera el dataset sintético en bloques de aproximadamente ``chunk_rows`` filas"""
+    business_types = list(business_types or BUSINESS_PROFILES)
+    unknown = [t for t in business_types if t not in BUSINESS_PROFILES]
+    if unknown:
+        raise ValueError(f"Tipos de negocio desconocidos: {', '.join(unknown)}")
+
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=n_days, freq='D')
+    units = _center_catalog(n_centers, business_types, rng)
+
+    # Cada bloque contiene centros completos para conservar el orden por centro y fecha
+    units_per_chunk = max(len(business_types), chunk_rows // max(1, n_days))
+    units_per_chunk -= units_per_chunk % len(business_types)
+    for offset in range(0, len(units), units_per_chunk):
+        yield _generate_block(units.iloc[offset:offset + units_per_chunk], dates, rng)
+
+
+def generate_market_data(n_centers, n_days, business_types=None, start='2023-01-01', seed=42):
+    """Genera el dataset sintético completo en memoria"""
+    return pd.concat(list(iter_market_chunks(n_centers, n_days, business_types, start, seed)),
+                     ignore_index=True)
+
+
+def rows_for(n_centers, n_days, business_types=None):
+    """Número de filas que produce una configuración"""
+    return n_centers * len(business_types or BUSINESS_PROFILES) * n_days
+
+
+def write_market_data(path, n_centers, n_days, business_types=None, start='2023-01-01',
+                      seed=42, fmt=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Escribe el dataset sintético en CSV o Parquet por bloques y devuelve el número de filas"""
+    fmt = fmt or ('parquet' if str(path).endswith('.parquet') else 'csv')
+    if fmt not in ('csv', 'parquet'):
+        raise ValueError(f"Formato no soportado: {fmt}")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    total = 0
+    writer = None
+    try:
+        for i, chunk in enumerate(iter_market_chunks(n_centers, n_days, business_types, start, seed, chunk_rows)):
+            if fmt == 'csv':
+                chunk.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False,
+                             date_format='%Y-%m-%d')
+            else:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            total += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos del mercado con el esquema de Harmon BI")
+    parser.add_argument('--centers', type=int, default=100, help="Número de centros comerciales")
+    parser.add_argument('--days', type=int, default=365, help="Número de días consecutivos")
+    parser.add_argument('--business-types', nargs='+', default=None,
+                        help=f"Tipos de negocio ({', '.join(BUSINESS_PROFILES)})")
+    parser.add_argument('--start', default='2023-01-01', help="Fecha inicial (YYYY-MM-DD)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--format', choices=['csv', 'parquet'], default=None,
+                        help="Formato de salida; por defecto se deduce de la extensión")
+    parser.add_argument('--output', required=True, help="Ruta del archivo de salida")
+    args = parser.parse_args(argv)
+
+    rows = write_market_data(args.output, args.centers, args.days, args.business_types,
+                             args.start, args.seed, args.format)
+    print(f"{rows:,} filas escritas en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
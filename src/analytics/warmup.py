@@ -0,0 +1,94 @@
+"""Calentamiento de cachés al arrancar el servidor.
+
+``python -m analytics.warmup`` carga el snapshot (si está al día), calcula
+los datos del mercado, las agregaciones y las figuras de la vista de
+mercado en modo claro y oscuro, y solo entonces arranca ``streamlit run``
+en el mismo proceso. Así el health check no responde hasta que las cachés
+están llenas y el primer visitante tras un reinicio ve las páginas en
+caliente. Lo calentado queda fijado a la huella de ``src/data``: no caduca
+por TTL, solo cuando cambian los datos.
+
+Uso::
+
+    python -m analytics.warmup --server.address=0.0.0.0
+    python -m analytics.warmup --only      # calentar y salir (diagnóstico)
+
+Los argumentos que no reconoce se pasan tal cual a ``streamlit run``.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from . import cache
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+# (nombre, función) en orden de dependencia
+WARMUP_STEPS = [
+    ('datos del mercado', cache.cached_market_data),
+    ('agregación por zona', cache.cached_zone_data),
+    ('agregación por tipo de negocio', cache.cached_business_data),
+    ('rankings', cache.cached_rankings),
+    ('serie mensual del mercado', cache.cached_market_series),
+    ('índice de percentiles', cache.cached_percentile_index),
+    ('índice de grupos de pares', cache.cached_peer_index),
+    ('perfil estacional', cache.cached_seasonal_profile),
+    ('pronósticos por centro', cache.cached_center_forecasts),
+    ('índice de anomalías', cache.cached_anomaly_index),
+    ('índice de filtros', cache.cached_market_index),
+    ('sketches por segmento', cache.cached_sketch_cube),
+    ('variaciones por periodo', cache.cached_market_lags),
+    ('análisis de impulsores', cache.cached_driver_analysis),
+    ('datos individuales', cache.cached_individual_center_data),
+    ('rendimiento por centro', cache.cached_center_performance),
+]
+
+
+def warm_up(chart_themes=None):
+    """Llena la caché compartida; devuelve [(paso, segundos, hit)]"""
+    from .charts import CHART_THEMES
+    from .snapshot import install_snapshot
+
+    chart_themes = CHART_THEMES if chart_themes is None else chart_themes
+    timings = []
+    start = time.perf_counter()
+    installed = install_snapshot() is not None
+    timings.append(('snapshot', time.perf_counter() - start, installed))
+
+    steps = WARMUP_STEPS + [
+        (f"figuras de mercado ({'oscuro' if dark_mode else 'claro'})",
+         lambda dark_mode=dark_mode: cache.cached_market_charts(dark_mode))
+        for dark_mode in chart_themes
+    ]
+    for name, step in steps:
+        start = time.perf_counter()
+        _, hit = step()
+        timings.append((name, time.perf_counter() - start, hit))
+    # Sin fijarlas, las entradas calculadas al vuelo volverían a estar frías tras el TTL
+    cache.shared_cache.pin()
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calienta las cachés y arranca el dashboard de Harmon BI")
+    parser.add_argument('--only', action='store_true', help="Calentar las cachés y salir sin arrancar Streamlit")
+    args, streamlit_args = parser.parse_known_args(argv)
+
+    start = time.perf_counter()
+    for name, seconds, hit in warm_up():
+        print(f"  {name:<36} {seconds * 1000:>8.1f} ms{'  (caché)' if hit else ''}", flush=True)
+    print(f"Cachés calientes en {(time.perf_counter() - start) * 1000:.0f} ms", flush=True)
+    if args.only:
+        return 0
+
+    # Streamlit arranca en este mismo proceso, de modo que la app encuentra la caché llena
+    from streamlit.web import cli as stcli
+
+    sys.argv = ['streamlit', 'run', APP_PATH, *streamlit_args]
+    return stcli.main()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""Vigilante del directorio de datos.
+
+Un hilo en segundo plano comprueba periódicamente la huella de ``src/data``.
+Cuando aparece o cambia un archivo, regenera una sola vez las copias
+columnares (Parquet) de los CSV y todos los agregados derivados, y los
+sustituye en la caché compartida de golpe. Mientras tanto las sesiones
+siguen recibiendo la versión anterior de esas claves (solo de esas): ninguna
+petición paga la reconstrucción. Si la reconstrucción falla se deja de
+servir la versión anterior y cada petición vuelve a calcular sobre los
+datos actuales. Los artefactos instalados quedan fijados a la huella de
+los datos, así que tampoco caducan por TTL mientras no cambien.
+"""
+
+import logging
+import os
+import threading
+
+from . import cache
+from .market import (
+    DATA_DIR,
+    MARKET_CSV,
+    INDIVIDUAL_CSV,
+    COLUMNAR_DIR,
+    columnar_copy_path,
+    read_market_csv,
+    compute_sector_averages,
+    aggregate_by_zone,
+    aggregate_by_business_type,
+    compute_center_performance,
+    compute_rankings,
+    monthly_market_series,
+)
+from .comparison import PercentileIndex
+from .peers import PeerIndex
+from .seasonality import SeasonalProfile
+from .forecast import ForecastIndex
+from .anomalies import AnomalyIndex
+from .filters import MarketIndex
+from .sketches import SketchCube
+from .periods import LagTable
+from .drivers import DriverAnalysis
+
+logger = logging.getLogger(__name__)
+
+# Intervalo de sondeo en segundos; configurable con HARMON_WATCH_INTERVAL_S
+DEFAULT_WATCH_INTERVAL_SECONDS = 2.0
+
+
+def watch_interval_seconds():
+    return float(os.environ.get('HARMON_WATCH_INTERVAL_S', DEFAULT_WATCH_INTERVAL_SECONDS))
+
+
+def write_columnar_copies(data_dir=DATA_DIR):
+    """Escribe la copia Parquet de cada CSV del directorio (archivo temporal + rename atómico)"""
+    os.makedirs(COLUMNAR_DIR, exist_ok=True)
+    written = []
+    with os.scandir(data_dir) as it:
+        csv_paths = sorted(entry.path for entry in it if entry.is_file() and entry.name.endswith('.csv'))
+    for csv_path in csv_paths:
+        copy_path = columnar_copy_path(csv_path)
+        tmp_path = f"{copy_path}.{os.getpid()}.tmp"
+        read_market_csv(csv_path, prefer_columnar=False).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, copy_path)
+        written.append(copy_path)
+    return written
+
+
+# Claves de la caché que instala el vigilante, además de las figuras de mercado de cada tema
+ARTIFACT_KEYS = (
+    ('market_data', None),
+    ('zone_data', None),
+    ('business_data', None),
+    ('rankings', None),
+    ('market_series', None),
+    ('percentile_index', None),
+    ('peer_index', None),
+    ('seasonal_profile', None),
+    ('center_forecasts', None),
+    ('anomaly_index', None),
+    ('market_index', None),
+    ('sketch_cube', None),
+    ('market_lags', None),
+    ('driver_analysis', None),
+    ('individual_center_data', None),
+    ('center_performance', None),
+)
+
+
+def build_artifacts(data_dir=DATA_DIR):
+    """Recalcula todas las entradas de la caché que dependen de los CSV del directorio de datos"""
+    market_df = read_market_csv(os.path.join(data_dir, os.path.basename(MARKET_CSV)))
+    individual_df = read_market_csv(os.path.join(data_dir, os.path.basename(INDIVIDUAL_CSV)))
+    zone_data = aggregate_by_zone(market_df)
+    business_data = aggregate_by_business_type(market_df)
+    seasonal_profile = SeasonalProfile(market_df)
+    return {
+        ('market_data', None): (compute_sector_averages(market_df), market_df),
+        ('zone_data', None): zone_data,
+        ('business_data', None): business_data,
+        ('rankings', None): compute_rankings(zone_data, business_data),
+        ('market_series', None): monthly_market_series(market_df),
+        ('percentile_index', None): PercentileIndex.from_market(market_df),
+        ('peer_index', None): PeerIndex.from_market(market_df),
+        ('seasonal_profile', None): seasonal_profile,
+        ('center_forecasts', None): ForecastIndex.from_market(market_df, seasonal_profile),
+        ('anomaly_index', None): AnomalyIndex.from_market(market_df),
+        ('market_index', None): MarketIndex(market_df),
+        ('sketch_cube', None): SketchCube(market_df),
+        ('market_lags', None): LagTable.from_market(market_df),
+        ('driver_analysis', None): DriverAnalysis(market_df),
+        ('individual_center_data', None): individual_df,
+        ('center_performance', None): compute_center_performance(individual_df),
+    }
+
+
+def build_market_charts(artifacts, dark_modes):
+    """Figuras de la vista de mercado para cada tema a partir de artefactos recién calculados"""
+    from .charts import create_market_analysis_charts
+
+    _, market_df = artifacts[('market_data', None)]
+    return {
+        ('market_charts', bool(dark_mode), None): create_market_analysis_charts(
+            artifacts[('zone_data', None)], artifacts[('business_data', None)], market_df,
+            dark_mode=dark_mode, rankings=artifacts[('rankings', None)])
+        for dark_mode in dark_modes
+    }
+
+
+class DataWatcher:
+    """Hilo demonio que reconstruye los artefactos derivados cuando cambian los datos"""
+
+    def __init__(self, data_dir=DATA_DIR, interval=None, shared=None, chart_themes=()):
+        self.data_dir = data_dir
+        # Temas (modo oscuro sí/no) cuyas figuras de mercado se reconstruyen junto a los datos
+        self.chart_themes = tuple(chart_themes)
+        self.interval = watch_interval_seconds() if interval is None else interval
+        self.cache = shared or cache.shared_cache
+        self.version = None
+        self.rebuilds = 0
+        self.last_error = None
+        self.ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def keys(self):
+        """Claves de la caché que reconstruye este vigilante"""
+        return ARTIFACT_KEYS + tuple(('market_charts', bool(dark_mode), None) for dark_mode in self.chart_themes)
+
+    def rebuild(self):
+        """Reconstruye si la huella cambió desde la última vez; devuelve True si reconstruyó"""
+        watch = (self.data_dir,)
+        # La huella se toma antes de leer: un cambio durante la reconstrucción se detecta en la siguiente vuelta
+        version = cache.fingerprint(watch)
+        if version == self.version:
+            return False
+        write_columnar_copies(self.data_dir)
+        artifacts = build_artifacts(self.data_dir)
+        artifacts.update(build_market_charts(artifacts, self.chart_themes))
+        self.cache.put_many(artifacts, version)
+        self.version = version
+        self.rebuilds += 1
+        self.ready.set()
+        return True
+
+    def poll(self):
+        """Una vuelta del hilo: reconstruye si hace falta y registra el error si falla"""
+        try:
+            self.rebuild()
+            if self.last_error is not None:
+                self.cache.serve_stale(self.keys())
+            self.last_error = None
+        except Exception as e:
+            # Un archivo a medio escribir no debe matar el hilo; se reintenta en la siguiente vuelta
+            self.last_error = e
+            # Sin reconstrucción en marcha, servir la versión anterior ocultaría el fallo indefinidamente
+            self.cache.serve_stale(self.keys(), enabled=False)
+            logger.warning("No se pudieron reconstruir los datos derivados: %s", e)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self.cache.serve_stale(self.keys())
+            self._thread = threading.Thread(target=self._run, name='harmon-data-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.cache.serve_stale(self.keys(), enabled=False)
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def start_data_watcher(version=None, chart_themes=()):
+    """Arranca (una sola vez por proceso) el vigilante de ``src/data``
+
+    ``version`` es la huella con la que ya se cargaron los artefactos (p. ej.
+    desde un snapshot); si coincide con la actual no se reconstruye al arrancar.
+    """
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = DataWatcher(chart_themes=chart_themes)
+            if version is not None:
+                _watcher.version = version
+                _watcher.ready.set()
+            _watcher.start()
+        return _watcher
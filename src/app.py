@@ -1,39 +1,13 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import numpy as np
-from datetime import datetime, timedelta
-import json
-import os
-
-# 🎨 Paleta de colores simplificada - Azul y Blanco
-# Esquema de color centrado en azul #2563eb con gradientes
-COLORS = {
-    'primary': '#2563eb',      # Azul principal
-    'primary_light': '#3b82f6', # Azul claro
-    'primary_dark': '#1d4ed8',  # Azul oscuro
-    'secondary': '#1e40af',     # Azul secundario
-    'accent': '#60a5fa',        # Azul acento
-    'success': '#10b981',       # Verde para éxito
-    'warning': '#f59e0b',       # Ámbar para advertencias
-    'error': '#ef4444',         # Rojo para errores
-    'neutral': '#6b7280',       # Gris neutro
-    'light': '#9ca3af'          # Gris claro
-}
-
-# Paleta específica para gráficas - Solo gradientes de azul
-CHART_COLORS = [
-    '#2563eb',  # Azul principal
-    '#3b82f6',  # Azul medio
-    '#60a5fa',  # Azul claro
-    '#1d4ed8',  # Azul oscuro
-    '#1e40af',  # Azul secundario
-    '#93c5fd'   # Azul muy claro
-]
-import matplotlib.colors as mcolors
-from streamlit_option_menu import option_menu
+import weakref
+from datetime import datetime
+
+import analytics
+from analytics import charts
+from analytics.charts import COLORS, CHART_COLORS
+from analytics.profiling import Profiler, estimate_payload
 
 # Configuración de la página
 st.set_page_config(
@@ -91,9 +65,6 @@ def configure_plotly_theme(dark_mode=False):
             }
         }
 
-# Aplicar configuración global de Plotly basada en el modo
-import plotly.io as pio
-
 # JavaScript mejorado para sidebar y modo oscuro
 st.markdown("""
 <script>
@@ -149,15 +120,49 @@ document.addEventListener('DOMContentLoaded', function() {
 
 # Inicializar datos de sesión
 if 'centers_data' not in st.session_state:
-    st.session_state.centers_data = {}
+    st.session_state.centers_data = analytics.CenterStore()
+elif not isinstance(st.session_state.centers_data, analytics.CenterStore):
+    # Sesiones con un dict plano (p. ej. precargadas en pruebas) pasan al almacén con presupuesto
+    st.session_state.centers_data = analytics.CenterStore.from_mapping(st.session_state.centers_data)
 if 'current_center' not in st.session_state:
     st.session_state.current_center = None
+
+# El centro activo nunca se vuelca a disco
+st.session_state.centers_data.active = st.session_state.current_center
 if 'aggregated_data' not in st.session_state:
     st.session_state.aggregated_data = {}
+if 'alert_rules' not in st.session_state:
+    st.session_state.alert_rules = analytics.load_alert_rules()
+if 'alert_engine' not in st.session_state:
+    st.session_state.alert_engine = analytics.AlertEngine()
 if 'dark_mode' not in st.session_state:
     st.session_state.dark_mode = False
+if 'market_filters' not in st.session_state:
+    st.session_state.market_filters = analytics.make_filters()
 if 'selected_page' not in st.session_state:
     st.session_state.selected_page = "Dashboard"
+if 'profiling_enabled' not in st.session_state:
+    st.session_state.profiling_enabled = False
+if 'approximate_mode' not in st.session_state:
+    st.session_state.approximate_mode = False
+
+# Perfilado por secciones del rerun actual (se activa desde Configuración)
+profiler = Profiler(enabled=st.session_state.profiling_enabled)
+
+# Función para arrancar los servicios en segundo plano del proceso
+def start_background_services():
+    """Snapshot, vigilante de src/data y API de KPIs (cada uno una sola vez por proceso)"""
+    # Importaciones diferidas: no forman parte del grafo de importación del script
+    from analytics.api import start_api_server
+    from analytics.snapshot import install_snapshot
+
+    # Snapshot precalculado de los agregados y reconstrucción en segundo plano cuando cambia src/data
+    analytics.start_data_watcher(install_snapshot(), chart_themes=charts.CHART_THEMES)
+    # API local de KPIs sobre la misma caché, si se define HARMON_API_PORT
+    start_api_server()
+
+
+start_background_services()
 
 # Función para generar CSS según el modo
 def get_theme_css(dark_mode=False):
@@ -701,7 +706,8 @@ def get_theme_css(dark_mode=False):
 # Aplicar CSS dinámico basado en el modo
 st.markdown(get_theme_css(st.session_state.dark_mode), unsafe_allow_html=True)
 
-# Configurar Plotly según el modo
+# Configurar Plotly según el modo (plotly.io ya lo carga plotly.graph_objects)
+import plotly.io as pio
 pio.templates.default = "plotly_dark" if st.session_state.dark_mode else "plotly_white"
 
 # Función para mapear centros comerciales a zonas geográficas
@@ -731,78 +737,118 @@ def get_business_type(categoria):
     }
     return business_mapping.get(categoria, 'Otra')
 
+# Función para obtener el índice de filtros del mercado
+@profiler.profiled('agregación')
+def get_market_index():
+    """Datos del mercado ordenados por fecha con bitmaps por zona y tipo de negocio"""
+    try:
+        market_index, hit = analytics.cached_market_index()
+        profiler.mark_cache(hit)
+        return market_index
+        
+    except Exception as e:
+        st.error(f"Error al indexar los datos del mercado: {str(e)}")
+        return None
+
+# Función para obtener los agregados del mercado con los filtros globales de la barra lateral
+@profiler.profiled('agregación')
+def get_market_view():
+    """Subconjunto filtrado del mercado, o None si no hay filtros activos o no queda ninguna fila"""
+    market_index = get_market_index()
+    filters = st.session_state.market_filters
+    if market_index is None or not market_index.is_active(filters):
+        return None
+    try:
+        market_view, hit = market_index.view(filters)
+        profiler.mark_cache(hit)
+        return market_view if len(market_view) else None
+        
+    except Exception as e:
+        st.error(f"Error al aplicar los filtros del mercado: {str(e)}")
+        return None
+
+# Función para obtener los sketches por segmento del modo aproximado
+@profiler.profiled('agregación')
+def get_sketch_cube():
+    """t-digests y HyperLogLog por zona × tipo de negocio × mes"""
+    try:
+        sketch_cube, hit = analytics.cached_sketch_cube()
+        profiler.mark_cache(hit)
+        return sketch_cube
+        
+    except Exception as e:
+        st.error(f"Error al construir los sketches del mercado: {str(e)}")
+        return None
+
+# Función para obtener la distribución de un KPI por segmento con los filtros globales
+@profiler.profiled('agregación')
+def get_segment_distribution(metric, by):
+    """Cuantiles y centros distintos por segmento: exactos o, en modo aproximado, desde los sketches"""
+    try:
+        if st.session_state.approximate_mode:
+            sketch_cube = get_sketch_cube()
+            if sketch_cube is not None:
+                filters = st.session_state.market_filters
+                return sketch_cube.segment_table(metric, by, filters.zonas, filters.tipos,
+                                                 sketch_cube.months_between(filters.desde, filters.hasta))
+        _, market_df = load_market_data()
+        if market_df is None:
+            return None
+        return analytics.exact_segment_table(market_df, metric, by)
+        
+    except Exception as e:
+        st.error(f"Error al calcular la distribución por segmento: {str(e)}")
+        return None
+
+# Función para obtener el análisis de impulsores de los KPIs
+@profiler.profiled('agregación')
+def get_driver_analysis():
+    """Correlaciones y regresiones por zona y tipo de negocio (una vez por versión de datos y filtros)"""
+    try:
+        market_view = get_market_view()
+        if market_view is not None:
+            return market_view.drivers
+        driver_analysis, hit = analytics.cached_driver_analysis()
+        profiler.mark_cache(hit)
+        return driver_analysis
+        
+    except Exception as e:
+        st.error(f"Error al calcular los impulsores de los KPIs: {str(e)}")
+        return None
+
 # Función para cargar datos agregados del mercado
+@profiler.profiled('carga')
 def load_market_data():
-    """Carga los datos agregados del mercado desde el CSV"""
+    """Carga los datos agregados del mercado desde el CSV (caché compartida entre sesiones)"""
     try:
-        # Cargar datos agregados del mercado
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        csv_path = os.path.join(current_dir, 'data', 'datos_agregados_mercado.csv')
-        df = pd.read_csv(csv_path)
-        
-        # Convertir fecha a datetime
-        df['fecha'] = pd.to_datetime(df['fecha'])
-        
-        # Calcular totales y promedios del sector
-        sector_averages = {
-            'ventas_totales': df['ingresos_totales'].sum(),
-            'n_visitantes': df['trafico_peatonal'].sum(),
-            'ocupacion_por_m2': df['tasa_ocupacion'].mean(),
-            'ingresos_totales': df['ingresos_totales'].mean(),
-            'trafico_peatonal': df['trafico_peatonal'].mean(),
-            'ventas_por_m2': df['ventas_por_m2'].mean(),
-            'tasa_ocupacion': df['tasa_ocupacion'].mean(),
-            'tiempo_permanencia': df['tiempo_permanencia'].mean(),
-            'tasa_conversion': df['tasa_conversion'].mean()
-        }
-        
-        return sector_averages, df
+        market_view = get_market_view()
+        if market_view is not None:
+            return market_view.sector_avg, market_view.df
+        market_data, hit = analytics.cached_market_data()
+        profiler.mark_cache(hit)
+        return market_data
         
     except Exception as e:
         st.error(f"Error al cargar datos del mercado: {str(e)}")
         # Retornar valores por defecto si hay error
-        return {
-            'ventas_totales': 240000,
-            'n_visitantes': 11000,
-            'ocupacion_por_m2': 75.5,
-            'ingresos_totales': 10000,
-            'trafico_peatonal': 460,
-            'ventas_por_m2': 48.2,
-            'tasa_ocupacion': 75.5,
-            'tiempo_permanencia': 89.1,
-            'tasa_conversion': 26.4
-        }, None
+        return dict(analytics.DEFAULT_SECTOR_AVERAGES), None
 
 # Datos agregados del sector basados en datos reales
+@profiler.profiled('agregación')
 def get_sector_averages():
     sector_avg, _ = load_market_data()
     return sector_avg
 
 # Función para obtener datos por zona geográfica
+@profiler.profiled('agregación')
 def get_market_data_by_zone():
     """Obtiene datos del mercado agrupados por zona geográfica"""
     try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        csv_path = os.path.join(current_dir, 'data', 'datos_agregados_mercado.csv')
-        df = pd.read_csv(csv_path)
-        df['fecha'] = pd.to_datetime(df['fecha'])
-        
-        # Agrupar por zona geográfica
-        zone_data = df.groupby('zona_geografica').agg({
-            'trafico_peatonal': 'sum',
-            'ingresos_totales': 'sum',
-            'tamaño_m2': 'sum',
-            'empleados': 'sum',
-            'tasa_ocupacion': 'mean'
-        }).reset_index()
-        
-        # Renombrar columnas para compatibilidad
-        zone_data = zone_data.rename(columns={
-            'trafico_peatonal': 'afluencia',
-            'ingresos_totales': 'ingresos (€)',
-            'tasa_ocupacion': 'ocupacion_por_m2'
-        })
-        
+        market_view = get_market_view()
+        if market_view is not None:
+            return market_view.zone_data
+        zone_data, hit = analytics.cached_zone_data()
+        profiler.mark_cache(hit)
         return zone_data
         
     except Exception as e:
@@ -810,562 +856,293 @@ def get_market_data_by_zone():
         return None
 
 # Función para obtener datos por tipo de negocio
+@profiler.profiled('agregación')
 def get_market_data_by_business_type():
     """Obtiene datos del mercado agrupados por tipo de negocio"""
     try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        csv_path = os.path.join(current_dir, 'data', 'datos_agregados_mercado.csv')
-        df = pd.read_csv(csv_path)
-        df['fecha'] = pd.to_datetime(df['fecha'])
-        
-        # Agrupar por tipo de negocio
-        business_data = df.groupby('tipo_negocio').agg({
-            'trafico_peatonal': 'sum',
-            'ingresos_totales': 'sum',
-            'tamaño_m2': 'sum',
-            'empleados': 'sum',
-            'tasa_ocupacion': 'mean'
-        }).reset_index()
-        
-        # Renombrar columnas para compatibilidad
-        business_data = business_data.rename(columns={
-            'trafico_peatonal': 'afluencia',
-            'ingresos_totales': 'ingresos (€)',
-            'tasa_ocupacion': 'ocupacion_por_m2'
-        })
-        
+        market_view = get_market_view()
+        if market_view is not None:
+            return market_view.business_data
+        business_data, hit = analytics.cached_business_data()
+        profiler.mark_cache(hit)
         return business_data
         
     except Exception as e:
         st.error(f"Error al cargar datos por tipo de negocio: {str(e)}")
         return None
 
+# Función para obtener el índice de percentiles de los centros del mercado
+@profiler.profiled('agregación')
+def get_percentile_index():
+    """Distribución ordenada de cada KPI entre los centros del mercado"""
+    try:
+        market_view = get_market_view()
+        if market_view is not None:
+            return market_view.percentile_index
+        percentile_index, hit = analytics.cached_percentile_index()
+        profiler.mark_cache(hit)
+        return percentile_index
+        
+    except Exception as e:
+        st.error(f"Error al calcular los percentiles del mercado: {str(e)}")
+        return None
+
+# Función para obtener el índice de grupos de pares
+@profiler.profiled('agregación')
+def get_peer_index():
+    """Estadísticas precalculadas por zona × tipo de negocio × banda de tamaño"""
+    try:
+        peer_index, hit = analytics.cached_peer_index()
+        profiler.mark_cache(hit)
+        return peer_index
+        
+    except Exception as e:
+        st.error(f"Error al calcular los grupos de pares: {str(e)}")
+        return None
+
+# Función para obtener el perfil estacional del mercado
+@profiler.profiled('agregación')
+def get_seasonal_profile(filtered=True):
+    """Índices estacionales por mes y día de la semana de cada KPI, zona y tipo de negocio"""
+    try:
+        market_view = get_market_view() if filtered else None
+        if market_view is not None:
+            return market_view.seasonal_profile
+        seasonal_profile, hit = analytics.cached_seasonal_profile()
+        profiler.mark_cache(hit)
+        return seasonal_profile
+        
+    except Exception as e:
+        st.error(f"Error al calcular la estacionalidad del mercado: {str(e)}")
+        return None
+
+# Función para obtener la proyección de los KPIs de un centro subido
+@profiler.profiled('agregación')
+def get_center_forecast(center_data, zone):
+    """Proyección a MAX_HORIZON meses; se recalcula solo si cambian los datos del centro o del mercado"""
+    try:
+        seasonal_profile = get_seasonal_profile(filtered=False)
+        cached = center_data.get('forecast')
+        hit = cached is not None and cached[0]() is seasonal_profile and cached[1] == zone
+        if not hit:
+            forecast = analytics.forecast_center(center_data['monthly_data'], seasonal_profile, zone)
+            # Referencia débil al perfil del mercado: es compartido y no cuenta en la memoria del centro
+            center_data['forecast'] = (weakref.ref(seasonal_profile), zone, forecast)
+        profiler.mark_cache(hit)
+        return center_data['forecast'][2]
+        
+    except Exception as e:
+        st.error(f"Error al calcular la proyección de KPIs: {str(e)}")
+        return {}
+
+# Función para obtener el índice de anomalías del mercado
+@profiler.profiled('agregación')
+def get_anomaly_index():
+    """Días anómalos (z-score robusto) de todos los centros del mercado"""
+    try:
+        anomaly_index, hit = analytics.cached_anomaly_index()
+        profiler.mark_cache(hit)
+        return anomaly_index
+        
+    except Exception as e:
+        st.error(f"Error al detectar anomalías del mercado: {str(e)}")
+        return None
+
+# Función para detectar anomalías en los datos diarios de un centro subido
+@profiler.profiled('agregación')
+def get_center_anomalies(center_data):
+    """Índice de anomalías del centro; se calcula una vez por carga de datos"""
+    try:
+        hit = 'anomalies' in center_data
+        if not hit:
+            center_data['anomalies'] = analytics.AnomalyIndex.from_center(center_data['raw_data'], center_data['name'])
+        profiler.mark_cache(hit)
+        return center_data['anomalies']
+        
+    except Exception as e:
+        st.error(f"Error al detectar anomalías del centro: {str(e)}")
+        return None
+
+# Función para obtener la tabla de variaciones por periodo de un centro subido
+@profiler.profiled('agregación')
+def get_center_lags(center_data):
+    """Variaciones MoM, QoQ y YoY del centro; se calculan una vez por carga de datos"""
+    try:
+        hit = 'lags' in center_data
+        if not hit:
+            center_data['lags'] = analytics.LagTable.from_center(center_data['monthly_data'], center_data['name'])
+        profiler.mark_cache(hit)
+        return center_data['lags']
+        
+    except Exception as e:
+        st.error(f"Error al calcular las variaciones por periodo: {str(e)}")
+        return None
+
+# Función para obtener el mix de categorías de un centro subido frente al mercado
+@profiler.profiled('agregación')
+def get_category_mix(center_data):
+    """Cuotas por tipo de negocio del centro y del mercado; None si el archivo no trae tipo_negocio"""
+    try:
+        hit = 'category_mix' in center_data
+        if not hit:
+            rollup = center_data.get('category_rollup')
+            if rollup is None and 'category_rollup' not in center_data:
+                # Centros cargados antes de que la ingesta acumulara el resumen por tipo de negocio;
+                # sus datos diarios pueden estar volcados a disco por el CenterStore
+                raw_frame = st.session_state.centers_data.raw_frame(center_data['name'])
+                rollup = analytics.category_rollup(raw_frame)
+            center_data['category_mix'] = analytics.category_mix(rollup) if rollup else None
+        profiler.mark_cache(hit)
+        center_mix = center_data['category_mix']
+        business_data = get_market_data_by_business_type()
+        if center_mix is None or business_data is None:
+            return center_mix, None
+        return center_mix, analytics.market_category_mix(business_data)
+        
+    except Exception as e:
+        st.error(f"Error al calcular el mix de categorías: {str(e)}")
+        return None, None
+
+# Función para evaluar las reglas de alerta de todos los centros cargados
+@profiler.profiled('agregación')
+def get_alert_breaches():
+    """Incumplimientos de umbrales; solo se comprueban los datos nuevos de cada centro"""
+    try:
+        return st.session_state.alert_engine.update(st.session_state.centers_data, st.session_state.alert_rules)
+        
+    except Exception as e:
+        st.error(f"Error al evaluar las alertas: {str(e)}")
+        return None
+
+# Función para obtener los días anómalos más recientes del mercado con los filtros globales
+@profiler.profiled('agregación')
+def get_recent_market_anomalies(limit=20):
+    """Últimos días anómalos de los centros del mercado dentro de los filtros activos"""
+    anomaly_index = get_anomaly_index()
+    if anomaly_index is None:
+        return None
+    market_view = get_market_view()
+    if market_view is None:
+        return anomaly_index.recent(limit)
+    filters = st.session_state.market_filters
+    return anomaly_index.recent(limit, market_view.centers, filters.desde, filters.hasta)
+
+# Función para presentar días anómalos en una tabla
+def anomaly_table(flags):
+    return pd.DataFrame({
+        'Fecha': flags['fecha'].dt.strftime('%d/%m/%Y'),
+        'KPI': flags['metrica'].map({metric: name for metric, name, _ in analytics.METRICS_INFO}),
+        'Valor': flags['valor'].round(1),
+        f'Mediana {analytics.ANOMALY_WINDOW} días': flags['mediana'].round(1),
+        'z robusto': flags['z'].round(1),
+        'Dirección': flags['direccion']
+    })
+
 # Función para cargar datos individuales de un centro comercial
+@profiler.profiled('carga')
 def load_individual_center_data():
     """Carga los datos individuales de un centro comercial"""
     try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        csv_path = os.path.join(current_dir, 'data', 'datos_individuales_centros.csv')
-        df = pd.read_csv(csv_path)
-        df['fecha'] = pd.to_datetime(df['fecha'])
-        
-        return df
+        individual_data, hit = analytics.cached_individual_center_data()
+        profiler.mark_cache(hit)
+        return individual_data
         
     except Exception as e:
         st.error(f"Error al cargar datos individuales: {str(e)}")
         return None
 
 # Función para obtener datos de rendimiento por centro comercial (sin nombres)
+@profiler.profiled('agregación')
 def get_center_performance_data():
     """Obtiene datos de rendimiento de todos los centros sin mostrar nombres"""
     try:
-        # Cargar datos individuales
-        df = load_individual_center_data()
-        if df is None:
-            return None
-        
-        # Agrupar por centro comercial
-        center_data = df.groupby('centro_id').agg({
-            'trafico_peatonal': 'mean',
-            'ingresos_totales': 'sum',
-            'tamaño_m2': 'first',
-            'empleados': 'first'
-        }).reset_index()
-        
-        # Calcular métricas adicionales
-        center_data['ventas_por_m2'] = center_data['ingresos_totales'] / center_data['tamaño_m2']
-        center_data['productividad_empleado'] = center_data['ingresos_totales'] / center_data['empleados']
-        
-        # Remover IDs de centros para privacidad
-        center_data = center_data.drop('centro_id', axis=1)
-        
-        return center_data
+        center_performance, hit = analytics.cached_center_performance()
+        profiler.mark_cache(hit)
+        return center_performance
         
     except Exception as e:
         st.error(f"Error al cargar datos de rendimiento: {str(e)}")
         return None
 
 # Función para procesar archivo Excel/CSV
+@profiler.profiled('ingesta', payload=False)
 def process_uploaded_file(uploaded_file, center_name, center_type):
-    try:
-        if uploaded_file.name.endswith('.xlsx'):
-            df = pd.read_excel(uploaded_file)
-        elif uploaded_file.name.endswith('.csv'):
-            df = pd.read_csv(uploaded_file)
-        else:
-            return None, "Formato de archivo no soportado"
-        
-        # Validar estructura del archivo
-        required_columns = ['fecha', 'trafico_peatonal', 'ventas_por_m2', 'tasa_ocupacion', 
-                          'tiempo_permanencia', 'tasa_conversion', 'ingresos_totales']
-        
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            return None, f"Faltan las siguientes columnas: {', '.join(missing_columns)}"
-        
-        # Procesar datos
-        df['fecha'] = pd.to_datetime(df['fecha'])
-        df = df.sort_values('fecha')
-        
-        # Calcular promedios mensuales
-        df['year_month'] = df['fecha'].dt.to_period('M')
-        monthly_data = df.groupby('year_month').agg({
-            'trafico_peatonal': 'mean',
-            'ventas_por_m2': 'mean',
-            'tasa_ocupacion': 'mean',
-            'tiempo_permanencia': 'mean',
-            'tasa_conversion': 'mean',
-            'ingresos_totales': 'sum'
-        }).reset_index()
-        
-        # Convertir Period a string para serialización
-        monthly_data['fecha'] = monthly_data['year_month'].astype(str)
-        monthly_data = monthly_data.drop('year_month', axis=1)
-        
-        center_data = {
-            'name': center_name,
-            'type': center_type,
-            'raw_data': df.to_dict('records'),
-            'monthly_data': monthly_data.to_dict('records'),
-            'upload_date': datetime.now().isoformat()
-        }
-        
-        return center_data, "Datos procesados correctamente"
-        
-    except Exception as e:
-        return None, f"Error al procesar el archivo: {str(e)}"
+    return analytics.process_center_file(uploaded_file, center_name, center_type)
 
 # Función para crear gráfica de KPIs mejorada
-def create_kpi_chart(data, sector_avg, metric_name, title, unit):
-    if not data:
-        return go.Figure().add_annotation(text="No hay datos disponibles", 
-                                        xref="paper", yref="paper", 
-                                        x=0.5, y=0.5, showarrow=False)
-    
-    fig = go.Figure()
-    
-    # Convertir fechas a formato datetime para mejor visualización
-    dates = pd.to_datetime([d['fecha'] for d in data])
-    values = [d[metric_name] for d in data]
-    
-    # Datos del centro con área sombreada
-    fig.add_trace(go.Scatter(
-        x=dates,
-        y=values,
-        mode='lines+markers',
-        name='Tu Centro',
-        line=dict(color=COLORS['primary'], width=3),
-        marker=dict(size=8, color=COLORS['primary']),
-        fill='tonexty',
-        fillcolor='rgba(37, 99, 235, 0.1)'
-    ))
-    
-    # Promedio del sector
-    fig.add_hline(
-        y=sector_avg,
-        line_dash="dash",
-        line_color="orange",
-        line_width=2,
-        annotation_text=f"Promedio Sector: {sector_avg:.1f}{unit}",
-        annotation_position="top right",
-        annotation_font_color="orange"
-    )
-    
-    # Calcular tendencia
-    if len(values) > 1:
-        trend = (values[-1] - values[0]) / values[0] * 100
-        trend_color = "green" if trend > 0 else "red"
-        fig.add_annotation(
-            text=f"Tendencia: {trend:+.1f}%",
-            xref="paper", yref="paper",
-            x=0.02, y=0.98,
-            showarrow=False,
-            font=dict(color=trend_color, size=12)
-        )
-    
-    # Configurar colores según el modo
-    title_color = "#ffffff" if st.session_state.dark_mode else "#2c3e50"
-    bg_color = '#2d2d30' if st.session_state.dark_mode else 'rgba(0,0,0,0)'
-    axis_text_color = '#ffffff' if st.session_state.dark_mode else '#1f2937'
-    
-    fig.update_layout(
-        title=dict(text=title, font=dict(size=16, color=title_color)),
-        xaxis_title="Fecha",
-        yaxis_title=f"{title} ({unit})",
-        xaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
-        yaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
-        template="plotly_dark" if st.session_state.dark_mode else "plotly_white",
-        height=350,
-        margin=dict(l=0, r=0, t=60, b=0),
-        hovermode='x unified',
-        showlegend=True,
-        plot_bgcolor=bg_color,
-        paper_bgcolor=bg_color
-    )
-    
-    return fig
+@profiler.profiled('gráfica')
+def create_kpi_chart(data, sector_avg, metric_name, title, unit, forecast=None, anomalies=None):
+    return charts.create_kpi_chart(data, sector_avg, metric_name, title, unit,
+                                   dark_mode=st.session_state.dark_mode, forecast=forecast, anomalies=anomalies)
 
 # Función para crear gráfica de comparación mejorada
+@profiler.profiled('gráfica')
 def create_comparison_chart(center_data, sector_avg):
-    metrics = ['trafico_peatonal', 'ventas_por_m2', 'tasa_ocupacion', 
-               'tiempo_permanencia', 'tasa_conversion', 'ingresos_totales']
-    
-    metric_names = ['Tráfico Peatonal', 'Ventas/m²', 'Ocupación', 
-                   'Tiempo Permanencia', 'Conversión', 'Ingresos']
-    
-    center_values = []
-    sector_values = []
-    performance = []
-    
-    for metric in metrics:
-        if center_data:
-            center_val = center_data[metric]
-            center_values.append(center_val)
-            # Calcular rendimiento relativo
-            perf = (center_val / sector_avg[metric] - 1) * 100
-            performance.append(perf)
-        else:
-            center_values.append(0)
-            performance.append(-100)
-        sector_values.append(sector_avg[metric])
-    
-    fig = go.Figure()
-    
-    # Crear colores basados en el rendimiento - Solo azules
-    colors = [COLORS['primary'] if p > 0 else COLORS['accent'] for p in performance]
-    
-    fig.add_trace(go.Bar(
-        name='Tu Centro',
-        x=metric_names,
-        y=center_values,
-        marker_color=colors,
-        text=[f"{p:+.1f}%" for p in performance],
-        textposition='auto',
-        textfont=dict(color='#ffffff' if st.session_state.dark_mode else '#212529', size=10)
-    ))
-    
-    fig.add_trace(go.Bar(
-        name='Promedio Sector',
-        x=metric_names,
-        y=sector_values,
-        marker_color='rgba(100, 116, 139, 0.7)',  # Gris azulado para contraste
-        opacity=0.7
-    ))
-    
-    # Configurar colores según el modo
-    title_color = "#ffffff" if st.session_state.dark_mode else "#2c3e50"
-    bg_color = '#2d2d30' if st.session_state.dark_mode else 'rgba(0,0,0,0)'
-    axis_text_color = '#ffffff' if st.session_state.dark_mode else '#1f2937'
-    
-    fig.update_layout(
-        title=dict(text="Comparación vs. Promedio del Sector", 
-                  font=dict(size=16, color=title_color)),
-        xaxis=dict(tickfont=dict(color=axis_text_color)),
-        yaxis=dict(tickfont=dict(color=axis_text_color)),
-        template="plotly_dark" if st.session_state.dark_mode else "plotly_white",
-        height=450,
-        barmode='group',
-        xaxis_tickangle=-45,
-        hovermode='x unified',
-        showlegend=True,
-        plot_bgcolor=bg_color,
-        paper_bgcolor=bg_color
-    )
-    
-    return fig
+    return charts.create_comparison_chart(center_data, sector_avg, dark_mode=st.session_state.dark_mode)
+
+# Función para crear la gráfica de radar centro vs mercado
+@profiler.profiled('gráfica')
+def create_radar_chart(center_values, sector_values):
+    return charts.create_radar_chart(center_values, sector_values, dark_mode=st.session_state.dark_mode)
+
+# Función para construir la matriz de comparación de varios centros
+@profiler.profiled('agregación')
+def get_center_matrix(center_names):
+    """KPIs de los centros seleccionados desde un único frame apilado"""
+    try:
+        stacked = analytics.stack_centers(st.session_state.centers_data, center_names)
+        return analytics.CenterMatrix(stacked, get_sector_averages(), get_percentile_index())
+        
+    except Exception as e:
+        st.error(f"Error al comparar los centros: {str(e)}")
+        return None
+
+# Función para crear el mapa de calor de centros
+@profiler.profiled('gráfica')
+def create_center_heatmap(matrix):
+    return charts.create_center_heatmap(matrix, dark_mode=st.session_state.dark_mode)
+
+# Función para crear las pequeñas gráficas por KPI
+@profiler.profiled('gráfica')
+def create_center_small_multiples(matrix):
+    return charts.create_center_small_multiples(matrix, dark_mode=st.session_state.dark_mode)
+
+# Función para crear el mapa de calor de correlaciones
+@profiler.profiled('gráfica')
+def create_correlation_heatmap(correlations, title):
+    return charts.create_correlation_heatmap(correlations, title, dark_mode=st.session_state.dark_mode)
 
 # Función para crear gráfica de rendimiento por categorías
-def create_category_performance_chart():
-    categories = ['Moda', 'Alimentación', 'Electrónica', 'Hogar', 'Deportes', 'Otros']
-    values = [35, 25, 15, 12, 8, 5]
-    colors = CHART_COLORS
-    
-    fig = go.Figure(data=[go.Pie(
-        labels=categories,
-        values=values,
-        hole=0.4,
-        marker_colors=colors,
-        textinfo='label+percent',
-        textfont=dict(size=12, color='#ffffff' if st.session_state.dark_mode else '#212529')
-    )])
-    
-    # Configurar colores según el modo
-    title_color = "#ffffff" if st.session_state.dark_mode else "#2c3e50"
-    bg_color = '#2d2d30' if st.session_state.dark_mode else 'rgba(0,0,0,0)'
-    text_color = '#ffffff' if st.session_state.dark_mode else '#1f2937'
-    
-    fig.update_layout(
-        title=dict(text="Distribución por Categorías", 
-                  font=dict(size=16, color=title_color)),
-        template="plotly_dark" if st.session_state.dark_mode else "plotly_white",
-        height=400,
-        showlegend=True,
-        legend=dict(
-            orientation="v",
-            yanchor="middle",
-            y=0.5,
-            xanchor="left",
-            x=1.01,
-            font=dict(color=text_color)
-        ),
-        plot_bgcolor=bg_color,
-        paper_bgcolor=bg_color
-    )
-    
-    # Update pie chart text colors
-    fig.update_traces(
-        textfont=dict(size=12, color=text_color)
-    )
-    
-    return fig
+@profiler.profiled('gráfica')
+def create_category_performance_chart(center_mix, market_mix, share):
+    return charts.create_category_performance_chart(center_mix, market_mix, share,
+                                                    dark_mode=st.session_state.dark_mode)
 
 # Función para crear gráficas de análisis del mercado
+@profiler.profiled('gráfica')
 def create_market_analysis_charts():
     """Crea gráficas útiles basadas en datos reales del mercado"""
-    charts = {}
-    
     try:
-        # Obtener datos del mercado
-        zone_data = get_market_data_by_zone()
-        business_data = get_market_data_by_business_type()
-        sector_avg, market_df = load_market_data()
-        
-        # 1. Ventas por Zona Geográfica
-        if zone_data is not None:
-            fig_zones = go.Figure()
-            fig_zones.add_trace(go.Bar(
-                x=zone_data['zona_geografica'],
-                y=zone_data['ingresos (€)'],
-                name='Ventas por Zona',
-                marker_color=CHART_COLORS,
-                text=[f"{v:,.0f}€" for v in zone_data['ingresos (€)']],
-                textposition='auto',
-                textfont=dict(color='#ffffff' if st.session_state.dark_mode else '#212529', size=12)
-            ))
-            
-            # Configurar colores según el modo
-            title_color = "#ffffff" if st.session_state.dark_mode else "#2c3e50"
-            axis_text_color = '#ffffff' if st.session_state.dark_mode else '#1f2937'
-            fig_zones.update_layout(
-                title=dict(text="💰 Ventas Totales por Zona Geográfica", font=dict(size=16, color=title_color)),
-                xaxis_title="Zona Geográfica",
-                yaxis_title="Ventas Totales (€)",
-                 xaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
-                 yaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
-                 template="plotly_dark" if st.session_state.dark_mode else "plotly_white",
-                 height=400,
-                 plot_bgcolor='#2d2d30' if st.session_state.dark_mode else 'rgba(0,0,0,0)',
-                 paper_bgcolor='#2d2d30' if st.session_state.dark_mode else 'rgba(0,0,0,0)'
-            )
-            charts['ventas_zonas'] = fig_zones
-        
-        # 2. Ocupación por m² por Zona
-        if zone_data is not None:
-            fig_ocupacion = go.Figure()
-            fig_ocupacion.add_trace(go.Bar(
-                x=zone_data['zona_geografica'],
-                y=zone_data['ocupacion_por_m2'],
-                name='Ocupación por m²',
-                marker_color=CHART_COLORS,
-                text=[f"{v:.1f}%" for v in zone_data['ocupacion_por_m2']],
-                textposition='auto',
-                textfont=dict(color='#ffffff' if st.session_state.dark_mode else '#212529', size=12)
-            ))
-            
-            # Configurar colores según el modo
-            title_color = "#ffffff" if st.session_state.dark_mode else "#2c3e50"
-            axis_text_color = '#ffffff' if st.session_state.dark_mode else '#1f2937'
-            fig_ocupacion.update_layout(
-                title=dict(text="🏢 Tasa de Ocupación por Zona Geográfica", font=dict(size=16, color=title_color)),
-                xaxis_title="Zona Geográfica",
-                yaxis_title="Tasa de Ocupación (%)",
-                 xaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
-                 yaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
-                 template="plotly_dark" if st.session_state.dark_mode else "plotly_white",
-                 height=400,
-                 plot_bgcolor='#2d2d30' if st.session_state.dark_mode else 'rgba(0,0,0,0)',
-                 paper_bgcolor='#2d2d30' if st.session_state.dark_mode else 'rgba(0,0,0,0)'
-            )
-            charts['ocupacion_zonas'] = fig_ocupacion
-        
-        # 3. Comparación por Tipo de Negocio
-        if business_data is not None:
-            fig_business = make_subplots(
-                rows=1, cols=2,
-                subplot_titles=('Ventas por Tipo de Negocio', 'Visitantes por Tipo de Negocio'),
-                specs=[[{"type": "bar"}, {"type": "bar"}]]
-            )
-            
-            # Ventas por tipo de negocio
-            fig_business.add_trace(
-                go.Bar(
-                    x=business_data['tipo_negocio'],
-                    y=business_data['ingresos (€)'],
-                    name='Ventas',
-                    marker_color=['#2563eb', '#3b82f6', '#60a5fa'],
-                    text=[f"{v:,.0f}€" for v in business_data['ingresos (€)']],
-                    textposition='auto',
-                    textfont=dict(color='#ffffff' if st.session_state.dark_mode else '#212529', size=12)
-                ),
-                row=1, col=1
-            )
-            
-            # Visitantes por tipo de negocio
-            fig_business.add_trace(
-                go.Bar(
-                    x=business_data['tipo_negocio'],
-                    y=business_data['afluencia'],
-                    name='Visitantes',
-                    marker_color=['#1d4ed8', '#1e40af', '#93c5fd'],
-                    text=[f"{v:,.0f}" for v in business_data['afluencia']],
-                    textposition='auto',
-                    textfont=dict(color='#ffffff' if st.session_state.dark_mode else '#212529', size=12)
-                ),
-                row=1, col=2
-            )
-            
-            # Configurar colores según el modo
-            title_color = "#ffffff" if st.session_state.dark_mode else "#2c3e50"
-            axis_text_color = '#ffffff' if st.session_state.dark_mode else '#1f2937'
-            
-            fig_business.update_layout(
-                title=dict(text="🎯 Análisis por Tipo de Negocio", font=dict(size=16, color=title_color)),
-                template="plotly_dark" if st.session_state.dark_mode else "plotly_white",
-                height=400,
-                showlegend=False,
-                plot_bgcolor='#2d2d30' if st.session_state.dark_mode else 'rgba(0,0,0,0)',
-                paper_bgcolor='#2d2d30' if st.session_state.dark_mode else 'rgba(0,0,0,0)',
-                # Configurar colores de ejes para ambos subplots
-                xaxis=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color)),
-                yaxis=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color)),
-                xaxis2=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color)),
-                yaxis2=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color))
-            )
-            charts['business_comparison'] = fig_business
-        
-        # 4. Top Performers (Ranking)
-        if zone_data is not None and business_data is not None:
-            fig_ranking = make_subplots(
-                rows=2, cols=1,
-                subplot_titles=('🏆 Top Zonas por Rendimiento', '🎯 Top Tipos de Negocio por Ocupación'),
-                specs=[[{"type": "bar"}], [{"type": "bar"}]]
-            )
-            
-            # Ranking de zonas por ventas
-            zone_sorted = zone_data.sort_values('ingresos (€)', ascending=True)
-            fig_ranking.add_trace(
-                go.Bar(
-                    y=zone_sorted['zona_geografica'],
-                    x=zone_sorted['ingresos (€)'],
-                    orientation='h',
-                    name='Ventas por Zona',
-                     marker_color='#2563eb',
-                    text=[f"{v:,.0f}€" for v in zone_sorted['ingresos (€)']],
-                    textposition='auto',
-                    textfont=dict(color='#ffffff' if st.session_state.dark_mode else '#212529', size=12)
-                ),
-                row=1, col=1
-            )
-            
-            # Ranking de tipos de negocio por ocupación
-            business_sorted = business_data.sort_values('ocupacion_por_m2', ascending=True)
-            fig_ranking.add_trace(
-                go.Bar(
-                    y=business_sorted['tipo_negocio'],
-                    x=business_sorted['ocupacion_por_m2'],
-                    orientation='h',
-                    name='Ocupación por Tipo',
-                     marker_color='#3b82f6',
-                    text=[f"{v:.1f}%" for v in business_sorted['ocupacion_por_m2']],
-                    textposition='auto',
-                    textfont=dict(color='#ffffff' if st.session_state.dark_mode else '#212529', size=12)
-                ),
-                row=2, col=1
-            )
-            
-            # Configurar colores según el modo
-            title_color = "#ffffff" if st.session_state.dark_mode else "#2c3e50"
-            axis_text_color = '#ffffff' if st.session_state.dark_mode else '#1f2937'
-            
-            fig_ranking.update_layout(
-                title=dict(text="📊 Rankings de Rendimiento", font=dict(size=16, color=title_color)),
-                template="plotly_dark" if st.session_state.dark_mode else "plotly_white",
-                height=600,
-                margin=dict(t=100),
-                showlegend=False,
-                plot_bgcolor='#2d2d30' if st.session_state.dark_mode else 'rgba(0,0,0,0)',
-                paper_bgcolor='#2d2d30' if st.session_state.dark_mode else 'rgba(0,0,0,0)',
-                # Configurar colores de ejes para ambos subplots
-                xaxis=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color)),
-                yaxis=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color)),
-                xaxis2=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color)),
-                yaxis2=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color)),
-                # Configurar colores de títulos de subplots
-                annotations=[
-                    dict(text="🏆 Top Zonas por Rendimiento", x=0.5, y=1.05, xref="paper", yref="paper", 
-                         showarrow=False, font=dict(size=14, color=title_color)),
-                    dict(text="🎯 Top Tipos de Negocio por Ocupación", x=0.5, y=0.45, xref="paper", yref="paper", 
-                         showarrow=False, font=dict(size=14, color=title_color))
-                ]
-            )
-            charts['rankings'] = fig_ranking
-        
-        # 5. Análisis de Eficiencia (Ventas vs Visitantes)
-        if market_df is not None:
-            fig_efficiency = go.Figure()
-            
-            # Calcular eficiencia (ventas por visitante)
-            market_df['eficiencia'] = market_df['ingresos_totales'] / market_df['trafico_peatonal']
-            
-            # Scatter plot por zona y tipo de negocio
-            colors_map = {
-                            'Madrid': '#60a5fa',           # Azul claro
-                            'Cataluña': '#93c5fd',         # Azul muy claro
-                            'Norte': '#2563eb',            # Azul principal
-                            'Sur': '#3b82f6',              # Azul medio
-                            'Castilla-La Mancha': '#1e40af', # Azul oscuro
-                            'León': '#64748b'              # Gris azulado suave
-                        }
-            
-            for zona in market_df['zona_geografica'].unique():
-                data_zona = market_df[market_df['zona_geografica'] == zona]
-                fig_efficiency.add_trace(go.Scatter(
-                    x=data_zona['trafico_peatonal'],
-                    y=data_zona['ingresos_totales'],
-                    mode='markers',
-                    name=zona,
-                    marker=dict(
-                        size=data_zona['tasa_ocupacion']/3,  # Tamaño basado en ocupación
-                        color=colors_map.get(zona, '#999999'),
-                        opacity=0.7
-                    ),
-                    text=[f"{zona}<br>Tipo: {tipo}<br>Ocupación: {ocup:.1f}%" 
-                          for tipo, ocup in zip(data_zona['tipo_negocio'], data_zona['tasa_ocupacion'])],
-                    hovertemplate='%{text}<br>Visitantes: %{x}<br>Ventas: %{y:,.0f}€<extra></extra>'
-                ))
-            
-            # Configurar colores según el modo
-            title_color = "#ffffff" if st.session_state.dark_mode else "#2c3e50"
-            axis_text_color = '#ffffff' if st.session_state.dark_mode else '#1f2937'
-            fig_efficiency.update_layout(
-                title=dict(text="⚡ Eficiencia: Ventas vs Visitantes (tamaño = ocupación)", font=dict(size=16, color=title_color)),
-                xaxis_title="Visitantes",
-                yaxis_title="Ventas (€)",
-                 xaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
-                 yaxis=dict(title_font=dict(color=axis_text_color), tickfont=dict(color=axis_text_color)),
-                 template="plotly_dark" if st.session_state.dark_mode else "plotly_white",
-                 height=500,
-                 plot_bgcolor='#2d2d30' if st.session_state.dark_mode else 'rgba(0,0,0,0)',
-                 paper_bgcolor='#2d2d30' if st.session_state.dark_mode else 'rgba(0,0,0,0)'
-            )
-            charts['efficiency'] = fig_efficiency
-        
-        return charts
+        market_view = get_market_view()
+        if market_view is not None:
+            return market_view.charts(st.session_state.dark_mode)
+        # Figuras compartidas entre sesiones, una versión por tema
+        market_charts, hit = analytics.cached_market_charts(st.session_state.dark_mode)
+        profiler.mark_cache(hit)
+        return market_charts
         
     except Exception as e:
         print(f"Error creating market analysis charts: {e}")
         return {}
 
+# Función para mostrar gráficas Plotly midiendo su envío al navegador
+def plotly_chart(fig, **kwargs):
+    with profiler.section(fig.layout.title.text or "Gráfica sin título", 'render') as entry:
+        result = st.plotly_chart(fig, **kwargs)
+    if profiler.enabled:
+        entry['payload_bytes'] = estimate_payload(fig)
+    return result
+
 # Navegación principal - Sidebar elegante y moderno
 with st.sidebar:
     # Header minimalista
@@ -1406,7 +1183,7 @@ with st.sidebar:
     """, unsafe_allow_html=True)
     
     # Menú de navegación elegante sin iconos
-    nav_options = ["Dashboard", "Análisis vs Mercado", "Configuración"]
+    nav_options = ["Dashboard", "Análisis vs Mercado", "Comparar Centros", "Datos del Mercado", "Configuración"]
     
     # Crear botones de navegación elegantes
     selected = st.session_state.selected_page
@@ -1433,6 +1210,39 @@ with st.sidebar:
         <div style="height: 1px; background: linear-gradient(90deg, transparent, #334155, transparent); margin: 0 1rem;"></div>
     </div>
     """, unsafe_allow_html=True)
+    
+    # Filtros globales del mercado: afectan a todas las gráficas y KPIs del sector
+    market_index = get_market_index()
+    if market_index is not None:
+        st.markdown("""
+        <div style="color: #94a3b8; font-size: 0.8rem; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 1rem; text-align: center;">
+            Filtros del Mercado
+        </div>
+        """, unsafe_allow_html=True)
+        
+        filter_zones = st.multiselect("Zona geográfica", market_index.options['zona_geografica'],
+                                      key="filter_zones", placeholder="Todas")
+        filter_types = st.multiselect("Tipo de negocio", market_index.options['tipo_negocio'],
+                                      key="filter_types", placeholder="Todos")
+        first_date, last_date = market_index.date_range()
+        if first_date is not None:
+            date_range = st.date_input("Periodo", value=(first_date.date(), last_date.date()),
+                                       min_value=first_date.date(), max_value=last_date.date(),
+                                       key="filter_dates", format="DD/MM/YYYY")
+            # Mientras se elige el rango, date_input devuelve solo la fecha inicial
+            date_range = tuple(date_range) if isinstance(date_range, (tuple, list)) else (date_range,)
+            desde = date_range[0] if date_range else None
+            hasta = date_range[1] if len(date_range) > 1 else None
+        else:
+            desde = hasta = None
+        st.session_state.market_filters = analytics.make_filters(filter_zones, filter_types, desde, hasta)
+        
+        if market_index.is_active(st.session_state.market_filters):
+            market_view = get_market_view()
+            if market_view is None:
+                st.warning("Ningún registro cumple los filtros; se muestra el mercado completo.")
+            else:
+                st.caption(f"{len(market_view):,} de {len(market_index.df):,} registros del mercado".replace(',', '.'))
 
 # Si no hay selección, usar Dashboard por defecto
 if not selected:
@@ -1488,6 +1298,7 @@ if selected == "Dashboard":
                     )
                     
                     if center_data:
+                        st.session_state.centers_data.active = center_name
                         st.session_state.centers_data[center_name] = center_data
                         st.session_state.current_center = center_name
                         st.session_state.uploaded_file = None
@@ -1622,6 +1433,115 @@ if selected == "Dashboard":
             </div>
             """, unsafe_allow_html=True)
         
+        # Mix de categorías del centro frente al del mercado
+        st.subheader("🛍️ Mix de Categorías")
+        
+        center_mix, market_mix = get_category_mix(center_data)
+        if center_mix is None:
+            st.info("El archivo del centro no incluye la columna tipo_negocio: no se puede calcular su mix de categorías.")
+        else:
+            share_label = st.radio("Cuota de", ["Ingresos", "Tráfico"], horizontal=True, key="category_share")
+            share = 'cuota_ingresos' if share_label == "Ingresos" else 'cuota_trafico'
+            plotly_chart(create_category_performance_chart(center_mix, market_mix, share), use_container_width=True)
+            if market_mix is not None:
+                mix_comparison = analytics.compare_category_mix(center_mix, market_mix)
+                st.dataframe(pd.DataFrame({
+                    'Tipo de negocio': mix_comparison['tipo_negocio'],
+                    'Tu centro (%)': mix_comparison[share].round(1),
+                    'Mercado (%)': mix_comparison[f"{share}_mercado"].round(1),
+                    'Diferencia (pp)': mix_comparison[f"diferencia_{share}"].round(1)
+                }), use_container_width=True, hide_index=True)
+        
+        # Variación del último mes frente al periodo de referencia elegido
+        st.subheader("📅 Variación por Periodo")
+        
+        comparison_basis = st.radio(
+            "Comparar con", list(analytics.COMPARISON_BASES), horizontal=True, key="comparison_basis",
+            format_func=lambda basis: f"{basis} · {analytics.COMPARISON_BASES[basis][0]}"
+        )
+        center_lags = get_center_lags(center_data)
+        comparison = (center_lags.latest_comparison(center_data['name'], comparison_basis)
+                      if center_lags is not None else None)
+        if comparison is not None:
+            columns = st.columns(3)
+            for i, (metric, name, unit) in enumerate(analytics.METRICS_INFO):
+                delta = comparison['variacion'][metric]
+                with columns[i % 3]:
+                    st.metric(
+                        name,
+                        f"{comparison['valor'][metric]:,.1f} {unit}",
+                        None if pd.isna(delta) else f"{delta:+.1f}%",
+                        help=(f"{comparison['mes'].strftime('%m/%Y')} frente a "
+                              f"{comparison['mes_referencia'].strftime('%m/%Y')}"
+                              + (" (sin datos de ese mes)" if pd.isna(delta) else ""))
+                    )
+            if any(pd.isna(delta) for delta in comparison['variacion'].values()):
+                st.caption(f"Sin variación donde falta el mes de referencia "
+                           f"({comparison['mes_referencia'].strftime('%m/%Y')}): no se compara con otro mes.")
+        
+        # Proyección de los KPIs del centro
+        st.subheader("🔮 Proyección de tus KPIs")
+        
+        horizon = st.slider("Meses a proyectar", analytics.MIN_HORIZON, analytics.MAX_HORIZON, 6,
+                            key="forecast_horizon")
+        zone = center_data.get('profile', {}).get('zona_geografica') or get_geographic_zone(center_data['name'])
+        center_forecast = get_center_forecast(center_data, zone)
+        center_anomalies = get_center_anomalies(center_data)
+        metric_info = {metric: (name, unit) for metric, name, unit in analytics.METRICS_INFO}
+        
+        forecast_tabs = st.tabs([metric_info[metric][0] for metric in analytics.FORECAST_METRICS])
+        for tab, metric in zip(forecast_tabs, analytics.FORECAST_METRICS):
+            with tab:
+                name, unit = metric_info[metric]
+                anomalies = (center_anomalies.for_center(center_data['name'], metric)
+                             if center_anomalies is not None else None)
+                plotly_chart(create_kpi_chart(center_data['monthly_data'], sector_avg.get(metric, 0), metric,
+                                              name, unit, forecast=center_forecast.get(metric, [])[:horizon],
+                                              anomalies=anomalies),
+                             use_container_width=True)
+        if len(center_data['monthly_data']) < 12:
+            st.caption("Con menos de un año de historia, la estacionalidad de la proyección se toma del perfil de tu zona.")
+        
+        # Alertas de anomalías: días que se desvían de la mediana de los 28 días anteriores
+        st.subheader("🚨 Alertas de Anomalías")
+        
+        if center_anomalies is not None:
+            flags = center_anomalies.for_center(center_data['name'])
+            if len(flags):
+                drops = int((flags['direccion'] == 'caída').sum())
+                st.warning(f"⚠️ {len(flags)} días anómalos detectados ({drops} caídas, {len(flags) - drops} subidas)")
+                st.dataframe(anomaly_table(flags.iloc[::-1]), use_container_width=True, hide_index=True)
+            else:
+                st.success("✅ No se han detectado días anómalos en tus KPIs")
+        
+        # Contexto: anomalías recientes en el resto del mercado (también en Datos del Mercado)
+        recent = get_recent_market_anomalies(10)
+        if recent is not None and len(recent):
+            with st.expander(f"🚨 Anomalías recientes del mercado ({len(recent)})"):
+                st.dataframe(anomaly_table(recent).assign(Centro=recent['centro_id'].to_numpy()),
+                             use_container_width=True, hide_index=True)
+        
+        # Incumplimientos de los umbrales definidos en Configuración, para todos los centros cargados
+        st.subheader("🔔 Alertas por Umbral")
+        
+        breaches = get_alert_breaches()
+        if breaches is not None:
+            if len(breaches):
+                counts = breaches.groupby('centro').size()
+                st.warning("⚠️ " + " · ".join(f"{center}: {count} incumplimientos" for center, count in counts.items()))
+                st.dataframe(pd.DataFrame({
+                    'Centro': breaches['centro'],
+                    'Fecha': [date.strftime('%m/%Y' if period == 'mes' else '%d/%m/%Y')
+                              for date, period in zip(breaches['fecha'], breaches['periodo'])],
+                    'Regla': breaches['regla'],
+                    'Valor': breaches['valor'].round(1),
+                    'Umbral': breaches['umbral']
+                }), use_container_width=True, hide_index=True)
+            elif not any(center in st.session_state.alert_rules for center in st.session_state.centers_data):
+                st.info("ℹ️ Ningún centro cargado tiene umbrales guardados. Defínelos en Configuración para activar las alertas.")
+            else:
+                st.success("✅ Ningún centro incumple los umbrales configurados")
+        
         # Análisis avanzado del mercado
         st.subheader("📊 Análisis Avanzado del Mercado")
         
@@ -1631,7 +1551,7 @@ if selected == "Dashboard":
         if market_charts:
             # Análisis por Tipo de Negocio
             if 'business_comparison' in market_charts:
-                st.plotly_chart(market_charts['business_comparison'], use_container_width=True)
+                plotly_chart(market_charts['business_comparison'], use_container_width=True)
                 
             
             # Rankings y Eficiencia
@@ -1639,12 +1559,12 @@ if selected == "Dashboard":
             
             with col1:
                 if 'rankings' in market_charts:
-                    st.plotly_chart(market_charts['rankings'], use_container_width=True)
+                    plotly_chart(market_charts['rankings'], use_container_width=True)
                     
             
             with col2:
                 if 'efficiency' in market_charts:
-                    st.plotly_chart(market_charts['efficiency'], use_container_width=True)
+                    plotly_chart(market_charts['efficiency'], use_container_width=True)
                     
     
     else:
@@ -1745,32 +1665,17 @@ elif selected == "Análisis vs Mercado":
     if st.session_state.current_center and st.session_state.current_center in st.session_state.centers_data:
         center_data = st.session_state.centers_data[st.session_state.current_center]
         sector_avg = get_sector_averages()
+        percentile_index = get_percentile_index()
         latest_data = center_data['monthly_data'][-1] if center_data['monthly_data'] else {}
         
         # Resumen ejecutivo de comparación
         st.subheader("🎯 Resumen Ejecutivo vs Mercado")
         
-        # Crear métricas de comparación
-        comparison_metrics = []
-        metrics_info = [
-            ('trafico_peatonal', 'Tráfico Peatonal', 'visitantes/día', sector_avg['trafico_peatonal']),
-            ('ventas_por_m2', 'Ventas por m²', '€/m²/mes', sector_avg['ventas_por_m2']),
-            ('tasa_ocupacion', 'Tasa de Ocupación', '%', sector_avg['tasa_ocupacion']),
-            ('tiempo_permanencia', 'Tiempo Permanencia', 'minutos', sector_avg['tiempo_permanencia']),
-            ('tasa_conversion', 'Tasa de Conversión', '%', sector_avg['tasa_conversion']),
-            ('ingresos_totales', 'Ingresos Totales', '€/mes', sector_avg['ingresos_totales'])
-        ]
+        # Crear métricas de comparación (diferencia vs promedio y percentil entre los centros)
+        comparison_metrics = analytics.compare_to_sector(latest_data, sector_avg, percentile_index)
         
-        for metric, name, unit, sector_val in metrics_info:
-            center_val = latest_data.get(metric, 0)
-            performance = (center_val / sector_val - 1) * 100 if sector_val > 0 else 0
-            comparison_metrics.append({
-                'metric': name,
-                'center_value': center_val,
-                'sector_value': sector_val,
-                'performance': performance,
-                'unit': unit
-            })
+        def percentile_text(metric):
+            return "" if metric['percentile'] is None else f" · P{metric['percentile']:.0f}"
         
         # Mostrar métricas de comparación
         col1, col2, col3 = st.columns(3)
@@ -1779,19 +1684,19 @@ elif selected == "Análisis vs Mercado":
             st.markdown("**📈 Rendimiento Superior al Mercado**")
             superior_metrics = [m for m in comparison_metrics if m['performance'] > 0]
             for metric in superior_metrics:
-                st.success(f"✅ {metric['metric']}: +{metric['performance']:.1f}%")
+                st.success(f"✅ {metric['metric']}: +{metric['performance']:.1f}%{percentile_text(metric)}")
         
         with col2:
             st.markdown("**📉 Rendimiento Inferior al Mercado**")
             inferior_metrics = [m for m in comparison_metrics if m['performance'] < 0]
             for metric in inferior_metrics:
-                st.error(f"❌ {metric['metric']}: {metric['performance']:.1f}%")
+                st.error(f"❌ {metric['metric']}: {metric['performance']:.1f}%{percentile_text(metric)}")
         
         with col3:
             st.markdown("**📊 Rendimiento Promedio**")
             avg_metrics = [m for m in comparison_metrics if abs(m['performance']) <= 5]
             for metric in avg_metrics:
-                st.info(f"⚖️ {metric['metric']}: {metric['performance']:+.1f}%")
+                st.info(f"⚖️ {metric['metric']}: {metric['performance']:+.1f}%{percentile_text(metric)}")
         
         # Gráfica de comparación detallada
         st.subheader("📊 Comparación Detallada vs Mercado")
@@ -1800,93 +1705,20 @@ elif selected == "Análisis vs Mercado":
 
         with col1:
             
-            # Gráfica de radar mejorada
-            categories = ['Tráfico', 'Ventas/m²', 'Ocupación', 'Tiempo', 'Conversión', 'Ingresos']
-            
-            # Normalizar valores para el radar (0-100)
-            center_values = [
-                min(100, (latest_data.get('trafico_peatonal', 0) / sector_avg['trafico_peatonal']) * 50),
-                min(100, (latest_data.get('ventas_por_m2', 0) / sector_avg['ventas_por_m2']) * 50),
-                latest_data.get('tasa_ocupacion', 0),
-                min(100, (latest_data.get('tiempo_permanencia', 0) / sector_avg['tiempo_permanencia']) * 50),
-                latest_data.get('tasa_conversion', 0),
-                min(100, (latest_data.get('ingresos_totales', 0) / sector_avg['ingresos_totales']) * 50)
-            ]
-            
-            sector_values = [50, 50, sector_avg['tasa_ocupacion'], 50, sector_avg['tasa_conversion'], 50]
-            
-            fig = go.Figure()
-            
-            fig.add_trace(go.Scatterpolar(
-                r=center_values,
-                theta=categories,
-                fill='toself',
-                name='Tu Centro',
-                line=dict(color='#2563eb', width=3),
-                marker=dict(size=8, color='#2563eb'),
-                fillcolor='rgba(37, 99, 235, 0.2)'
-            ))
-            
-            fig.add_trace(go.Scatterpolar(
-                r=sector_values,
-                theta=categories,
-                fill='toself',
-                name='Promedio Mercado',
-                line=dict(color='#64748b', width=2),
-                marker=dict(size=6, color='#64748b'),
-                fillcolor='rgba(100, 116, 139, 0.15)'
-            ))
-            
-            title_color = "#ffffff" if st.session_state.dark_mode else "#2c3e50"
-            axis_text_color = '#ffffff' if st.session_state.dark_mode else '#1f2937'
-            
-            # Configurar colores de fondo
-            bg_color = '#2d2d30' if st.session_state.dark_mode else 'rgba(0,0,0,0)'
-            
-            fig.update_layout(
-                polar=dict(
-                    radialaxis=dict(
-                        visible=True,
-                        range=[0, 100],
-                        tickfont=dict(color=axis_text_color),
-                        gridcolor='rgba(0,0,0,0.1)' if not st.session_state.dark_mode else 'rgba(255,255,255,0.1)',
-                        linecolor=axis_text_color
-                    ),
-                    angularaxis=dict(
-                        tickfont=dict(color=axis_text_color, size=12),
-                        linecolor=axis_text_color,
-                        gridcolor='rgba(0,0,0,0.1)' if not st.session_state.dark_mode else 'rgba(255,255,255,0.1)'
-                    ),
-                    bgcolor=bg_color
-                ),
-                showlegend=True,
-                legend=dict(
-                    orientation="v",
-                    yanchor="top",
-                    y=0.95,
-                    xanchor="left",
-                    x=1.02,
-                    font=dict(color=axis_text_color, size=12)
-                ),
-                title=dict(text="Comparación de Rendimiento vs Mercado", 
-                           font=dict(size=16, color=title_color)),
-                 template="plotly_dark" if st.session_state.dark_mode else "plotly_white",
-                height=500,
-                plot_bgcolor=bg_color,
-                paper_bgcolor=bg_color,
-                font=dict(color=axis_text_color)
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            # Gráfica de radar: percentil del centro en cada KPI frente a la mediana del mercado
+            if percentile_index is not None:
+                center_values, sector_values = analytics.radar_values(latest_data, percentile_index)
+                fig = create_radar_chart(center_values, sector_values)
+                
+                plotly_chart(fig, use_container_width=True)
             st.markdown('</div>', unsafe_allow_html=True)
         
         with col2:
             st.subheader("🎯 Posicionamiento en el Mercado")
 
             # Calcular score general
-            total_performance = sum([abs(m['performance']) for m in comparison_metrics if m['performance'] > 0])
-            total_metrics = len([m for m in comparison_metrics if m['performance'] > 0])
-            market_score = (total_performance / total_metrics) if total_metrics > 0 else 0
+            position = analytics.market_position_summary(comparison_metrics)
+            market_score = position['market_score']
 
             # 2 filas de 2 columnas cada una
             row1_col1, row1_col2 = st.columns(2)
@@ -1929,27 +1761,56 @@ elif selected == "Análisis vs Mercado":
                 )
 
             with row1_col2:
-                superior_count = len([m for m in comparison_metrics if m['performance'] > 0])
+                superior_count = position['superior_count']
                 st.markdown(
                     f'<div class="metric-btn">Métricas Superiores<br><span>{superior_count}/6</span><br><span style="font-size:0.9em;">{superior_count/6*100:.0f}%</span></div>',
                     unsafe_allow_html=True
                 )
 
             with row2_col1:
-                avg_performance = sum([m['performance'] for m in comparison_metrics]) / len(comparison_metrics)
+                avg_performance = position['avg_performance']
                 st.markdown(
                     f'<div class="metric-btn">Rendimiento Promedio<br><span>{avg_performance:+.1f}%</span><br><span style="font-size:0.9em;">{"Excelente" if avg_performance > 10 else "Bueno" if avg_performance > 0 else "Mejorable"}</span></div>',
                     unsafe_allow_html=True
                 )
 
             with row2_col2:
-                best_metric = max(comparison_metrics, key=lambda x: x['performance'])
+                best_metric = position['best_metric']
                 st.markdown(
                     f'<div class="metric-btn">Mejor Métrica<br><span>{best_metric["metric"]}</span><br><span style="font-size:0.9em;">+{best_metric["performance"]:.1f}%</span></div>',
                     unsafe_allow_html=True
                 )
 
             st.markdown('</div>', unsafe_allow_html=True)
+        
+        # Comparación con centros de la misma zona, tipo de negocio y tamaño
+        st.subheader("👥 Comparación con tu Grupo de Pares")
+        peer_index = get_peer_index()
+        if peer_index is not None:
+            profile = dict(center_data.get('profile') or {})
+            if profile.get('zona_geografica') is None:
+                profile['zona_geografica'] = get_geographic_zone(center_data['name'])
+            peers = peer_index.lookup(profile)
+            st.caption(f"Grupo: {peers['description']} · {peers['centers']} centros")
+            
+            peer_metrics = analytics.compare_to_sector(latest_data, peers['mean'], peers['index'])
+            peer_table = pd.DataFrame({
+                'Métrica': [m['metric'] for m in peer_metrics],
+                'Tu Centro': [m['center_value'] for m in peer_metrics],
+                'Mediana Pares': [peers['median'][metric] for metric, _, _ in analytics.METRICS_INFO],
+                'Media Pares': [m['sector_value'] for m in peer_metrics],
+                'vs Media (%)': [m['performance'] for m in peer_metrics],
+                'Percentil en Pares': [m['percentile'] for m in peer_metrics],
+                'Unidad': [m['unit'] for m in peer_metrics]
+            })
+            st.dataframe(
+                peer_table.style.format({
+                    'Tu Centro': '{:,.1f}', 'Mediana Pares': '{:,.1f}', 'Media Pares': '{:,.1f}',
+                    'vs Media (%)': '{:+.1f}%', 'Percentil en Pares': 'P{:.0f}'
+                }, na_rep='-'),
+                use_container_width=True,
+                hide_index=True
+            )
 
 # Página de Datos del Mercado
 elif selected == "Datos del Mercado":
@@ -2038,7 +1899,7 @@ elif selected == "Datos del Mercado":
             xaxis_tickangle=-45
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col2:
@@ -2076,7 +1937,7 @@ elif selected == "Datos del Mercado":
             height=400
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     
     # Análisis de tendencias del mercado con gráficas mejoradas
@@ -2091,49 +1952,54 @@ elif selected == "Datos del Mercado":
         
         with col1:
             if 'ventas_zonas' in market_charts:
-                st.plotly_chart(market_charts['ventas_zonas'], use_container_width=True)
+                plotly_chart(market_charts['ventas_zonas'], use_container_width=True)
         
         with col2:
             if 'ocupacion_zonas' in market_charts:
-                st.plotly_chart(market_charts['ocupacion_zonas'], use_container_width=True)
+                plotly_chart(market_charts['ocupacion_zonas'], use_container_width=True)
         
         # Análisis por tipo de negocio
         if 'business_comparison' in market_charts:
-            st.plotly_chart(market_charts['business_comparison'], use_container_width=True)
+            plotly_chart(market_charts['business_comparison'], use_container_width=True)
         
         # Rankings y eficiencia
         col1, col2 = st.columns(2)
         
         with col1:
             if 'rankings' in market_charts:
-                st.plotly_chart(market_charts['rankings'], use_container_width=True)
+                plotly_chart(market_charts['rankings'], use_container_width=True)
         
         with col2:
             if 'efficiency' in market_charts:
-                st.plotly_chart(market_charts['efficiency'], use_container_width=True)
-        
-        # Simular datos mensuales para tendencias
-        months = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
-        
-        # Obtener datos reales para crear tendencias
-        sector_avg, _ = load_market_data()
+                plotly_chart(market_charts['efficiency'], use_container_width=True)
         
-        # Crear variaciones estacionales realistas
-        market_trends = {
-            'trafico': [sector_avg['trafico_peatonal'] * factor for factor in [0.9, 0.95, 1.0, 1.05, 1.1, 1.15, 1.1, 1.0, 0.95, 0.9, 0.85, 0.95]],
-            'ventas': [sector_avg['ventas_por_m2'] * factor for factor in [0.9, 0.95, 1.0, 1.05, 1.1, 1.15, 1.1, 1.0, 0.95, 0.9, 0.85, 0.95]],
-            'ocupacion': [sector_avg['tasa_ocupacion'] * factor for factor in [0.95, 0.96, 0.98, 0.97, 0.99, 1.0, 0.99, 0.98, 0.97, 0.96, 0.95, 0.98]],
-            'conversion': [sector_avg['tasa_conversion'] * factor for factor in [0.95, 1.0, 1.05, 1.02, 1.08, 1.12, 1.10, 1.06, 1.04, 1.0, 0.98, 1.06]]
+    
+    # Perfil estacional calculado desde 'fecha' (mes del año por KPI y segmento)
+    seasonal_profile = get_seasonal_profile()
+    months = analytics.MONTH_LABELS
+    
+    if seasonal_profile is not None:
+        segments = {
+            (f"Zona: {value}" if dimension == 'zona_geografica'
+             else f"Tipo: {value}" if dimension == 'tipo_negocio' else "Mercado completo"): (dimension, value)
+            for dimension, value in seasonal_profile.segment_options()
         }
-    else:
-        # Valores por defecto si no se pueden cargar los datos
-        months = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+        trend_segment = segments[st.selectbox("Segmento", list(segments), key="trend_segment")]
         market_trends = {
-            'trafico': [2400, 2500, 2600, 2550, 2700, 2800, 2750, 2600, 2500, 2400, 2300, 2500],
-            'ventas': [42, 44, 45, 43, 46, 48, 47, 45, 44, 42, 41, 45],
-            'ocupacion': [75, 76, 78, 77, 79, 80, 79, 78, 77, 76, 75, 78],
-            'conversion': [11.5, 12.0, 12.5, 12.2, 13.0, 13.5, 13.2, 12.8, 12.5, 12.0, 11.8, 12.8]
+            'trafico': seasonal_profile.monthly('trafico_peatonal', trend_segment),
+            'ventas': seasonal_profile.monthly('ventas_por_m2', trend_segment),
+            'ocupacion': seasonal_profile.monthly('tasa_ocupacion', trend_segment),
+            'conversion': seasonal_profile.monthly('tasa_conversion', trend_segment)
         }
+        months_with_data = seasonal_profile.months_with_data(trend_segment)
+        if months_with_data < 12:
+            st.caption(f"Los datos cubren {months_with_data} de 12 meses; los meses sin datos se muestran vacíos.")
+    else:
+        # Sin datos del mercado las gráficas quedan vacías en lugar de mostrar valores inventados
+        market_trends = {key: [None] * len(months) for key in ('trafico', 'ventas', 'ocupacion', 'conversion')}
+    
+    # Importación diferida: solo esta página usa subplots de Plotly
+    from plotly.subplots import make_subplots
     
     col1, col2 = st.columns(2)
     
@@ -2178,7 +2044,7 @@ elif selected == "Datos del Mercado":
             yaxis2=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color))
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
     
     with col2:
         # Gráfica de tendencias de ocupación y conversión
@@ -2221,7 +2087,132 @@ elif selected == "Datos del Mercado":
             yaxis2=dict(tickfont=dict(color=axis_text_color), title_font=dict(color=axis_text_color))
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
+    
+    # Patrón semanal: índice por día de la semana (1 = día medio) sin el efecto del mes
+    if seasonal_profile is not None:
+        fig = go.Figure()
+        for metric, name, color in [('trafico_peatonal', 'Tráfico', '#2563eb'),
+                                    ('ingresos_totales', 'Ingresos', '#60a5fa'),
+                                    ('tasa_conversion', 'Conversión', '#1d4ed8')]:
+            fig.add_trace(go.Bar(
+                x=analytics.WEEKDAY_LABELS,
+                y=seasonal_profile.weekday(metric, trend_segment, relative=True),
+                name=name,
+                marker_color=color
+            ))
+        fig.add_hline(y=1, line_dash="dash", line_color="#9ca3af")
+        fig.update_layout(
+            title=dict(text="Patrón Semanal del Mercado (índice, 1 = día medio)", font=dict(size=16, color=title_color)),
+            template="plotly_dark" if st.session_state.dark_mode else "plotly_white",
+            height=400,
+            barmode='group',
+            plot_bgcolor=bg_color,
+            paper_bgcolor=bg_color,
+            xaxis=dict(tickfont=dict(color=axis_text_color)),
+            yaxis=dict(tickfont=dict(color=axis_text_color))
+        )
+        plotly_chart(fig, use_container_width=True)
+    
+    # Anomalías recientes en los centros del mercado
+    recent = get_recent_market_anomalies()
+    if recent is not None:
+        st.subheader("🚨 Anomalías Recientes del Mercado")
+        if len(recent):
+            st.dataframe(anomaly_table(recent).assign(Centro=recent['centro_id'].to_numpy()),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.info("No se han detectado días anómalos en los centros del mercado.")
+    
+    # Distribución de los KPIs por segmento (exacta o aproximada con sketches)
+    st.subheader("📐 Distribución por Segmento")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        segment_metric_label = st.selectbox("KPI", [name for _, name, _ in analytics.METRICS_INFO],
+                                            key="segment_metric")
+    with col2:
+        segment_by_label = st.selectbox("Agrupar por", ["Zona geográfica", "Tipo de negocio", "Mes"],
+                                        key="segment_by")
+    segment_metric = {name: metric for metric, name, _ in analytics.METRICS_INFO}[segment_metric_label]
+    segment_by = {"Zona geográfica": 'zona_geografica', "Tipo de negocio": 'tipo_negocio', "Mes": 'mes'}[segment_by_label]
+    
+    # El modo aproximado solo afecta a esta tabla: el conmutador va junto a ella
+    st.session_state.approximate_mode = st.checkbox(
+        "Modo aproximado para percentiles y centros distintos",
+        value=st.session_state.approximate_mode,
+        key="approximate_toggle",
+        help="Responde desde sketches precalculados (t-digest y HyperLogLog) en tiempo constante, "
+             "mostrando la cota de error de cada valor; útil con mercados de decenas de millones de filas"
+    )
+    
+    segments = get_segment_distribution(segment_metric, segment_by)
+    if segments is not None and len(segments):
+        approximate = 'centros_error' in segments
+        display_segments = pd.DataFrame({
+            segment_by_label: segments['segmento'],
+            'Registros': segments['filas'],
+            'Centros': segments['centros'].round(0).astype(int),
+            'P25': segments['p25'].round(1),
+            'Mediana': segments['p50'].round(1),
+            'P90': segments['p90'].round(1),
+        })
+        if approximate:
+            # Cota de error visible junto a cada estimación
+            display_segments['Centros'] = [f"{count:,.0f} ± {error:,.0f}" for count, error
+                                           in zip(segments['centros'], segments['centros_error'])]
+            for column, key in [('P25', 'p25'), ('Mediana', 'p50'), ('P90', 'p90')]:
+                display_segments[column] = [f"{value:,.1f} ± {error:,.1f}" for value, error
+                                            in zip(segments[key], segments[f"{key}_error"])]
+        st.dataframe(display_segments, use_container_width=True, hide_index=True)
+        if approximate:
+            st.caption(f"Modo aproximado: cuantiles con t-digest (compresión {analytics.TDIGEST_COMPRESSION}) e "
+                       f"intervalo por incertidumbre de rango; centros distintos con HyperLogLog "
+                       f"(error típico ±{analytics.HLL_RELATIVE_ERROR:.1%}). El periodo se aplica por meses completos.")
+    else:
+        st.info("No hay datos del mercado para los filtros seleccionados.")
+    
+    # Impulsores de la conversión y las ventas por m² en cada segmento
+    driver_analysis = get_driver_analysis()
+    if driver_analysis is not None:
+        st.subheader("🧭 Impulsores de los KPIs")
+        
+        metric_names = {metric: name for metric, name, _ in analytics.METRICS_INFO}
+        driver_levels = {"Mercado completo": (), "Zona geográfica": ('zona_geografica',),
+                         "Tipo de negocio": ('tipo_negocio',), "Zona × tipo de negocio": ('zona_geografica', 'tipo_negocio')}
+        col1, col2 = st.columns(2)
+        with col1:
+            driver_level = driver_levels[st.selectbox("Segmentar por", list(driver_levels), index=1, key="driver_level")]
+        regressions = driver_analysis.regressions(driver_level)
+        segment_names = (regressions[list(driver_level)].astype(str).agg(" × ".join, axis=1) if driver_level
+                         else pd.Series("Mercado completo", index=regressions.index))
+        with col2:
+            # Una clave por nivel: cada nivel tiene su propia lista de segmentos
+            driver_segment = st.selectbox("Segmento analizado", list(pd.unique(segment_names)),
+                                          key=f"driver_segment_{len(driver_level)}_{'_'.join(driver_level)}")
+        
+        # Correlaciones de todos los KPIs en el segmento elegido
+        segment_key = dict(zip(driver_level, driver_segment.split(" × "))) if driver_level else {}
+        correlations = driver_analysis.correlation_matrix(segment_key.get('zona_geografica'),
+                                                          segment_key.get('tipo_negocio'))
+        if correlations is not None:
+            plotly_chart(create_correlation_heatmap(correlations, f"Correlación entre KPIs · {driver_segment}"),
+                         use_container_width=True)
+        
+        # Regresión de cada objetivo sobre los impulsores en todos los segmentos del nivel
+        display_regressions = pd.DataFrame({
+            'Segmento': segment_names,
+            'Objetivo': regressions['objetivo'].map(metric_names),
+            'Registros': regressions['filas'],
+            'R²': regressions['r2'].round(2),
+        })
+        for driver in analytics.DRIVER_METRICS:
+            display_regressions[f"β {metric_names[driver]}"] = regressions[f"beta_{driver}"].round(2)
+            display_regressions[f"Pendiente {metric_names[driver]}"] = regressions[f"pendiente_{driver}"].round(4)
+        st.dataframe(display_regressions, use_container_width=True, hide_index=True)
+        st.caption("Regresión lineal de cada objetivo sobre el tiempo de permanencia y el tráfico peatonal "
+                   "con los registros diarios del segmento. β: coeficiente estandarizado (cambio en desviaciones "
+                   "típicas del objetivo por cada desviación típica del impulsor); pendiente: en unidades de cada KPI.")
     
     # Análisis por zona geográfica
     if zone_data is not None:
@@ -2257,7 +2248,7 @@ elif selected == "Datos del Mercado":
                 paper_bgcolor=bg_color
             )
             
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
         
         with col2:
             # Gráfica de ocupación por m² por zona
@@ -2287,7 +2278,7 @@ elif selected == "Datos del Mercado":
                 paper_bgcolor=bg_color
             )
             
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
         
         # Tabla de datos por zona
         st.subheader("📋 Datos Detallados por Zona Geográfica")
@@ -2340,7 +2331,7 @@ elif selected == "Datos del Mercado":
                 paper_bgcolor=bg_color
             )
             
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
         
         with col2:
             # Gráfica de visitantes por tipo de negocio
@@ -2370,7 +2361,7 @@ elif selected == "Datos del Mercado":
                 paper_bgcolor=bg_color
             )
             
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
         
         # Tabla de datos por tipo de negocio
         st.subheader("📋 Datos Detallados por Tipo de Negocio")
@@ -2466,6 +2457,72 @@ elif selected == "Datos del Mercado":
         - Tecnología integrada
         """)
 
+# Página de Comparar Centros
+elif selected == "Comparar Centros":
+    st.title("🏢 Harmon BI Dashboard")
+    st.markdown("---")
+    
+    st.header("🔀 Comparación entre Centros")
+    
+    center_names = list(st.session_state.centers_data.keys())
+    
+    if len(center_names) < 2:
+        st.info("📝 Carga al menos dos centros desde el Dashboard para compararlos entre sí.")
+    else:
+        selected_centers = st.multiselect(
+            "Centros a comparar",
+            center_names,
+            default=center_names[:6],
+            key="compare_centers"
+        )
+        
+        if not selected_centers:
+            st.warning("⚠️ Selecciona al menos un centro")
+        else:
+            matrix = get_center_matrix(selected_centers)
+            
+            if matrix is not None:
+                # Mapa de calor: desviación del último mes de cada centro frente al sector
+                plotly_chart(create_center_heatmap(matrix), use_container_width=True)
+                
+                # Pequeñas gráficas: evolución mensual de cada KPI, una línea por centro
+                plotly_chart(create_center_small_multiples(matrix), use_container_width=True)
+                
+                # Tabla de desviaciones y percentiles
+                st.subheader("📋 Desviación vs Sector y Percentil")
+                deltas = matrix.to_frame('deltas')
+                percentiles = matrix.to_frame('percentiles')
+                table = pd.DataFrame({'Centro': matrix.centers,
+                                      'Último mes': matrix.latest_month.dt.strftime('%m/%Y').to_numpy()})
+                for metric, name, _ in analytics.METRICS_INFO:
+                    table[name] = [
+                        f"{delta:+.1f}%" + ("" if pd.isna(pct) else f" · P{pct:.0f}")
+                        for delta, pct in zip(deltas[metric], percentiles[metric])
+                    ]
+                st.dataframe(table, use_container_width=True, hide_index=True)
+                
+                # Variación del último mes de cada centro frente al periodo de referencia
+                st.subheader("📅 Variación por Periodo")
+                compare_basis = st.radio(
+                    "Comparar con", list(analytics.COMPARISON_BASES), horizontal=True, key="compare_basis",
+                    format_func=lambda basis: f"{basis} · {analytics.COMPARISON_BASES[basis][0]}"
+                )
+                rows = []
+                for name in selected_centers:
+                    compared_center = st.session_state.centers_data.peek(name)
+                    center_lags = get_center_lags(compared_center)
+                    comparison = (center_lags.latest_comparison(compared_center['name'], compare_basis)
+                                  if center_lags is not None else None)
+                    if comparison is None:
+                        continue
+                    row = {'Centro': name, 'Mes': comparison['mes'].strftime('%m/%Y'),
+                           'Referencia': comparison['mes_referencia'].strftime('%m/%Y')}
+                    for metric, metric_name, _ in analytics.METRICS_INFO:
+                        delta = comparison['variacion'][metric]
+                        row[metric_name] = "sin dato" if pd.isna(delta) else f"{delta:+.1f}%"
+                    rows.append(row)
+                st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
 # Página de Configuración
 elif selected == "Configuración":
     st.title("🏢 Harmon BI Dashboard")
@@ -2487,7 +2544,7 @@ elif selected == "Configuración":
         
         with col2:
             st.info(f"**Fecha de Carga:** {center_data['upload_date'][:10]}")
-            st.info(f"**Registros:** {len(center_data['raw_data'])}")
+            st.info(f"**Registros:** {st.session_state.centers_data.record_count(st.session_state.current_center)}")
         
         # Opciones de configuración
         st.subheader("🔧 Opciones de Configuración")
@@ -2502,28 +2559,37 @@ elif selected == "Configuración":
             )
             
             if selected_center != st.session_state.current_center:
+                # Si estaba volcado a disco, el acceso lo recarga en memoria
+                st.session_state.centers_data.active = selected_center
+                st.session_state.centers_data[selected_center]
                 st.session_state.current_center = selected_center
                 st.rerun()
         
         # Configuración de alertas
         st.subheader("🔔 Configuración de Alertas")
         
+        # Umbrales guardados del centro activo (o los valores propuestos, inactivos hasta guardarlos)
+        current = st.session_state.current_center
+        thresholds = analytics.thresholds_for(st.session_state.alert_rules, current)
+        
         col1, col2 = st.columns(2)
         
         with col1:
             traffic_threshold = st.number_input(
                 "Umbral de Tráfico Peatonal",
                 min_value=0,
-                value=2000,
-                help="Alerta cuando el tráfico esté por debajo de este valor"
+                value=int(thresholds['trafico_peatonal']),
+                help="Alerta cuando el tráfico esté por debajo de este valor",
+                key=f"alert_traffic_{current}"
             )
             
             occupancy_threshold = st.number_input(
                 "Umbral de Ocupación (%)",
                 min_value=0,
                 max_value=100,
-                value=70,
-                help="Alerta cuando la ocupación esté por debajo de este porcentaje"
+                value=int(thresholds['tasa_ocupacion']),
+                help="Alerta cuando la ocupación esté por debajo de este porcentaje",
+                key=f"alert_occupancy_{current}"
             )
         
         with col2:
@@ -2531,20 +2597,35 @@ elif selected == "Configuración":
                 "Umbral de Conversión (%)",
                 min_value=0,
                 max_value=100,
-                value=10,
-                help="Alerta cuando la conversión esté por debajo de este porcentaje"
+                value=int(thresholds['tasa_conversion']),
+                help="Alerta cuando la conversión esté por debajo de este porcentaje",
+                key=f"alert_conversion_{current}"
             )
             
             revenue_threshold = st.number_input(
                 "Umbral de Ingresos (€)",
                 min_value=0,
-                value=1000000,
-                help="Alerta cuando los ingresos estén por debajo de este valor"
+                value=int(thresholds['ingresos_totales']),
+                help="Alerta cuando los ingresos mensuales estén por debajo de este valor",
+                key=f"alert_revenue_{current}"
             )
         
         # Guardar configuración
         if st.button("💾 Guardar Configuración", type="primary"):
-            st.success("✅ Configuración guardada correctamente")
+            try:
+                # Releer el archivo para no pisar los umbrales guardados desde otras sesiones
+                rules = analytics.load_alert_rules()
+                rules[current] = {
+                    'trafico_peatonal': traffic_threshold,
+                    'tasa_ocupacion': occupancy_threshold,
+                    'tasa_conversion': conversion_threshold,
+                    'ingresos_totales': revenue_threshold
+                }
+                analytics.save_alert_rules(rules)
+                st.session_state.alert_rules = rules
+                st.success("✅ Configuración guardada correctamente")
+            except OSError as e:
+                st.error(f"❌ No se pudo guardar la configuración: {str(e)}")
     
     else:
         st.info("📝 No hay datos cargados. Ve a 'Cargar Datos' para subir información de tu centro comercial.")
@@ -2552,16 +2633,73 @@ elif selected == "Configuración":
     # Información del sistema
     st.subheader("ℹ️ Información del Sistema")
     
-    col1, col2, col3 = st.columns(3)
+    centers_store = st.session_state.centers_data
+    
+    col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Centros Cargados", len(st.session_state.centers_data))
+        st.metric("Centros Cargados", len(centers_store))
     
     with col2:
         st.metric("Versión", "1.0.0")
     
     with col3:
         st.metric("Última Actualización", datetime.now().strftime("%Y-%m-%d"))
+    
+    with col4:
+        st.metric(
+            "Memoria de Sesión",
+            f"{centers_store.memory_bytes() / 2**20:,.1f} / {centers_store.budget_bytes / 2**20:,.0f} MB",
+            f"{centers_store.spilled_count()} en disco",
+            delta_color="off"
+        )
+    
+    # Perfilado del rendimiento
+    st.subheader("⏱️ Rendimiento")
+    
+    profiling_toggle = st.checkbox(
+        "Mostrar perfil de ejecución por sección",
+        value=st.session_state.profiling_enabled,
+        key="profiling_toggle",
+        help="Mide cada carga de datos, agregación, gráfica y envío al navegador durante el rerun"
+    )
+    
+    if profiling_toggle != st.session_state.profiling_enabled:
+        st.session_state.profiling_enabled = profiling_toggle
+        st.rerun()
+
+# Desglose del perfilado al final de la página
+if profiler.enabled:
+    st.markdown("---")
+    st.subheader("⏱️ Perfil de Ejecución")
+    
+    total_time = profiler.elapsed()
+    attributed_time = profiler.attributed()
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("Tiempo del Rerun", f"{total_time * 1000:,.1f} ms")
+    
+    with col2:
+        st.metric("Tiempo Medido", f"{attributed_time * 1000:,.1f} ms")
+    
+    with col3:
+        st.metric("Sin Instrumentar", f"{max(0.0, total_time - attributed_time) * 1000:,.1f} ms")
+    
+    report = pd.DataFrame([{
+        'Sección': ('↳ ' * entry['depth']) + entry['name'],
+        'Tipo': entry['kind'],
+        'Tiempo (ms)': round(entry['seconds'] * 1000, 2),
+        'Tiempo propio (ms)': round(entry['self_seconds'] * 1000, 2),
+        'Payload (KB)': round(entry['payload_bytes'] / 1024, 1) if entry['payload_bytes'] is not None else None,
+        'Caché': {True: 'hit', False: 'miss'}.get(entry['cache'], '—')
+    } for entry in profiler.report()])
+    
+    if report.empty:
+        st.info("No se registraron secciones en este rerun.")
+    else:
+        st.dataframe(report, use_container_width=True, hide_index=True)
 
 if __name__ == "__main__":
     pass
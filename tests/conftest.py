@@ -0,0 +1,26 @@
+"""Fixtures comunes: ``src`` en el path y un mercado sintético pequeño y determinista."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from analytics.ingest import REQUIRED_COLUMNS  # noqa: E402
+from analytics.synthetic import generate_market_data  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def market_df():
+    """12 centros × 3 tipos de negocio durante 400 días (más de un año, para QoQ y YoY)"""
+    return generate_market_data(12, 400)
+
+
+@pytest.fixture(scope='session')
+def center_csv(market_df, tmp_path_factory):
+    """Archivo de un centro con el formato de subida: una fila por día y tipo de negocio"""
+    center = market_df[market_df['centro_id'] == market_df['centro_id'].iloc[0]]
+    path = tmp_path_factory.mktemp('centros') / 'centro.csv'
+    center[REQUIRED_COLUMNS + ['zona_geografica', 'tipo_negocio', 'tamaño_m2']].to_csv(path, index=False)
+    return path
@@ -0,0 +1,126 @@
+import copy
+
+import pandas as pd
+import pytest
+
+from analytics import AlertEngine, evaluate_rules, process_center_file
+from analytics import alerts
+from analytics.anomalies import daily_center_series
+from analytics.ingest import monthly_digests
+
+
+@pytest.fixture
+def records(center_csv):
+    center_data, _ = process_center_file(center_csv, 'Demo', "Urbano")
+    # Un registro por día, como el archivo de un centro sin desglose por tipo de negocio
+    daily = pd.DataFrame.from_records(center_data['raw_data']).groupby('fecha', as_index=False).agg(
+        {'trafico_peatonal': 'sum', 'ventas_por_m2': 'mean', 'tasa_ocupacion': 'mean',
+         'tiempo_permanencia': 'mean', 'tasa_conversion': 'mean', 'ingresos_totales': 'sum'})
+    return daily.to_dict('records')
+
+
+@pytest.fixture
+def rules(records):
+    traffic = pd.Series([r['trafico_peatonal'] for r in records])
+    return {'Demo': {'trafico_peatonal': float(traffic.median()), 'tasa_ocupacion': 0,
+                     'tasa_conversion': 0, 'ingresos_totales': 1e12}}
+
+
+def center(records, upload):
+    # Como tras la ingesta: los resúmenes por mes llegan calculados con los datos
+    digests = monthly_digests(pd.DataFrame.from_records(records))
+    return {'Demo': {'raw_data': records, 'upload_date': upload, 'month_digests': digests}}
+
+
+def full_evaluation(records, rules):
+    return normalized(AlertEngine().update(center(records, 'ref'), rules))
+
+
+def normalized(breaches):
+    return breaches.sort_values(['fecha', 'metrica'], ignore_index=True)
+
+
+def test_centers_without_saved_rules_are_not_evaluated(records):
+    engine = AlertEngine()
+    assert engine.update(center(records, 1), {}).empty
+    assert engine.evaluated_rows('Demo') == 0
+
+
+def test_extension_only_evaluates_new_days(records, rules):
+    engine = AlertEngine()
+    engine.update(center(records[:300], 1), rules)
+    assert engine.evaluated_rows('Demo') == 300
+
+    breaches = engine.update(center(records, 2), rules)
+    # Solo los días nuevos y los del mes en curso del último día ya evaluado
+    assert engine.evaluated_rows('Demo') < len(records) - 300 + 31
+    pd.testing.assert_frame_equal(normalized(breaches), full_evaluation(records, rules))
+
+
+def test_corrected_history_triggers_full_evaluation(records, rules):
+    engine = AlertEngine()
+    before = engine.update(center(records, 1), rules)
+    corrected = copy.deepcopy(records)
+    corrected[10]['trafico_peatonal'] = 10**9      # deja de incumplir
+    corrected[20]['trafico_peatonal'] = 0          # pasa a incumplir
+
+    breaches = engine.update(center(corrected, 2), rules)
+    assert engine.evaluated_rows('Demo') == len(records)
+    pd.testing.assert_frame_equal(normalized(breaches), full_evaluation(corrected, rules))
+    assert not normalized(breaches).equals(normalized(before))
+
+
+def test_threshold_change_triggers_full_evaluation(records, rules):
+    engine = AlertEngine()
+    engine.update(center(records, 1), rules)
+    stricter = {'Demo': dict(rules['Demo'], trafico_peatonal=rules['Demo']['trafico_peatonal'] * 2)}
+    breaches = engine.update(center(records, 1), stricter)
+    assert engine.evaluated_rows('Demo') == len(records)
+    pd.testing.assert_frame_equal(normalized(breaches), full_evaluation(records, stricter))
+
+
+def test_monthly_revenue_rule(records, rules):
+    daily = pd.DataFrame.from_records(records)
+    daily['fecha'] = pd.to_datetime(daily['fecha'])
+    daily = daily_center_series(daily.assign(centro_id='Demo'))
+    breaches = evaluate_rules(daily, rules)
+    monthly = breaches[breaches['periodo'] == 'mes']
+    expected = daily.groupby(daily['fecha'].dt.to_period('M'))['ingresos_totales'].sum()
+    assert list(monthly['valor']) == list(expected)
+    assert list(monthly['fecha']) == list(expected.index.to_timestamp())
+
+
+def test_incremental_update_does_not_rehash_history(records, rules, monkeypatch):
+    engine = AlertEngine()
+    engine.update(center(records[:300], 1), rules)
+    extended = center(records, 2)
+    monkeypatch.setattr(alerts, 'monthly_digests', lambda *args: pytest.fail("no debe resumir la historia"))
+    breaches = engine.update(extended, rules)
+    assert engine.evaluated_rows('Demo') < len(records) - 300 + 31
+    pd.testing.assert_frame_equal(normalized(breaches), full_evaluation(records, rules))
+
+
+def test_correction_reevaluates_from_the_changed_month(records, rules):
+    engine = AlertEngine()
+    engine.update(center(records, 1), rules)
+    corrected = copy.deepcopy(records)
+    corrected[200]['trafico_peatonal'] = 0
+    changed_month = pd.Timestamp(corrected[200]['fecha']).to_period('M').start_time
+
+    breaches = engine.update(center(corrected, 2), rules)
+    assert engine.evaluated_rows('Demo') == sum(pd.Timestamp(r['fecha']) >= changed_month for r in records)
+    pd.testing.assert_frame_equal(normalized(breaches), full_evaluation(corrected, rules))
+
+
+def test_centers_without_month_digests(records, rules):
+    # Centros cargados antes de que la ingesta calculara los resúmenes
+    engine = AlertEngine()
+    engine.update({'Demo': {'raw_data': records[:300], 'upload_date': 1}}, rules)
+    breaches = engine.update({'Demo': {'raw_data': records, 'upload_date': 2}}, rules)
+    assert engine.evaluated_rows('Demo') < len(records) - 300 + 31
+    pd.testing.assert_frame_equal(normalized(breaches), full_evaluation(records, rules))
+
+
+def test_ingest_digests_match_records(center_csv):
+    center_data, _ = process_center_file(center_csv, 'Demo', "Urbano")
+    assert center_data['month_digests'] == monthly_digests(pd.DataFrame.from_records(center_data['raw_data']))
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from analytics import AnomalyIndex, robust_zscores
+from analytics.anomalies import MAD_SCALE, MIN_PERIODS, daily_center_series
+
+
+def reference_zscores(row, window):
+    z = np.full(len(row), np.nan)
+    for t in range(len(row)):
+        previous = row[max(0, t - window):t]
+        previous = previous[~np.isnan(previous)]
+        if len(previous) < MIN_PERIODS:
+            continue
+        median = np.median(previous)
+        mad = np.median(np.abs(previous - median))
+        if mad > 0:
+            z[t] = (row[t] - median) / (MAD_SCALE * mad)
+    return z
+
+
+def test_robust_zscores_match_loop_reference():
+    rng = np.random.default_rng(1)
+    series = rng.normal(100, 10, (5, 90))
+    series[rng.random(series.shape) < 0.15] = np.nan
+    series[2, :] = np.round(series[2, :] / 20) * 20     # muchos empates
+    z, _ = robust_zscores(series, window=14)
+    expected = np.array([reference_zscores(row, 14) for row in series])
+    np.testing.assert_allclose(z, expected, equal_nan=True)
+
+
+def test_injected_spike_is_flagged(market_df):
+    daily = daily_center_series(market_df)
+    center = daily['centro_id'].iloc[0]
+    day = daily['fecha'].sort_values().iloc[len(daily) // 2]
+    spike = (daily['centro_id'] == center) & (daily['fecha'] == day)
+    daily.loc[spike, 'trafico_peatonal'] *= 5
+
+    index = AnomalyIndex(daily)
+    flags = index.for_center(center, 'trafico_peatonal')
+    assert day in set(flags['fecha'])
+    row = flags[flags['fecha'] == day].iloc[0]
+    assert row['direccion'] == 'subida' and row['z'] > 3.5
+
+    recent = index.recent(5, centers=[center], desde=day, hasta=day)
+    assert set(recent['centro_id']) == {center}
+    assert (recent['fecha'] == day).all()
+    assert recent['z'].abs().is_monotonic_decreasing
+
+
+def test_from_center_matches_market_rows(market_df):
+    center = market_df['centro_id'].iloc[0]
+    rows = market_df[market_df['centro_id'] == center]
+    from_center = AnomalyIndex.from_center(rows.to_dict('records'), center).flags
+    from_market = AnomalyIndex.from_market(market_df).for_center(center)
+    pd.testing.assert_frame_equal(from_center.reset_index(drop=True), from_market.reset_index(drop=True))
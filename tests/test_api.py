@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip('tornado')
+
+from tornado.httpclient import AsyncHTTPClient  # noqa: E402
+from tornado.httpserver import HTTPServer  # noqa: E402
+from tornado.testing import bind_unused_port  # noqa: E402
+
+from analytics import LagTable, api  # noqa: E402
+
+
+def fetch(path, headers=None):
+    """Respuesta a un GET contra la aplicación de la API en un puerto libre"""
+    async def run():
+        sock, port = bind_unused_port()
+        server = HTTPServer(api.make_app())
+        server.add_sockets([sock])
+        try:
+            return await AsyncHTTPClient().fetch(f"http://127.0.0.1:{port}{path}", headers=headers,
+                                                 raise_error=False)
+        finally:
+            server.stop()
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def lags(monkeypatch, market_df):
+    """Recurso period-deltas servido desde una LagTable fija, contando las conversiones a tabla"""
+    table = LagTable.from_market(market_df)
+    conversions = []
+    to_frame = LagTable.to_frame
+
+    def counted_to_frame(self):
+        conversions.append(1)
+        return to_frame(self)
+
+    monkeypatch.setattr(LagTable, 'to_frame', counted_to_frame)
+    monkeypatch.setattr(api.cache, 'cached_market_lags', lambda: (table, True))
+    monkeypatch.setattr(api, '_bodies', api._BodyCache())
+    return table, conversions
+
+
+def test_etag_is_stable_and_polls_do_not_rebuild(lags):
+    table, conversions = lags
+    first = fetch('/api/v1/period-deltas')
+    second = fetch('/api/v1/period-deltas')
+    assert first.code == second.code == 200
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert first.headers['Content-Type'] == api.JSON_MIME
+    # El segundo sondeo reutiliza el cuerpo: la tabla larga se construye una sola vez
+    assert len(conversions) == 1
+    assert len(json.loads(first.body)) == len(table.to_frame())
+
+
+def test_if_none_match_returns_304(lags):
+    _, conversions = lags
+    etag = fetch('/api/v1/period-deltas').headers['ETag']
+    response = fetch('/api/v1/period-deltas', headers={'If-None-Match': etag})
+    assert response.code == 304
+    assert response.body == b''
+    assert len(conversions) == 1
+
+    assert fetch('/api/v1/period-deltas', headers={'If-None-Match': '"otro"'}).code == 200
+
+
+def test_new_artifact_changes_etag(lags, monkeypatch, market_df):
+    etag = fetch('/api/v1/period-deltas').headers['ETag']
+    rebuilt = LagTable.from_market(market_df[market_df['centro_id'] != market_df['centro_id'].iloc[0]])
+    monkeypatch.setattr(api.cache, 'cached_market_lags', lambda: (rebuilt, True))
+    assert fetch('/api/v1/period-deltas', headers={'If-None-Match': etag}).code == 200
+
+
+def test_arrow_format_round_trip(lags):
+    pa = pytest.importorskip('pyarrow')
+    table, _ = lags
+    response = fetch('/api/v1/period-deltas?format=arrow')
+    assert response.code == 200
+    assert response.headers['Content-Type'] == api.ARROW_MIME
+    frame = pa.ipc.open_stream(response.body).read_all().to_pandas()
+    expected = table.to_frame()
+    assert list(frame.columns) == list(expected.columns)
+    assert frame.equals(expected)
+
+    # El formato también se negocia con Accept, con un ETag distinto del JSON
+    negotiated = fetch('/api/v1/period-deltas', headers={'Accept': api.ARROW_MIME})
+    assert negotiated.headers['ETag'] == response.headers['ETag']
+    assert negotiated.headers['ETag'] != fetch('/api/v1/period-deltas').headers['ETag']
+
+
+def test_unknown_resource_and_format(lags):
+    assert fetch('/api/v1/inexistente').code == 404
+    assert fetch('/api/v1/period-deltas?format=xml').code == 400
+    index = json.loads(fetch('/api/v1/').body)
+    assert 'period-deltas' in index['resources']
+    assert index['formats'] == ['arrow', 'json']
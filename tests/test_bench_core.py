@@ -0,0 +1,61 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import bench_core  # noqa: E402
+from analytics.synthetic import rows_for  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def results(tmp_path_factory):
+    """Todos los benchmarks una vez sobre el tamaño más pequeño que admite el script"""
+    return bench_core.run([3000], repeat=1, cache_dir=str(tmp_path_factory.mktemp('bench')), days=100)
+
+
+def test_dataset_paths_are_reused(tmp_path):
+    paths = bench_core.dataset_paths(3000, str(tmp_path), days=100)
+    assert sorted(paths) == ['csv', 'parquet']
+    assert all(os.path.exists(path) for path in paths.values())
+    mtimes = {fmt: os.path.getmtime(path) for fmt, path in paths.items()}
+    # El mismo tamaño no vuelve a generar los archivos
+    assert bench_core.dataset_paths(3000, str(tmp_path), days=100) == paths
+    assert {fmt: os.path.getmtime(path) for fmt, path in paths.items()} == mtimes
+
+
+def test_every_benchmark_runs(results):
+    assert [r['name'] for r in results] == [name for name, _ in bench_core.BENCHMARKS]
+    for r in results:
+        assert r['target_rows'] == 3000
+        assert r['rows'] == rows_for(10, 100)
+        assert 0 <= r['wall_s_min'] <= r['wall_s_median']
+        assert r['peak_memory_bytes'] > 0
+
+
+def test_only_filters_benchmarks(tmp_path):
+    results = bench_core.run([3000], repeat=1, only=['SketchCube'], cache_dir=str(tmp_path), days=100)
+    assert [r['name'] for r in results] == ['SketchCube', 'SketchCube.segment_table']
+
+
+def test_measure_repeats():
+    calls = []
+    times, peak = bench_core.measure(lambda ctx: calls.append(bytearray(1 << 20)), {}, repeat=3)
+    # Tres repeticiones cronometradas y una más para la memoria
+    assert len(times) == 3 and len(calls) == 4
+    assert peak >= 1 << 20
+
+
+def test_compare_reports_regressions(results, tmp_path):
+    baseline = [dict(r) for r in results[:3]]
+    baseline[0]['wall_s_median'] = results[0]['wall_s_median'] / 2      # ahora el doble de lento
+    baseline[1]['wall_s_median'] = results[1]['wall_s_median'] / 1.1    # dentro de la tolerancia
+    baseline[2]['wall_s_median'] = 0                                    # sin referencia útil
+    path = tmp_path / 'anterior.json'
+    path.write_text(json.dumps({'environment': bench_core.environment_info(), 'results': baseline}))
+
+    regressions = bench_core.compare(results, str(path), tolerance=0.2)
+    assert [(name, rows) for name, rows, _ in regressions] == [(results[0]['name'], 3000)]
+    assert regressions[0][2] == pytest.approx(2.0)
@@ -0,0 +1,153 @@
+import threading
+import time
+import types
+
+import pytest
+
+from analytics import cache
+from analytics.cache import VERSION_CHECK_INTERVAL, SharedCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    (tmp_path / 'mercado.csv').write_text("a,b\n1,2\n")
+    return tmp_path
+
+
+def counter():
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+    return compute, calls
+
+
+def test_entry_expires_after_ttl(clock, data_dir):
+    shared = SharedCache(ttl=10)
+    compute, calls = counter()
+    watch = (str(data_dir),)
+
+    assert shared.get_or_compute('k', compute, watch) == (1, False)
+    clock.advance(9)
+    assert shared.get_or_compute('k', compute, watch) == (1, True)
+    clock.advance(2)
+    assert shared.get_or_compute('k', compute, watch) == (2, False)
+    assert (shared.hits, shared.misses) == (1, 2)
+
+
+def test_entry_invalidated_when_watched_file_changes(clock, data_dir):
+    shared = SharedCache(ttl=600)
+    compute, calls = counter()
+    watch = (str(data_dir),)
+    shared.get_or_compute('k', compute, watch)
+
+    (data_dir / 'mercado.csv').write_text("a,b\n1,2\n3,4\n")
+    # La huella se comprueba como mucho una vez por intervalo
+    assert shared.get_or_compute('k', compute, watch) == (1, True)
+    clock.advance(VERSION_CHECK_INTERVAL)
+    assert shared.get_or_compute('k', compute, watch) == (2, False)
+
+
+def test_concurrent_misses_compute_once(data_dir):
+    shared = SharedCache(ttl=600)
+    calls = []
+
+    def slow_compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'valor'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(shared.get_or_compute('k', slow_compute,
+                                                                                    (str(data_dir),))))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert sorted(hit for _, hit in results) == [False] + [True] * 7
+
+
+def test_invalidate_key(clock, data_dir):
+    shared = SharedCache(ttl=600)
+    compute, calls = counter()
+    watch = (str(data_dir),)
+    shared.get_or_compute('k', compute, watch)
+    shared.invalidate('k')
+    assert shared.get_or_compute('k', compute, watch) == (2, False)
+
+
+def test_put_many_entries_are_pinned_to_their_version(clock, data_dir):
+    shared = SharedCache(ttl=10)
+    compute, calls = counter()
+    watch = (str(data_dir),)
+    shared.put_many({'k': 'instalado'}, shared.version(watch))
+
+    clock.advance(3600)
+    assert shared.get_or_compute('k', compute, watch) == ('instalado', True)
+
+    # Un cambio de versión sí la invalida (sin vigilante que sirva la anterior)
+    (data_dir / 'mercado.csv').write_text("cambiado\n")
+    clock.advance(VERSION_CHECK_INTERVAL)
+    assert shared.get_or_compute('k', compute, watch) == (1, False)
+
+
+def test_serve_stale_keeps_previous_version_until_replaced(clock, data_dir):
+    shared = SharedCache(ttl=10)
+    compute, calls = counter()
+    watch = (str(data_dir),)
+    shared.put_many({'k': 'anterior'}, shared.version(watch))
+    shared.get_or_compute('otra', compute, watch)
+    shared.serve_stale(['k'])
+
+    (data_dir / 'mercado.csv').write_text("cambiado\n")
+    clock.advance(VERSION_CHECK_INTERVAL)
+    assert shared.get_or_compute('k', compute, watch) == ('anterior', True)
+    # Solo las claves indicadas se sirven con la versión anterior
+    assert shared.get_or_compute('otra', compute, watch) == (2, False)
+    shared.put_many({'k': 'nuevo'}, shared.version(watch))
+    assert shared.get_or_compute('k', compute, watch) == ('nuevo', True)
+    assert calls == [1, 1]
+
+
+def test_serve_stale_can_be_withdrawn(clock, data_dir):
+    shared = SharedCache(ttl=10)
+    compute, calls = counter()
+    watch = (str(data_dir),)
+    shared.put_many({'k': 'anterior'}, shared.version(watch))
+    shared.serve_stale(['k'])
+    shared.serve_stale(['k'], enabled=False)
+
+    (data_dir / 'mercado.csv').write_text("cambiado\n")
+    clock.advance(VERSION_CHECK_INTERVAL)
+    assert shared.get_or_compute('k', compute, watch) == (1, False)
+
+
+def test_pin_exempts_computed_entries_from_ttl(clock, data_dir):
+    shared = SharedCache(ttl=10)
+    compute, calls = counter()
+    watch = (str(data_dir),)
+    shared.get_or_compute('k', compute, watch)
+    assert shared.pin(watch) == 1
+    clock.advance(3600)
+    assert shared.get_or_compute('k', compute, watch) == (1, True)
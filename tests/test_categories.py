@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from analytics import CenterStore, category_rollup, category_mix, compare_category_mix, market_category_mix
+from analytics.ingest import process_center_file
+from analytics.market import aggregate_by_business_type
+
+
+def test_rollup_matches_groupby(market_df):
+    center = market_df[market_df['centro_id'] == market_df['centro_id'].iloc[0]].copy()
+    center.loc[center.index[:5], 'tipo_negocio'] = np.nan
+    rollup = pd.DataFrame(category_rollup(center)).set_index('tipo_negocio')
+
+    grouped = center.groupby('tipo_negocio')
+    expected = grouped[['ingresos_totales', 'trafico_peatonal']].sum().assign(dias=grouped.size())
+    pd.testing.assert_frame_equal(rollup, expected, check_dtype=False)
+
+
+def test_mix_shares_sum_to_hundred(market_df):
+    center = market_df[market_df['centro_id'] == market_df['centro_id'].iloc[0]]
+    mix = category_mix(category_rollup(center))
+    np.testing.assert_allclose(mix[['cuota_ingresos', 'cuota_trafico']].sum(), 100.0)
+    assert mix['ingresos_totales'].is_monotonic_decreasing
+
+    revenue = center.groupby('tipo_negocio')['ingresos_totales'].sum()
+    expected = (revenue / revenue.sum() * 100).reindex(mix['tipo_negocio'])
+    np.testing.assert_allclose(mix['cuota_ingresos'], expected.to_numpy())
+
+
+def test_rollup_from_processed_file(center_csv):
+    center_data, _ = process_center_file(str(center_csv), 'Centro', 'Urbano')
+    raw = pd.read_csv(center_csv)
+    days = raw.groupby('tipo_negocio').size()
+    rollup = {row['tipo_negocio']: row for row in center_data['category_rollup']}
+    assert {category: row['dias'] for category, row in rollup.items()} == days.to_dict()
+
+
+def test_rollup_without_category_column(market_df):
+    assert category_rollup(market_df.drop(columns='tipo_negocio')) is None
+    assert category_rollup(market_df.assign(tipo_negocio=np.nan)) is None
+
+
+def test_compare_with_market(market_df):
+    center = market_df[market_df['centro_id'] == market_df['centro_id'].iloc[0]]
+    center = center[center['tipo_negocio'] != 'Ocio']
+    market_mix = market_category_mix(aggregate_by_business_type(market_df))
+    comparison = compare_category_mix(category_mix(category_rollup(center)), market_mix).set_index('tipo_negocio')
+
+    # Un tipo que el centro no tiene cuenta con cuota 0 frente a la del mercado
+    assert comparison.loc['Ocio', 'cuota_ingresos'] == 0.0
+    assert comparison.loc['Ocio', 'cuota_ingresos_mercado'] > 0
+    np.testing.assert_allclose(comparison['diferencia_cuota_ingresos'],
+                               comparison['cuota_ingresos'] - comparison['cuota_ingresos_mercado'])
+    np.testing.assert_allclose(comparison['cuota_ingresos_mercado'].sum(), 100.0)
+    np.testing.assert_allclose(comparison['diferencia_cuota_trafico'].sum(), 0.0, atol=1e-9)
+
+
+def test_rollup_of_spilled_legacy_center(center_csv, tmp_path):
+    # Centro cargado sin el resumen por tipo de negocio y volcado después a disco
+    centers = [process_center_file(str(center_csv), name, 'Urbano')[0] for name in ('A', 'B')]
+    expected = centers[0].pop('category_rollup')
+    store = CenterStore(budget_bytes=1, spill_dir=str(tmp_path))
+    store['A'], store['B'] = centers
+    assert store.is_spilled('A')
+    assert 'raw_data' not in store.peek('A')
+
+    rollup = category_rollup(store.raw_frame('A'))
+    pd.testing.assert_frame_equal(pd.DataFrame(rollup), pd.DataFrame(expected), check_dtype=False)
+    # Leer el frame no recarga el centro
+    assert store.is_spilled('A')
+    pd.testing.assert_frame_equal(store.raw_frame('B'), pd.DataFrame.from_records(centers[1]['raw_data']))
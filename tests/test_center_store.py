@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from analytics import CenterStore, LagTable, category_mix, process_center_file
+from analytics.center_store import DERIVED_KEYS, estimate_records_size, estimate_value_size
+
+
+@pytest.fixture
+def centers(center_csv):
+    return [process_center_file(center_csv, name, "Urbano")[0] for name in ('A', 'B', 'C')]
+
+
+def test_spills_least_recently_used_and_reloads(centers, tmp_path):
+    store = CenterStore(budget_bytes=1, spill_dir=str(tmp_path))
+    original = [list(center['raw_data']) for center in centers]
+    for name, center in zip('ABC', centers):
+        store[name] = center
+
+    # Con un presupuesto mínimo solo el último centro usado sigue en memoria
+    assert [store.is_spilled(name) for name in 'ABC'] == [True, True, False]
+    assert store.record_count('A') == len(original[0])
+    assert 'raw_data' not in store.peek('A')
+
+    reloaded = store['A']['raw_data']
+    assert not store.is_spilled('A')
+    assert store.is_spilled('C')
+    assert [row['trafico_peatonal'] for row in reloaded] == [row['trafico_peatonal'] for row in original[0]]
+
+
+def test_active_center_is_never_spilled(centers, tmp_path):
+    store = CenterStore(budget_bytes=1, spill_dir=str(tmp_path))
+    store.active = 'A'
+    for name, center in zip('ABC', centers):
+        store[name] = center
+    assert not store.is_spilled('A')
+    assert store.is_spilled('B')
+
+
+def test_delete_removes_spill_file(centers, tmp_path):
+    store = CenterStore(budget_bytes=1, spill_dir=str(tmp_path))
+    store['A'], store['B'] = centers[0], centers[1]
+    assert len(list(tmp_path.iterdir())) == 1
+    del store['A']
+    assert list(tmp_path.iterdir()) == []
+    assert list(store) == ['B']
+
+
+def test_derived_results_count_and_are_dropped_on_spill(centers, tmp_path):
+    store = CenterStore(budget_bytes=10**9, spill_dir=str(tmp_path))
+    store['A'] = centers[0]
+    raw_only = store.memory_bytes()
+
+    lags = LagTable.from_center(centers[0]['monthly_data'], 'A')
+    store['A']['lags'] = lags
+    store['A']['category_mix'] = category_mix(centers[0]['category_rollup'])
+    # Se miden en el siguiente acceso, después de que la app los guarde
+    store['A']
+    assert store.memory_bytes() >= raw_only + lags.values.nbytes + lags.deltas['MoM'].nbytes
+
+    store.budget_bytes = 1
+    store['B'] = centers[1]
+    assert store.is_spilled('A')
+    assert not set(DERIVED_KEYS) & set(store.peek('A'))
+    assert store.memory_bytes() == estimate_records_size(centers[1]['raw_data'])
+
+
+def test_shared_objects_are_counted_once():
+    values = np.zeros(1000)
+    assert estimate_value_size((values, values[:10], {'a': values})) < 2 * values.nbytes
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT, 'src')
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import analytics  # noqa: E402
+import cold_start  # noqa: E402
+
+# Módulos que ninguna página necesita para el primer render
+DEFERRED = ['tornado', 'scipy', 'analytics.api', 'analytics.snapshot', 'analytics.watcher',
+            'analytics.forecast', 'analytics.drivers', 'analytics.sketches', 'analytics.center_store']
+
+
+def loaded_modules(code):
+    """Módulos cargados tras ejecutar ``code`` en un intérprete nuevo"""
+    code += "\nimport json, sys; print(json.dumps(sorted(sys.modules)))"
+    proc = subprocess.run([sys.executable, '-c', code], cwd=SRC_DIR, capture_output=True, text=True, check=True)
+    return set(json.loads(proc.stdout.splitlines()[-1]))
+
+
+def test_import_analytics_loads_no_submodule():
+    modules = loaded_modules("import analytics")
+    assert 'analytics' in modules
+    assert not {m for m in modules if m.startswith('analytics.')}
+    assert not {'plotly', 'tornado', 'scipy'} & modules
+
+
+def test_app_top_level_imports_defer_heavy_modules():
+    statements = cold_start.top_level_imports()
+    assert not [s for s in statements if 'analytics.api' in s or 'analytics.snapshot' in s]
+    modules = loaded_modules('\n'.join(statements))
+    assert not set(DEFERRED) & modules
+
+
+def test_lazy_attribute_loads_its_submodule():
+    modules = loaded_modules("import analytics\nanalytics.LagTable")
+    assert 'analytics.periods' in modules
+    assert 'analytics.forecast' not in modules
+
+
+def test_lazy_exports():
+    from analytics.periods import LagTable
+    assert analytics.LagTable is LagTable
+    assert 'LagTable' in dir(analytics)
+    assert set(analytics.__all__) <= set(dir(analytics))
+    with pytest.raises(AttributeError, match="NoExiste"):
+        analytics.NoExiste
+    with pytest.raises(ImportError):
+        exec("from analytics import NoExiste", {})
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from analytics import compare_to_sector, compute_sector_averages, market_position_summary, process_center_file
+from analytics.comparison import METRIC_KEYS
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def test_core_imports_without_streamlit():
+    # Un import de streamlit en cualquier submódulo del núcleo falla con ImportError
+    code = ("import sys; sys.modules['streamlit'] = None\n"
+            "import analytics\n"
+            "[getattr(analytics, name) for name in analytics.__all__]\n"
+            "import analytics.reports, analytics.synthetic\n")
+    subprocess.run([sys.executable, '-c', code], cwd=SRC_DIR, check=True)
+
+
+def test_sector_averages_match_pandas(market_df):
+    sector_avg = compute_sector_averages(market_df)
+    for metric in METRIC_KEYS:
+        np.testing.assert_allclose(sector_avg[metric], market_df[metric].mean())
+    np.testing.assert_allclose(sector_avg['ventas_totales'], market_df['ingresos_totales'].sum())
+
+
+def test_center_comparison_against_sector(center_csv, market_df):
+    center_data, message = process_center_file(str(center_csv), 'Demo', "Urbano")
+    assert center_data is not None, message
+    latest = center_data['monthly_data'][-1]
+    sector_avg = compute_sector_averages(market_df)
+
+    comparison = compare_to_sector(latest, sector_avg)
+    assert [m['center_value'] for m in comparison] == [latest[metric] for metric in METRIC_KEYS]
+    for m, metric in zip(comparison, METRIC_KEYS):
+        np.testing.assert_allclose(m['performance'], (latest[metric] / sector_avg[metric] - 1) * 100)
+        assert m['percentile'] is None
+
+    summary = market_position_summary(comparison)
+    assert summary['superior_count'] == sum(m['performance'] > 0 for m in comparison)
+    assert summary['total_count'] == len(METRIC_KEYS)
+
+
+def test_unsupported_or_incomplete_files(tmp_path, market_df):
+    assert process_center_file(str(tmp_path / 'centro.txt'), 'X', "Urbano") == (None, "Formato de archivo no soportado")
+    path = tmp_path / 'centro.csv'
+    market_df[['fecha', 'trafico_peatonal']].head(10).to_csv(path, index=False)
+    center_data, message = process_center_file(str(path), 'X', "Urbano")
+    assert center_data is None
+    assert message.startswith("Faltan las siguientes columnas: ventas_por_m2")
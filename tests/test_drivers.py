@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import DRIVER_LEVELS, DRIVER_METRICS, TARGET_METRICS, DriverAnalysis
+from analytics.comparison import METRIC_KEYS
+
+
+def segment_rows(market_df, level, key):
+    mask = np.ones(len(market_df), dtype=bool)
+    for column, value in zip(level, key):
+        mask &= (market_df[column] == value).to_numpy()
+    return market_df[mask].dropna(subset=METRIC_KEYS)
+
+
+@pytest.mark.parametrize('level', DRIVER_LEVELS)
+def test_regressions_match_lstsq(market_df, level):
+    regressions = DriverAnalysis(market_df).regressions(level)
+    for row in regressions.itertuples(index=False):
+        key = tuple(getattr(row, column) for column in level)
+        rows = segment_rows(market_df, level, key)
+        design = np.column_stack([np.ones(len(rows)), rows[DRIVER_METRICS].to_numpy(dtype=float)])
+        target = rows[row.objetivo].to_numpy(dtype=float)
+        coefficients, residuals, _, _ = np.linalg.lstsq(design, target, rcond=None)
+
+        assert row.filas == len(rows)
+        np.testing.assert_allclose(row.intercepto, coefficients[0], rtol=1e-6, atol=1e-8)
+        for k, driver in enumerate(DRIVER_METRICS):
+            np.testing.assert_allclose(getattr(row, f"pendiente_{driver}"), coefficients[k + 1],
+                                       rtol=1e-6, atol=1e-10)
+        total = ((target - target.mean()) ** 2).sum()
+        np.testing.assert_allclose(row.r2, 1 - residuals[0] / total, rtol=1e-6, atol=1e-10)
+
+
+def test_correlations_match_pandas(market_df):
+    analysis = DriverAnalysis(market_df)
+    expected = market_df[METRIC_KEYS].corr()
+    pd.testing.assert_frame_equal(analysis.correlation_matrix(), expected, rtol=1e-9)
+
+    zone, business = market_df['zona_geografica'].iloc[0], market_df['tipo_negocio'].iloc[0]
+    rows = segment_rows(market_df, ('zona_geografica', 'tipo_negocio'), (zone, business))
+    pd.testing.assert_frame_equal(analysis.correlation_matrix(zone, business), rows[METRIC_KEYS].corr(), rtol=1e-9)
+    assert analysis.correlation_matrix('Atlántida') is None
+
+
+def test_small_segments_are_not_fitted(market_df):
+    # Un cruce zona × tipo con menos filas que coeficientes + 1 no tiene regresión
+    market = market_df.copy()
+    market.loc[market.index[:3], 'zona_geografica'] = 'Islas'
+    regressions = DriverAnalysis(market).regressions(('zona_geografica', 'tipo_negocio'))
+    small = regressions[regressions['zona_geografica'] == 'Islas']
+    assert (small['filas'] < len(DRIVER_METRICS) + 2).all()
+    assert small[[f"pendiente_{driver}" for driver in DRIVER_METRICS] + ['r2']].isna().all().all()
+    assert set(regressions['objetivo']) == set(TARGET_METRICS)
@@ -0,0 +1,76 @@
+import pickle
+
+import pandas as pd
+import pytest
+
+from analytics import MarketIndex, aggregate_by_zone, make_filters
+from analytics.filters import MAX_CACHED_VIEWS
+
+
+@pytest.fixture(scope='module')
+def shuffled(market_df):
+    return market_df.sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def index(shuffled):
+    return MarketIndex(shuffled)
+
+
+def reference(df, filters):
+    keep = pd.Series(True, index=df.index)
+    if filters.zonas:
+        keep &= df['zona_geografica'].isin(filters.zonas)
+    if filters.tipos:
+        keep &= df['tipo_negocio'].isin(filters.tipos)
+    if filters.desde is not None:
+        keep &= df['fecha'] >= filters.desde
+    if filters.hasta is not None:
+        keep &= df['fecha'] < filters.hasta + pd.Timedelta(days=1)
+    return df[keep]
+
+
+def sort_rows(df):
+    return df.sort_values(['fecha', 'centro_id', 'tipo_negocio'], ignore_index=True)
+
+
+@pytest.mark.parametrize('zonas, tipos, desde, hasta', [
+    ((), (), None, None),
+    (('Madrid',), (), None, None),
+    ((), ('Moda', 'Ocio'), '2023-03-01', None),
+    (('Madrid', 'Cataluña'), ('Restauración',), '2023-02-11', '2023-09-03'),
+    (('Zona inexistente',), (), None, None),
+    ((), (), '2023-05-05', '2023-05-05'),
+])
+def test_select_matches_boolean_scan(index, shuffled, zonas, tipos, desde, hasta):
+    filters = make_filters(zonas, tipos, desde, hasta)
+    pd.testing.assert_frame_equal(sort_rows(index.select(filters)), sort_rows(reference(shuffled, filters)))
+
+
+def test_is_active(index):
+    first, last = index.date_range()
+    assert not index.is_active(make_filters())
+    assert not index.is_active(make_filters(desde=first, hasta=last))
+    assert index.is_active(make_filters(tipos=['Moda']))
+    assert index.is_active(make_filters(hasta=last - pd.Timedelta(days=1)))
+
+
+def test_view_is_cached_and_aggregates_the_subset(index, shuffled):
+    filters = make_filters(tipos=['Moda'])
+    view, hit = index.view(filters)
+    assert not hit
+    assert index.view(make_filters(tipos=('Moda',)))[0] is view
+    expected = aggregate_by_zone(reference(shuffled, filters))
+    pd.testing.assert_frame_equal(view.zone_data.reset_index(drop=True), expected.reset_index(drop=True))
+
+    dates = pd.date_range('2023-01-01', periods=MAX_CACHED_VIEWS + 1)
+    for day in dates:
+        index.view(make_filters(desde=day))
+    assert index.view(filters)[1] is False
+
+
+def test_pickle_round_trip(index):
+    restored = pickle.loads(pickle.dumps(index))
+    filters = make_filters(tipos=['Ocio'], desde='2023-06-01')
+    pd.testing.assert_frame_equal(restored.select(filters), index.select(filters))
+    assert restored.view(filters)[1] is False
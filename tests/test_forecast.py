@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import FORECAST_METRICS, ForecastIndex, center_month_distribution, forecast_center
+from analytics.forecast import seasonal_smoothing
+
+
+def test_batch_fit_matches_one_series_at_a_time():
+    rng = np.random.default_rng(3)
+    months = np.arange(30) % 12
+    history = rng.uniform(50, 150, (4, 30))
+    history[1, 5:9] = np.nan
+    history[2, :20] = np.nan
+    seasonal = rng.uniform(0.8, 1.2, (4, 12))
+
+    forecast, error = seasonal_smoothing(history, months, seasonal, horizon=6)
+    for i in range(len(history)):
+        single_forecast, single_error = seasonal_smoothing(history[i:i + 1], months, seasonal[i:i + 1], horizon=6)
+        np.testing.assert_allclose(forecast[i], single_forecast[0])
+        np.testing.assert_allclose(error[i], single_error[0], equal_nan=True)
+
+
+def test_repeating_seasonal_pattern_is_projected():
+    pattern = np.array([80, 85, 90, 100, 105, 110, 120, 130, 100, 95, 90, 95], dtype=float)
+    history = np.tile(pattern, 3)[None, :]
+    forecast, error = seasonal_smoothing(history, np.arange(36) % 12, np.ones((1, 12)), horizon=12)
+    np.testing.assert_allclose(forecast[0], pattern, rtol=1e-6)
+    assert error[0] == pytest.approx(0, abs=1e-9)
+
+
+def test_market_index_matches_single_center_forecast(market_df):
+    distribution = center_month_distribution(market_df)
+    index = ForecastIndex(distribution)
+    center = index.centers[0]
+    rows = distribution[distribution['centro_id'] == center]
+    monthly_data = rows.assign(fecha=rows['mes'].astype(str)).to_dict('records')
+
+    expected = forecast_center(monthly_data, horizon=6)
+    actual = index.center(center, horizon=6)
+    for metric in FORECAST_METRICS:
+        pd.testing.assert_frame_equal(pd.DataFrame(actual[metric]), pd.DataFrame(expected[metric]))
+        assert all(r['inferior'] <= r['pronostico'] <= r['superior'] for r in actual[metric])
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from analytics import CenterMatrix, CenterStore, PercentileIndex, center_month_distribution, stack_centers
+from analytics.comparison import METRIC_KEYS, compare_to_sector
+
+
+@pytest.fixture(scope='module')
+def centers(market_df):
+    distribution = center_month_distribution(market_df)
+    centers = {}
+    for name in distribution['centro_id'].unique()[:3]:
+        rows = distribution[distribution['centro_id'] == name]
+        # El último centro tiene un mes menos: cada uno usa su propio último mes
+        rows = rows.iloc[:-1] if len(centers) == 2 else rows
+        centers[name] = {'monthly_data': rows.assign(fecha=rows['mes'].astype(str)).to_dict('records'),
+                         'raw_data': []}
+    return centers
+
+
+def test_matrix_matches_per_center_comparison(centers, market_df):
+    distribution = center_month_distribution(market_df)
+    sector = distribution[METRIC_KEYS].mean().to_dict()
+    index = PercentileIndex(distribution)
+    names = list(centers)
+    matrix = CenterMatrix(stack_centers(centers, names), sector, index)
+
+    assert matrix.centers == names
+    for i, name in enumerate(names):
+        latest = centers[name]['monthly_data'][-1]
+        expected = compare_to_sector(latest, sector, index)
+        np.testing.assert_allclose(matrix.deltas[i], [row['performance'] for row in expected])
+        np.testing.assert_allclose(matrix.percentiles[i], [row['percentile'] for row in expected])
+    assert matrix.latest_month.iloc[2] < matrix.latest_month.iloc[0]
+
+
+def test_stack_uses_peek_on_center_store(centers, tmp_path):
+    store = CenterStore(budget_bytes=0, spill_dir=str(tmp_path))
+    for name, data in centers.items():
+        store[name] = dict(data, raw_data=[{'fecha': '2024-01-01', 'trafico_peatonal': 1.0}])
+    spilled = [name for name in store if store.is_spilled(name)]
+    assert spilled
+    stacked = stack_centers(store, list(centers))
+    assert [name for name in store if store.is_spilled(name)] == spilled
+    assert len(stacked) == sum(len(data['monthly_data']) for data in centers.values())
+    series = CenterMatrix(stacked, {}).series('trafico_peatonal')
+    assert list(series.columns) == list(centers)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from analytics import PeerIndex, size_band
+from analytics.comparison import METRIC_KEYS
+from analytics.peers import unit_month_distribution
+
+
+@pytest.fixture(scope='module')
+def units(market_df):
+    return unit_month_distribution(market_df)
+
+
+@pytest.fixture(scope='module')
+def peers(units):
+    return PeerIndex(units)
+
+
+def test_size_band_edges():
+    assert list(size_band([149.9, 150, 249, 250, 350, 1000])) == [
+        '<150 m²', '150-249 m²', '150-249 m²', '250-349 m²', '≥350 m²', '≥350 m²']
+
+
+def test_lookup_prefers_most_specific_group_with_enough_centers(peers, units):
+    row = units.iloc[0]
+    profile = {'zona_geografica': row['zona_geografica'], 'tipo_negocio': row['tipo_negocio'],
+               'tamaño_m2': row['tamaño_m2']}
+
+    group = peers.lookup(profile, min_centers=1)
+    assert group['level'] == ('zona_geografica', 'tipo_negocio', 'banda_m2')
+    members = units[(units['zona_geografica'] == row['zona_geografica'])
+                    & (units['tipo_negocio'] == row['tipo_negocio'])
+                    & (units['banda_m2'] == size_band(row['tamaño_m2']))]
+    assert group['centers'] == members['centro_id'].nunique()
+    np.testing.assert_allclose([group['mean'][m] for m in METRIC_KEYS], members[METRIC_KEYS].mean())
+
+    # Si ningún grupo alcanza el mínimo se devuelve el más específico disponible
+    assert peers.lookup(profile, min_centers=10**6)['level'] == ('zona_geografica', 'tipo_negocio', 'banda_m2')
+    by_type = peers.lookup({'tipo_negocio': row['tipo_negocio']}, min_centers=2)
+    assert by_type['level'] == ('tipo_negocio',)
+    assert peers.lookup({}, min_centers=2)['level'] == ()
+
+
+def test_summary_has_one_row_per_group(peers):
+    summary = peers.summary()
+    assert len(summary) == len(peers.groups)
+    assert summary.loc[summary['nivel'] == 0, 'grupo'].tolist() == ["Mercado completo"]
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from analytics import PercentileIndex, center_month_distribution, compare_to_sector
+from analytics.comparison import METRIC_KEYS
+
+stats = pytest.importorskip('scipy.stats')
+
+
+@pytest.fixture(scope='module')
+def distribution(market_df):
+    return center_month_distribution(market_df)
+
+
+def test_ranks_match_percentileofscore(distribution):
+    index = PercentileIndex(distribution)
+    rng = np.random.default_rng(0)
+    # Valores existentes (empates) y desplazados (entre valores)
+    queries = np.stack([rng.choice(distribution[metric].to_numpy(), 40) for metric in METRIC_KEYS], axis=1)
+    queries[::2] += 0.37
+    queries[0] = [distribution[metric].min() - 1 for metric in METRIC_KEYS]
+    queries[1] = [distribution[metric].max() + 1 for metric in METRIC_KEYS]
+
+    expected = np.array([[stats.percentileofscore(distribution[metric], value, kind='mean')
+                          for metric, value in zip(METRIC_KEYS, row)] for row in queries])
+    np.testing.assert_allclose(index.ranks(queries), expected, atol=1e-9)
+    np.testing.assert_allclose(index.ranks(queries[5]), expected[5], atol=1e-9)
+
+
+def test_missing_values_have_no_rank(distribution):
+    index = PercentileIndex(distribution)
+    values = distribution[METRIC_KEYS].median().to_numpy()
+    values[2] = np.nan
+    ranks = index.ranks(values)
+    assert np.isnan(ranks[2])
+    assert np.isfinite(np.delete(ranks, 2)).all()
+
+
+def test_compare_to_sector_reports_percentiles(distribution):
+    index = PercentileIndex(distribution)
+    latest = distribution.iloc[0][METRIC_KEYS].to_dict()
+    sector = distribution[METRIC_KEYS].mean().to_dict()
+    comparison = compare_to_sector(latest, sector, index)
+    for row, metric in zip(comparison, METRIC_KEYS):
+        assert row['percentile'] == pytest.approx(
+            stats.percentileofscore(distribution[metric], latest[metric], kind='mean'))
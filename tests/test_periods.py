@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import COMPARISON_BASES, LagTable
+from analytics.comparison import METRIC_KEYS
+from analytics.ingest import MONTHLY_AGGREGATIONS
+
+
+@pytest.fixture(scope='module')
+def monthly_with_gaps():
+    """Dos centros con meses ausentes y que no empiezan ni terminan a la vez"""
+    rng = np.random.default_rng(7)
+    frames = []
+    for center, months, missing in [('A', pd.period_range('2022-01', '2023-12', freq='M'), [3, 4, 10, 15]),
+                                    ('B', pd.period_range('2022-05', '2023-09', freq='M'), [0, 7])]:
+        months = months.delete(missing)
+        frame = pd.DataFrame({'centro': center, 'fecha': months.astype(str)})
+        for metric in METRIC_KEYS:
+            frame[metric] = rng.uniform(50, 150, len(months))
+        frames.append(frame)
+    monthly = pd.concat(frames, ignore_index=True)
+    # Un valor de referencia nulo no produce variación
+    monthly.loc[2, METRIC_KEYS[0]] = 0.0
+    return monthly
+
+
+def shifted_reference(monthly, months, lag):
+    """Variaciones con ``shift`` de pandas sobre la rejilla mensual continua de cada centro"""
+    frames = {}
+    for center, rows in monthly.groupby('centro'):
+        grid = rows.set_index(pd.PeriodIndex(rows['fecha'], freq='M'))[METRIC_KEYS].reindex(months)
+        previous = grid.shift(lag)
+        frames[center] = ((grid / previous - 1) * 100).where(previous > 0)
+    return frames
+
+
+@pytest.mark.parametrize('basis', list(COMPARISON_BASES))
+def test_deltas_match_pandas_shift(monthly_with_gaps, basis):
+    table = LagTable(monthly_with_gaps)
+    reference = shifted_reference(monthly_with_gaps, table.months, COMPARISON_BASES[basis][1])
+    for center, expected in reference.items():
+        np.testing.assert_allclose(table.center_deltas(center, basis).to_numpy(), expected.to_numpy())
+
+
+def test_latest_comparison_uses_calendar_lag(monthly_with_gaps):
+    table = LagTable(monthly_with_gaps)
+    comparison = table.latest_comparison('B', 'YoY')
+    assert comparison['mes'] == pd.Period('2023-09', freq='M')
+    assert comparison['mes_referencia'] == pd.Period('2022-09', freq='M')
+
+    rows = monthly_with_gaps[monthly_with_gaps['centro'] == 'B'].set_index('fecha')
+    for metric in METRIC_KEYS:
+        assert comparison['valor'][metric] == rows.loc['2023-09', metric]
+        assert comparison['referencia'][metric] == rows.loc['2022-09', metric]
+    assert table.latest_comparison('Z', 'MoM') is None
+
+
+def test_latest_deltas_per_center(monthly_with_gaps):
+    table = LagTable(monthly_with_gaps)
+    latest = table.latest_deltas('MoM')
+    assert latest['mes'].to_dict() == {'A': '2023-12', 'B': '2023-09'}
+    for center in ('A', 'B'):
+        np.testing.assert_allclose(latest.loc[center, METRIC_KEYS].to_numpy(dtype=float),
+                                   table.center_deltas(center, 'MoM').loc[latest.loc[center, 'mes']].to_numpy())
+    frame = table.to_frame()
+    assert len(frame) == 2 * len(COMPARISON_BASES)
+
+
+def test_from_market_matches_monthly_aggregation(market_df):
+    table = LagTable.from_market(market_df)
+    center = table.centers[0]
+    monthly = (market_df[market_df['centro_id'] == center]
+               .groupby(market_df['fecha'].dt.to_period('M')).agg(MONTHLY_AGGREGATIONS)[METRIC_KEYS])
+    expected = ((monthly / monthly.shift(1) - 1) * 100).reindex(table.months)
+    np.testing.assert_allclose(table.center_deltas(center, 'MoM').to_numpy(), expected.to_numpy(), rtol=1e-9)
@@ -0,0 +1,101 @@
+import types
+
+import plotly.graph_objects as go
+import pytest
+
+from analytics import profiling
+from analytics.profiling import Profiler, estimate_payload
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(profiling, 'time', types.SimpleNamespace(perf_counter=lambda: now[0]))
+    return now
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler(enabled=False)
+    calls = []
+
+    @profiler.profiled('datos')
+    def load():
+        calls.append(1)
+        profiler.mark_cache(True)
+        return 42
+
+    with profiler.section('bloque', 'gráfica') as entry:
+        assert entry == {}
+    assert load() == 42 and calls == [1]
+    assert profiler.entries == [] and profiler.report() == []
+    assert profiler.attributed() == 0
+
+
+def test_nested_sections_split_self_time(clock):
+    profiler = Profiler(enabled=True)
+    with profiler.section('página', 'página'):
+        clock[0] += 1
+        with profiler.section('agregación', 'cálculo'):
+            clock[0] += 2
+            with profiler.section('gráfica', 'gráfica'):
+                clock[0] += 4
+        clock[0] += 0.5
+    with profiler.section('envío', 'envío'):
+        clock[0] += 3
+
+    sections = {entry['name']: entry for entry in profiler.entries}
+    assert {name: entry['depth'] for name, entry in sections.items()} == {
+        'página': 0, 'agregación': 1, 'gráfica': 2, 'envío': 0}
+    assert sections['página']['seconds'] == 7.5
+    assert sections['página']['self_seconds'] == 1.5
+    assert sections['agregación']['self_seconds'] == 2
+    assert sections['gráfica']['self_seconds'] == 4
+    # Solo cuentan las secciones de primer nivel, sin duplicar las anidadas
+    assert profiler.attributed() == 10.5
+    assert profiler.elapsed() == 10.5
+    assert [entry['name'] for entry in profiler.report()] == ['gráfica', 'envío', 'agregación', 'página']
+
+
+def test_section_is_recorded_when_the_block_fails(clock):
+    profiler = Profiler(enabled=True)
+    with pytest.raises(ValueError):
+        with profiler.section('carga', 'datos'):
+            clock[0] += 1
+            raise ValueError("archivo corrupto")
+    assert profiler.entries[0]['seconds'] == 1
+    assert profiler._stack == []
+
+
+def test_profiled_records_cache_and_payload():
+    profiler = Profiler(enabled=True)
+
+    @profiler.profiled('datos')
+    def load(hit):
+        profiler.mark_cache(hit)
+        return [1.0] * 10
+
+    @profiler.profiled('gráfica', name='figura', payload=False)
+    def chart():
+        return go.Figure()
+
+    assert load(True) == [1.0] * 10
+    load(False)
+    chart()
+    assert [(e['name'], e['kind'], e['cache']) for e in profiler.entries] == [
+        ('load', 'datos', True), ('load', 'datos', False), ('figura', 'gráfica', None)]
+    # Las listas de números no tienen tamaño estimable; la figura no se mide con payload=False
+    assert [e['payload_bytes'] for e in profiler.entries] == [None, None, None]
+    # Fuera de una sección no hay nada que anotar
+    profiler.mark_cache(True)
+    assert profiler.entries[-1]['cache'] is None
+
+
+def test_estimate_payload(market_df):
+    frame_bytes = int(market_df.memory_usage(deep=True).sum())
+    figure = go.Figure(go.Bar(x=['a', 'b'], y=[1, 2]))
+    assert estimate_payload(None) is None
+    assert estimate_payload(market_df) == frame_bytes
+    assert estimate_payload(figure) == len(figure.to_json().encode('utf-8'))
+    assert estimate_payload({'datos': market_df, 'figuras': [figure, None], 'n': 3}) == (
+        frame_bytes + len(figure.to_json().encode('utf-8')))
+    assert estimate_payload({'n': 3}) is None
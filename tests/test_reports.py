@@ -0,0 +1,24 @@
+import shutil
+
+from analytics.reports import run_batch
+
+
+def test_run_batch_records_failures_and_keeps_going(center_csv, tmp_path):
+    input_dir, output_dir = tmp_path / 'centros', tmp_path / 'informes'
+    input_dir.mkdir()
+    output_dir.mkdir()
+    for name in ('A', 'B', 'C'):
+        shutil.copy(center_csv, input_dir / f'{name}.csv')
+    (input_dir / 'D.csv').write_text("fecha,trafico_peatonal\n2024-01-01,100\n")
+    # Un directorio con el nombre del CSV de B hace fallar su escritura dentro del proceso del pool
+    (output_dir / 'B_comparacion.csv').mkdir()
+
+    index = run_batch(str(input_dir), str(output_dir), workers=2, html_report=False)
+
+    status = dict(zip(index['centro'], index['estado']))
+    assert status == {'A': 'ok', 'B': 'error', 'C': 'ok', 'D': 'error'}
+    messages = dict(zip(index['centro'], index['mensaje']))
+    assert messages['B'].startswith('IsADirectoryError')
+    assert 'Faltan las siguientes columnas' in messages['D']
+    assert (output_dir / 'A_kpis.csv').exists() and (output_dir / 'C_kpis.csv').exists()
+    assert (output_dir / 'indice.csv').exists()
@@ -0,0 +1,48 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import rerun_latency  # noqa: E402
+from analytics import INDIVIDUAL_CSV, process_center_file  # noqa: E402
+
+
+def test_pages_come_from_the_app_navigation():
+    assert rerun_latency.PAGES == ["Dashboard", "Análisis vs Mercado", "Comparar Centros",
+                                   "Datos del Mercado", "Configuración"]
+
+
+def test_nav_pages_requires_nav_options(tmp_path):
+    path = tmp_path / 'app.py'
+    path.write_text("pages = ['Dashboard']\n", encoding='utf-8')
+    with pytest.raises(RuntimeError, match="nav_options"):
+        rerun_latency.nav_pages(str(path))
+
+
+@pytest.mark.parametrize('q', [0, 50, 95, 100])
+def test_percentile_matches_numpy(q):
+    values = [0.31, 0.12, 0.5, 0.07, 0.29, 0.44, 0.18]
+    assert rerun_latency.percentile(values, q) == pytest.approx(np.percentile(values, q))
+    assert rerun_latency.percentile([0.2], q) == 0.2
+
+
+def test_page_budgets():
+    assert rerun_latency.parse_page_budgets(None) == {}
+    assert rerun_latency.parse_page_budgets(['Dashboard=800', 'Datos del Mercado=1500']) == {
+        'Dashboard': 800.0, 'Datos del Mercado': 1500.0}
+    for item in ['Inicio=800', 'Dashboard', 'Dashboard=']:
+        with pytest.raises(argparse.ArgumentTypeError):
+            rerun_latency.parse_page_budgets([item])
+
+
+def test_measure_page():
+    center_data, message = process_center_file(INDIVIDUAL_CSV, 'Demo', "Urbano")
+    assert center_data is not None, message
+    result = rerun_latency.measure_page(center_data, 'Configuración', runs=2, warmup=0)
+    assert result['page'] == 'Configuración' and result['runs'] == 2 and not result['dark_mode']
+    assert 0 < result['p50_ms'] <= result['p95_ms']
+    assert result['first_run_ms'] > 0
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import SeasonalProfile
+from analytics.comparison import METRIC_KEYS
+
+
+@pytest.fixture(scope='module')
+def seasonal_market():
+    """Dos años de un KPI con estacionalidad multiplicativa conocida y crecimiento entre años"""
+    dates = pd.date_range('2022-01-01', '2023-12-31', freq='D')
+    month_factor = np.array([0.8, 0.85, 0.9, 1.0, 1.05, 1.1, 1.2, 1.3, 1.0, 0.95, 0.9, 0.95])
+    weekday_factor = np.array([0.9, 0.9, 0.95, 1.0, 1.1, 1.25, 0.9])
+    growth = np.where(dates.year == 2023, 1.2, 1.0)
+    frames = []
+    for zone, base in [('Norte', 100.0), ('Sur', 300.0)]:
+        value = base * growth * month_factor[dates.month - 1] * weekday_factor[dates.dayofweek]
+        frame = pd.DataFrame({'fecha': dates, 'zona_geografica': zone, 'tipo_negocio': 'Moda'})
+        for metric in METRIC_KEYS:
+            frame[metric] = value
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True), month_factor, weekday_factor
+
+
+def test_recovers_known_factors(seasonal_market):
+    market_df, month_factor, weekday_factor = seasonal_market
+    profile = SeasonalProfile(market_df)
+    for segment in [('mercado', 'Total'), ('zona_geografica', 'Sur')]:
+        np.testing.assert_allclose(profile.month_factors('trafico_peatonal', [segment])[0],
+                                   month_factor / month_factor.mean(), rtol=0.02)
+        np.testing.assert_allclose(profile.weekday('trafico_peatonal', segment, relative=True),
+                                   weekday_factor / weekday_factor.mean(), rtol=0.02)
+    assert profile.months_with_data() == 12
+
+
+def test_month_index_matches_pandas_reference(market_df):
+    profile = SeasonalProfile(market_df)
+    daily = market_df.groupby('fecha')['ventas_por_m2'].mean()
+    ratio = daily / daily.groupby(daily.index.year).transform('mean')
+    expected = ratio.groupby(ratio.index.month).mean().reindex(range(1, 13))
+    expected = expected / expected.mean()
+    np.testing.assert_allclose(profile.month_index['ventas_por_m2'][0], expected.to_numpy(), equal_nan=True)
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import HLL_RELATIVE_ERROR, SEGMENT_QUANTILES, SketchCube, exact_segment_table
+from analytics.sketches import hll_count, hll_registers
+
+
+@pytest.fixture(scope='module')
+def cube(market_df):
+    return SketchCube(market_df)
+
+
+@pytest.mark.parametrize('metric', ['trafico_peatonal', 'tasa_conversion'])
+@pytest.mark.parametrize('by', ['zona_geografica', 'tipo_negocio', 'mes'])
+def test_segment_table_matches_exact_within_bounds(cube, market_df, metric, by):
+    approximate = cube.segment_table(metric, by).set_index('segmento')
+    exact = exact_segment_table(market_df, metric, by).set_index('segmento')
+
+    assert list(approximate.index) == list(exact.index)
+    assert (approximate['filas'] == exact['filas']).all()
+    np.testing.assert_allclose(approximate['centros'], exact['centros'],
+                               atol=1, rtol=3 * HLL_RELATIVE_ERROR)
+    spread = market_df[metric].max() - market_df[metric].min()
+    for q in SEGMENT_QUANTILES:
+        column = f"p{round(q * 100)}"
+        # El valor exacto cae dentro del intervalo publicado
+        distance = (approximate[column] - exact[column]).abs()
+        assert (distance <= approximate[f"{column}_error"] + 1e-9 * spread).all(), column
+
+
+def test_filtered_query_matches_rows(cube, market_df):
+    months = cube.months_between('2023-03-01', '2023-05-31')
+    digest, centers = cube.query('ventas_por_m2', tipos=('Moda',), meses=months)
+    rows = market_df[(market_df['tipo_negocio'] == 'Moda')
+                     & market_df['fecha'].between('2023-03-01', '2023-05-31')]
+    assert digest.count == len(rows)
+    assert centers == pytest.approx(rows['centro_id'].nunique(), abs=1)
+    assert digest.quantile([0.5])[0] == pytest.approx(rows['ventas_por_m2'].median(),
+                                                        rel=0.02)
+
+
+def test_hll_count_relative_error():
+    rng = np.random.default_rng(5)
+    n_distinct = [10, 1_000, 50_000]
+    ids = np.concatenate([rng.choice(10**9, n, replace=False) for n in n_distinct])
+    cells = np.repeat(np.arange(len(n_distinct)), n_distinct)
+    estimates = hll_count(hll_registers(cells, pd.Series(ids).astype(str).to_numpy(), len(n_distinct)))
+    np.testing.assert_allclose(estimates, n_distinct, rtol=3 * HLL_RELATIVE_ERROR)
@@ -0,0 +1,62 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from analytics import snapshot
+from analytics.market import DATA_DIR, INDIVIDUAL_CSV, MARKET_CSV
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    # Un subconjunto del mercado: el snapshot debe reflejar este directorio, no src/data
+    market = pd.read_csv(MARKET_CSV)
+    market.head(len(market) // 2).to_csv(data_dir / os.path.basename(MARKET_CSV), index=False)
+    shutil.copy(INDIVIDUAL_CSV, data_dir)
+    return str(data_dir)
+
+
+@pytest.fixture
+def built(data_dir, tmp_path):
+    path = str(tmp_path / 'mercado.pkl')
+    header = snapshot.build_snapshot(path, data_dir)
+    return path, header
+
+
+def test_unchanged_files_validate_without_hashing(built, data_dir, monkeypatch):
+    path, header = built
+    monkeypatch.setattr(snapshot, 'source_digest', lambda *args: pytest.fail("no debe leer el contenido"))
+    artifacts = snapshot.load_snapshot(path, data_dir)
+    assert artifacts is not None
+    assert ('market_data', None) in artifacts
+    assert header['fingerprint'] == snapshot.source_fingerprint(data_dir)
+
+
+def test_touched_but_identical_files_fall_back_to_digest(built, data_dir):
+    path, header = built
+    csv_path = os.path.join(data_dir, os.path.basename(MARKET_CSV))
+    stat = os.stat(csv_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert header['fingerprint'] != snapshot.source_fingerprint(data_dir)
+    assert snapshot.is_current(snapshot.read_header(path), data_dir)
+
+
+def test_changed_content_or_format_invalidates(built, data_dir, monkeypatch):
+    path, header = built
+    with open(os.path.join(data_dir, os.path.basename(MARKET_CSV)), 'a', encoding='utf-8') as f:
+        f.write("\n")
+    assert snapshot.load_snapshot(path, data_dir) is None
+
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_FORMAT', header['format'] + 1)
+    assert not snapshot.is_current(header, DATA_DIR)
+
+
+def test_artifacts_come_from_the_snapshot_directory(built, data_dir):
+    path, _ = built
+    _, market_df = snapshot.load_snapshot(path, data_dir)[('market_data', None)]
+    expected = pd.read_csv(os.path.join(data_dir, os.path.basename(MARKET_CSV)))
+    assert len(market_df) == len(expected)
+    assert len(market_df) < len(pd.read_csv(MARKET_CSV))
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from analytics import MARKET_CSV, read_market_csv
+from analytics.synthetic import (
+    COLUMNS,
+    generate_market_data,
+    iter_market_chunks,
+    rows_for,
+    write_market_data,
+)
+
+
+def test_schema_matches_bundled_market_data():
+    generated = generate_market_data(4, 30)
+    assert list(generated.columns) == COLUMNS
+    assert set(COLUMNS) == set(pd.read_csv(MARKET_CSV, nrows=1).columns)
+    assert len(generated) == rows_for(4, 30)
+    # Una fila por centro × tipo de negocio × día, ordenada por centro y fecha
+    assert not generated.duplicated(['centro_id', 'tipo_negocio', 'fecha']).any()
+    assert generated.groupby(['centro_id', 'tipo_negocio'])['fecha'].is_monotonic_increasing.all()
+
+
+def test_same_seed_same_data():
+    pd.testing.assert_frame_equal(generate_market_data(3, 20, seed=7), generate_market_data(3, 20, seed=7))
+    assert not generate_market_data(3, 20, seed=7).equals(generate_market_data(3, 20, seed=8))
+
+
+def test_values_are_plausible(market_df):
+    assert market_df['tasa_ocupacion'].between(30, 100).all()
+    assert market_df['tasa_conversion'].between(5, 60).all()
+    assert (market_df['trafico_peatonal'] > 0).all()
+    # Ingresos = ventas por m² × superficie, como en los datos reales
+    expected = (market_df['ventas_por_m2'] * market_df['tamaño_m2']).round()
+    assert (market_df['ingresos_totales'] - expected).abs().max() <= 1
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+def test_chunked_write_round_trip(tmp_path, fmt):
+    path = tmp_path / f"mercado.{fmt}"
+    rows = write_market_data(str(path), 5, 40, chunk_rows=100)
+    expected = pd.concat(list(iter_market_chunks(5, 40, chunk_rows=100)), ignore_index=True)
+    written = read_market_csv(str(path))
+    assert rows == len(written) == rows_for(5, 40)
+    assert written['centro_id'].nunique() == 5
+    pd.testing.assert_frame_equal(written[['centro_id', 'tipo_negocio', 'trafico_peatonal']],
+                                  expected[['centro_id', 'tipo_negocio', 'trafico_peatonal']])
+
+
+def test_unknown_business_type():
+    with pytest.raises(ValueError, match="Joyería"):
+        generate_market_data(2, 10, business_types=['Moda', 'Joyería'])
@@ -0,0 +1,54 @@
+import types
+
+import pytest
+
+from analytics import cache, snapshot, warmup
+from analytics.cache import SharedCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def warmed(monkeypatch):
+    """Caché vacía con TTL de un segundo y reloj falso, calentada sin snapshot"""
+    clock = Clock()
+    monkeypatch.setattr(cache, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(cache, 'shared_cache', SharedCache(ttl=1))
+    monkeypatch.setattr(snapshot, 'install_snapshot', lambda: None)
+    return clock, warmup.warm_up(chart_themes=(False,))
+
+
+def test_first_warm_up_computes_every_step(warmed):
+    _, timings = warmed
+    names = [name for name, _, _ in timings]
+    assert names == ['snapshot'] + [name for name, _ in warmup.WARMUP_STEPS] + ['figuras de mercado (claro)']
+    # Sin snapshot todo se calcula; solo las dependencias ya calculadas por un paso anterior dan hit
+    assert timings[0][2] is False
+    assert timings[1][2] is False
+    assert all(seconds >= 0 for _, seconds, _ in timings)
+
+
+def test_warmed_entries_are_pinned(warmed):
+    assert cache.shared_cache._entries
+    assert all(pinned for _, _, _, pinned in cache.shared_cache._entries.values())
+
+
+def test_warmed_entries_survive_ttl_expiry(warmed):
+    clock, _ = warmed
+    clock.now += 3600
+    misses = cache.shared_cache.misses
+    for _, step in warmup.WARMUP_STEPS:
+        assert step()[1] is True
+    assert cache.cached_market_charts(False)[1] is True
+    assert cache.shared_cache.misses == misses
+
+    # Lo que se calcula después del calentamiento sí caduca
+    cache.shared_cache.get_or_compute('tardía', lambda: 1)
+    clock.now += 2
+    assert cache.shared_cache.get_or_compute('tardía', lambda: 2) == (2, False)
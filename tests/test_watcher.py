@@ -0,0 +1,88 @@
+import types
+
+import pytest
+
+from analytics import cache
+from analytics.cache import VERSION_CHECK_INTERVAL, SharedCache
+from analytics.market import DATA_DIR
+from analytics.watcher import ARTIFACT_KEYS, DataWatcher, build_artifacts
+
+
+def test_rebuild_installs_artifacts_that_outlive_the_ttl(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(cache, 'time', types.SimpleNamespace(monotonic=lambda: clock.now))
+    shared = SharedCache(ttl=1)
+    watcher = DataWatcher(shared=shared, interval=3600)
+
+    assert watcher.rebuild()
+    assert not watcher.rebuild()
+    clock.now += 3600
+
+    def fail():
+        raise AssertionError("una petición no debe recalcular lo que instaló el vigilante")
+
+    for key in build_artifacts():
+        value, hit = shared.get_or_compute(key, fail, (DATA_DIR,))
+        assert hit
+    assert watcher.rebuilds == 1
+
+
+def test_artifact_keys_cover_build_artifacts():
+    assert set(build_artifacts()) == set(ARTIFACT_KEYS)
+    watcher = DataWatcher(chart_themes=(False, True))
+    assert ('market_charts', True, None) in watcher.keys()
+
+
+@pytest.fixture
+def watched(monkeypatch, tmp_path):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(cache, 'time', types.SimpleNamespace(monotonic=lambda: clock.now))
+    (tmp_path / 'mercado.csv').write_text("a\n1\n")
+    shared = SharedCache(ttl=600)
+    watcher = DataWatcher(data_dir=str(tmp_path), shared=shared, interval=3600)
+    yield clock, tmp_path, shared, watcher
+    watcher.stop(timeout=5)
+
+
+def change_data(clock, data_dir):
+    (data_dir / 'mercado.csv').write_text("a\n1\n2\n")
+    clock.now += VERSION_CHECK_INTERVAL
+
+
+def test_only_watcher_keys_are_served_stale(watched):
+    clock, data_dir, shared, watcher = watched
+    watch = (str(data_dir),)
+    owned, other = ('zone_data', None), ('zone_data', 'otro.csv')
+    shared.put_many({owned: 'anterior', other: 'anterior'}, shared.version(watch))
+    # El hilo no llega a reconstruir: se simula una reconstrucción lenta
+    watcher.rebuild = lambda: False
+    watcher.start()
+
+    change_data(clock, data_dir)
+    assert shared.get_or_compute(owned, lambda: 'recalculado', watch) == ('anterior', True)
+    assert shared.get_or_compute(other, lambda: 'recalculado', watch) == ('recalculado', False)
+
+
+def test_failed_rebuild_stops_serving_stale(watched):
+    clock, data_dir, shared, watcher = watched
+    watch = (str(data_dir),)
+    owned = ('zone_data', None)
+    shared.put_many({owned: 'anterior'}, shared.version(watch))
+    shared.serve_stale(watcher.keys())
+    change_data(clock, data_dir)
+    assert shared.get_or_compute(owned, lambda: 'recalculado', watch) == ('anterior', True)
+
+    def broken():
+        raise ValueError("archivo a medio escribir")
+
+    watcher.rebuild = broken
+    watcher.poll()
+    assert isinstance(watcher.last_error, ValueError)
+    assert shared.get_or_compute(owned, lambda: 'recalculado', watch) == ('recalculado', False)
+
+    # Una reconstrucción correcta vuelve a permitirlo
+    watcher.rebuild = lambda: True
+    watcher.poll()
+    assert watcher.last_error is None
+    change_data(clock, data_dir)
+    assert shared.get_or_compute(owned, lambda: 'otra vez', watch) == ('recalculado', True)